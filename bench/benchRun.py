@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                        mddb.bench.benchRun.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module times the override pipeline over synthetic headers, as generated by
+bench.headerGen. For each header, the stages
+
+    configureOverride, writeOverride, confirmOverride, writeValidation
+
+of DbFitsInsert or DbCImageInsert are timed over a number of repeats, and
+reported per header and per card. The run is made in a scratch DQS tree with
+its own mddb.cfg, so no DQS is needed, and the override cache is off.
+
+The start up latency of the command line, 'dbinsert --help', is timed as
+well, from process start to exit, with that of a bare interpreter for
+comparison.
+
+Results are written as JSON, for comparison between releases,
+
+    python -m mddb.bench.benchRun --out=bench-2.1.json
+    python -m mddb.bench.benchRun --cards=100,5000 --history=1000 --repeats=10
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import platform
+import tempfile
+import subprocess
+
+from os.path import basename
+
+from mddb import mddbVersion
+
+from mddb.bench import headerGen
+from mddb.mains import dbFitsInsert
+from mddb.mains import dbCImageInsert
+
+stages = ['configureOverride', 'writeOverride', 'confirmOverride',
+          'writeValidation']
+
+cfgTemplate = """[DEFAULT]
+dqs    = %(root)s
+config = %%(dqs)s/CONFIG
+
+[dqs_dirs]
+header   = %%(dqs)s/HEADERS
+datasets = %%(dqs)s/DATASETS
+override = %%(dqs)s/OVERRIDE
+logs     = %%(dqs)s/logs
+scripts  = %%(dqs)s/scripts
+validate = %%(dqs)s/VALIDATE
+cache    = %%(dqs)s/cache
+
+[execute]
+executable = /bin/true
+
+[configs]
+uvfitsconfig   = %%(config)s/cska-uvfits.config
+uvmsconfig     = %%(config)s/cska-uvms.config
+cimageconfig   = %%(config)s/cska-cimage.config
+cimage2dconfig = %%(config)s/cska-cimage2d.config
+cimage3dconfig = %%(config)s/cska-cimage3d.config
+fitsconfig     = %%(config)s/cska-fits.config
+fits2dconfig   = %%(config)s/cska-fits2d.config
+fits3dconfig   = %%(config)s/cska-fits3d.config
+
+[config_defaults]
+uvfitsdefault = %%(config)s/cska-uvfits.defaults
+uvmsdefault   = %%(config)s/cska-uvms.defaults
+cimagedefault = %%(config)s/cska-cimage.defaults
+fitsdefault   = %%(config)s/cska-fits.defaults
+
+[database]
+server     = BENCH
+database   = bench
+schema     = dbo
+collection = bench
+"""
+
+dqsDirs = ['CONFIG', 'DATASETS', 'HEADERS', 'OVERRIDE', 'VALIDATE', 'logs',
+           'scripts', 'cache']
+
+uri = 'http://dms.cyberska.org:8080/dlmanager/getfile?fileid=0'
+
+
+def usage(mod):
+    useBurp = '\n\t'+mod+' benchmarking '+mddbVersion.pkg_name+' v'\
+        +mddbVersion.version +\
+        '\n\n\tUsage: '+ mod + ' [--help] [--out=<json-file>] '\
+        '[--repeats=<n>] [--cards=<n,n,..>] [--history=<n>] [--keep]\n\n\t'\
+        '--out=    \tJSON results file. Default, stdout.\n\t'\
+        '--repeats=\tTimed repeats of each header. Default, 5.\n\t'\
+        '--cards=  \tComma separated header sizes, in cards.\n\t\t'\
+                 '\tDefault, 100,1000,10000.\n\t'\
+        '--history=\tHISTORY and COMMENT cards added to each FITS header.\n\t\t'\
+                 '\tDefault, 0. A run without them is always made.\n\t'\
+        '--keep    \tKeep the scratch DQS tree.\n\t'\
+        '--help    \tThis message.\n\n'
+    return useBurp
+
+
+def suite(cards, history):
+    """Return the benchmark header specs, a list of (name, mtype, lines).
+
+    parameters: <list>, <int>, header sizes in cards, HISTORY/COMMENT volume
+    return:     <list>
+    """
+    specs = []
+    for ncards in cards:
+        for layout in sorted(headerGen.fitsLayouts):
+            name = 'fits-%s-%d' % (layout, ncards)
+            specs.append((name, 'image/fits-image',
+                          headerGen.fitsHeader(ncards, layout)))
+            if history:
+                specs.append((name+'-h%d' % history, 'image/fits-image',
+                              headerGen.fitsHeader(ncards, layout, history/2,
+                                                   history-history/2)))
+        for layout in sorted(headerGen.casaLayouts):
+            name = 'casa-%s-%d' % (layout, ncards)
+            specs.append((name, 'image/ms-image',
+                          headerGen.casaHeader(ncards, layout)))
+    return specs
+
+
+def makeDqs(root):
+    """Build a scratch DQS tree under root.
+
+    parameters: <string>, directory
+    return:     <string>, config file name
+    """
+    for name in dqsDirs:
+        path = os.path.join(root, name)
+        if not os.path.isdir(path): os.makedirs(path)
+    configFile = os.path.join(root, 'mddb.cfg')
+    cfob = open(configFile, 'w')
+    cfob.write(cfgTemplate % {'root': root})
+    cfob.close()
+    return configFile
+
+
+def timeHeader(insert, hdrFile, mtype, repeats):
+    """Time the override stages for one header.
+
+    parameters: <BaseDbInsert>, <string>, <string>, <int>
+                insert instance, header file, MIME-type, repeats
+    return:     <dict>, stage name to list of wall times, secs
+    """
+    times = dict([(stage, []) for stage in stages])
+    oname = os.path.splitext(basename(hdrFile))[0]+".override"
+    clock = time.time
+    for i in range(repeats):
+        insert.validationMsg = []
+        start = clock()
+        lines = insert.configureOverride(hdrFile, uri, False)
+        times['configureOverride'].append(clock() - start)
+        insert.signature(lines)
+
+        start = clock()
+        ofile = insert.writeOverride(lines, oname)
+        times['writeOverride'].append(clock() - start)
+
+        start = clock()
+        insert.confirmOverride(ofile, mtype, lines)
+        times['confirmOverride'].append(clock() - start)
+
+        start = clock()
+        insert.writeValidation(ofile)
+        times['writeValidation'].append(clock() - start)
+    return times
+
+
+def summarize(times, ncards):
+    """Reduce stage times to min, median and mean, per header, and the
+    median per card, all in microseconds.
+    """
+    summary = {}
+    for stage, secs in times.items():
+        summary[stage] = _stats(secs)
+        summary[stage]['perCard'] = summary[stage]['median']/max(1, ncards)
+    return summary
+
+
+def timeStartup(repeats):
+    """Time 'dbinsert --help', and a bare interpreter, 'python -c pass', each
+    run repeats times as a new process.
+
+    parameters: <int>, repeats
+    return:     <dict>, command to min, median and mean wall time, usecs
+    """
+    package = os.path.dirname(os.path.abspath(mddbVersion.__file__))
+    env     = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(package)] +
+                                        filter(None, [env.get('PYTHONPATH')]))
+    commands = {'dbinsert --help': [sys.executable, os.path.join(package, 'dbinsert.py'),
+                                    '--help'],
+                'python -c pass':  [sys.executable, '-c', 'pass']}
+    devnull = open(os.devnull, 'w')
+    startup = {}
+    try:
+        for name, cmd in commands.items():
+            secs = []
+            for i in range(repeats):
+                start = time.time()
+                subprocess.call(cmd, stdout=devnull, stderr=devnull, env=env)
+                secs.append(time.time() - start)
+            startup[name] = _stats(secs)
+    finally:
+        devnull.close()
+    return startup
+
+
+def _stats(secs):
+    secs   = sorted(secs)
+    median = secs[len(secs)/2]
+    return {'min':    secs[0]*1e6,
+            'median': median*1e6,
+            'mean':   sum(secs)/len(secs)*1e6}
+
+
+def run(cards=(100, 1000, 10000), history=0, repeats=5, root=None):
+    """Run the benchmark suite.
+
+    parameters: <list>, <int>, <int>, <string>
+                header sizes, HISTORY/COMMENT volume, repeats, DQS root
+    return:     <dict>, JSON ready results
+    """
+    configFile = makeDqs(root)
+    inserts = {'image/fits-image': dbFitsInsert.DbFitsInsert(configFile, False, cache=False),
+               'image/ms-image':   dbCImageInsert.DbCImageInsert(configFile, False, cache=False)}
+    headers = os.path.join(root, 'HEADERS')
+    results = []
+    for name, mtype, lines in suite(cards, history):
+        ext     = mtype == 'image/fits-image' and '.fits.hdr' or '.image.hdr'
+        hdrFile = headerGen.writeHeader(lines, os.path.join(headers, name+ext))
+        times   = timeHeader(inserts[mtype], hdrFile, mtype, repeats)
+        results.append({'header': name,
+                        'mtype':  mtype,
+                        'cards':  len(lines),
+                        'stages': summarize(times, len(lines))})
+    return {'package':   mddbVersion.pkg_name,
+            'version':   mddbVersion.version,
+            'python':    platform.python_version(),
+            'platform':  platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeats':   repeats,
+            'units':     'microseconds',
+            'startup':   timeStartup(repeats),
+            'results':   results}
+
+
+def main(args):
+    mod = basename(args[0])
+    long_options = ['help', 'out=', 'repeats=', 'cards=', 'history=', 'keep']
+    try:
+        opts, arg = getopt.getopt(args[1:], '', long_options)
+    except getopt.GetoptError, err:
+        print "Option parsing recieved an error:"
+        print err
+        return usage(mod)
+    if arg:
+        print "Unexpected arg(s):", arg
+        return usage(mod)
+
+    out, repeats, cards, history, keep = None, 5, [100, 1000, 10000], 0, False
+    try:
+        for o, a in opts:
+            if o == '--help':      return usage(mod)
+            elif o == '--out':     out = a
+            elif o == '--repeats': repeats = max(1, int(a))
+            elif o == '--cards':   cards = [int(n) for n in a.split(',')]
+            elif o == '--history': history = int(a)
+            elif o == '--keep':    keep = True
+    except ValueError, err:
+        print "Bad numeric option:", err
+        return usage(mod)
+
+    root = tempfile.mkdtemp(prefix='mddb-bench-')
+    try:
+        report = run(cards, history, repeats, root)
+    finally:
+        if keep: print >> sys.stderr, "Scratch DQS kept:", root
+        else: shutil.rmtree(root, ignore_errors=True)
+
+    if out:
+        ofob = open(out, 'w')
+        json.dump(report, ofob, indent=1, sort_keys=True)
+        ofob.close()
+        print "Wrote benchmark results:", out
+    else:
+        print json.dumps(report, indent=1, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.bench.headerGen.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module generates synthetic headers for benchmarking, in the '.hdr' forms
+written by the metaData package: FITS headers of 80 character cards, and CASA
+Image headers of tab separated keyword, value lines.
+
+Each header carries a complete, valid WCS for its axis layout, padded to a
+requested number of cards with filler keywords, plus a volume of HISTORY and
+COMMENT cards. Headers are reproducible for a given seed.
+
+eg.,
+
+>>> lines = fitsHeader(cards=500, layout='ra-dec-freq-stokes', history=200)
+>>> lines = casaHeader(cards=500, layout='cube')
+>>> writeHeader(lines, '/tmp/bench/HEADERS/synth-0001.fits.hdr')
+"""
+# ------------------------------------------------------------------------------
+
+import random
+
+# FITS axis layouts: (CTYPE, CRVAL, CDELT, CUNIT, NAXIS) per axis
+fitsAxes = {'RA'    : ('RA---SIN', 185.485,  -2.777777777778E-05, 'deg', 256),
+            'DEC'   : ('DEC--SIN', 15.8225,   2.777777777778E-05, 'deg', 256),
+            'GLON'  : ('GLON-CAR', 120.0,    -1.0E-03,            'deg', 512),
+            'GLAT'  : ('GLAT-CAR', 2.0,       1.0E-03,            'deg', 512),
+            'FREQ'  : ('FREQ',     1.15E+11,  1.0E+06,            'HZ',  64),
+            'STOKES': ('STOKES',   1.0,       1.0,                '',    1)
+            }
+
+fitsLayouts = {'ra-dec'            : ['RA','DEC'],
+               'ra-dec-freq'       : ['RA','DEC','FREQ'],
+               'ra-dec-freq-stokes': ['RA','DEC','FREQ','STOKES'],
+               'glon-glat-freq'    : ['GLON','GLAT','FREQ']
+               }
+
+# CASA Image layouts, as IMAGE-SHAPE. metaData writes, and DbCImageInsert
+# expects, the coordinates in the order spectral, stokes, direction.
+casaLayouts = {'plane': [256, 256, 1, 1],
+               'cube':  [256, 256, 1, 64],
+               'wide':  [2048, 2048, 1, 1024]
+               }
+
+
+def fitsHeader(cards=200, layout='ra-dec-freq-stokes', history=0, comment=0,
+               seed=0):
+    """Return the lines of a synthetic FITS header.
+
+    parameters: <int>, <string>, <int>, <int>, <int>
+                cards:   number of keyword cards, at least the WCS set
+                layout:  one of fitsLayouts
+                history: number of HISTORY cards
+                comment: number of COMMENT cards
+                seed:    random seed
+    return:     <list>, list of header lines
+    """
+    rand  = random.Random(seed)
+    axes  = fitsLayouts[layout]
+    lines = [_fitsCard('SIMPLE', 'T', 'Standard FITS'),
+             _fitsCard('BITPIX', '-32', 'Floating point (32 bit)'),
+             _fitsCard('NAXIS', str(len(axes)))]
+    for i, axis in enumerate(axes):
+        lines.append(_fitsCard('NAXIS'+str(i+1), str(fitsAxes[axis][4])))
+    lines.extend([_fitsCard('BSCALE', '1.000000000000E+00'),
+                  _fitsCard('BZERO',  '0.000000000000E+00'),
+                  _fitsCard('OBJECT', "'SYNTH-%04d'" % rand.randint(0, 9999)),
+                  _fitsCard('BUNIT',  "'Jy/beam '", 'Brightness (pixel) unit')])
+    for i, axis in enumerate(axes):
+        ctype, crval, cdelt, cunit, naxis = fitsAxes[axis]
+        n = str(i+1)
+        lines.extend([_fitsCard('CTYPE'+n, "'%-8s'" % ctype),
+                      _fitsCard('CRVAL'+n, '%.12E' % crval),
+                      _fitsCard('CDELT'+n, '%.12E' % cdelt),
+                      _fitsCard('CRPIX'+n, '%.12E' % (naxis/2+1)),
+                      _fitsCard('CUNIT'+n, "'%-8s'" % cunit)])
+    lines.extend([_fitsCard('RESTFRQ',  '1.152712018000E+11', 'Rest Frequency (Hz)'),
+                  _fitsCard('VELREF',   '257', '1 LSR, 2 HEL, 3 OBS, +256 Radio'),
+                  _fitsCard('TELESCOP', "'ALMA    '"),
+                  _fitsCard('OBSERVER', "'mddb bench'"),
+                  _fitsCard('DATE-OBS', "'2011-09-%02dT18:28:58.511999'" % rand.randint(1, 28)),
+                  _fitsCard('EPOCH',    '2.000000000000E+03')])
+
+    for i in range(max(0, cards-len(lines))):
+        lines.append(_fitsCard('X%07d' % i, '%.12E' % rand.uniform(-1e3, 1e3),
+                               'synthetic filler'))
+    lines.extend(['COMMENT synthetic comment card %d' % i for i in range(comment)])
+    lines.extend(['HISTORY synthetic history card %d / step = %d' % (i, i)
+                  for i in range(history)])
+    return lines
+
+
+def casaHeader(cards=100, layout='cube', seed=0):
+    """Return the lines of a synthetic CASA Image header, as metaData writes.
+
+    parameters: <int>, <string>, <int>
+                cards:  number of lines, at least the coordinate set
+                layout: one of casaLayouts
+                seed:   random seed
+    return:     <list>, list of header lines
+    """
+    rand  = random.Random(seed)
+    shape = casaLayouts[layout]
+    lines = ['FILETYPE\t\tCASA Image',
+             'IMAGE-NAME\t\tsynth-%04d.image' % rand.randint(0, 9999),
+             'OBSERVER\t\tmddb bench',
+             'TELESCOPE\t\tATCA',
+             'TARGET\t\tSynth',
+             'TELESCOP_LAT\t\t-0.5261',
+             'TELESCOP_LON\t\t2.6090',
+             'TELESCOP_HGT\t\t236.87',
+             'IMAGE-SHAPE\t\t'+str(shape),
+             'N_OF-AXES\t\t3',
+             'COORDINATE0-TYPE\t\tspectral',
+             'COORDINATE0-NAME\t\tFrequency',
+             'REFERENCE0-VALUE\t%d, GHz' % rand.randint(1, 300),
+             'INCREMENT0\t\t120 MHz',
+             'REST-FREQUENCY\t\t115, GHz',
+             'COORDINATE1-TYPE\t\tstokes',
+             'COORDINATE1-NAME\t\tStokes',
+             'COORDINATE2-TYPE\t\tdirection',
+             'COORDINATE2-NAME\t\tDeclination, Right Ascension',
+             'PROJECTION2\t\tSIN',
+             'REFERENCE2-VALUE\t-43.01.08.90, 13:25:27.600',
+             'REFERENCE2-PIXEL\t%.1f, %.1f' % (shape[0]/2, shape[1]/2),
+             'INCREMENT2\t\t+0.0.1.0, -0.0.1.0',
+             'INCREMENT2_UNITS\tdeg, deg',
+             'FRAME2\t\tJ2000',
+             'MJD-OBS\t\t%.2f' % rand.uniform(50000, 56000)]
+
+    for i in range(max(0, cards-len(lines))):
+        lines.append('MISC-%06d\t\t%.6f' % (i, rand.uniform(-1e3, 1e3)))
+    return lines
+
+
+def writeHeader(lines, hdrFile):
+    """Write header lines to hdrFile, one per line."""
+    hfob = open(hdrFile, 'w')
+    for line in lines:
+        hfob.write(line+"\n")
+    hfob.close()
+    return hdrFile
+
+
+def _fitsCard(key, value, comment=None):
+    card = '%-8s= %20s' % (key, value)
+    if comment: card += ' /'+comment
+    return card[:80]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+#
+#                                                 CyberSKA CASA Metadata Project
+#
+#                                                     mddb.config.cfgSnapshot.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides a process wide cache of mddb config files. A config file is
+read and interpolated once into a read only ConfigSnapshot, which is shared by
+MDDBEnv, F2CArgs and the insert classes. The snapshot is read again only when
+the modification time of the file changes, so long lived processes, eg. the
+runBatch() workers, pick up an edited mddb.cfg on their next dataset.
+
+eg.,
+
+>>> conf = snapshot('mddb.cfg')
+>>> conf.get('execute','executable')
+'/srv/cyberska/DQS/fits2caom/fits2caom'
+
+The get*() methods raise the ConfigParser errors as SafeConfigParser would.
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import threading
+
+from collections  import OrderedDict
+from ConfigParser import SafeConfigParser as configparser
+from ConfigParser import NoSectionError, NoOptionError
+
+_booleans = {'1': True, 'yes': True, 'true': True, 'on': True,
+             '0': False, 'no': False, 'false': False, 'off': False}
+
+_cache = {}
+_lock  = threading.Lock()
+
+
+class ConfigSnapshot(object):
+
+    def __init__(self, configFile, sections):
+        """A read only, interpolated config. sections is a dict of section
+        name to an ordered dict of option to value, the DEFAULT options
+        included in each section.
+        """
+        self.configFile = configFile
+        self.__sections = sections
+
+    def sections(self):
+        return sorted(self.__sections.keys())
+
+    def has_section(self, section):
+        return section in self.__sections
+
+    def has_option(self, section, option):
+        return option in self.__sections.get(section, ())
+
+    def options(self, section):
+        return self.__section(section).keys()
+
+    def items(self, section):
+        return self.__section(section).items()
+
+    def get(self, section, option):
+        try: return self.__section(section)[option]
+        except KeyError: raise NoOptionError(option, section)
+
+    def getint(self, section, option):
+        return int(self.get(section, option))
+
+    def getfloat(self, section, option):
+        return float(self.get(section, option))
+
+    def getboolean(self, section, option):
+        value = self.get(section, option)
+        try: return _booleans[value.lower()]
+        except KeyError: raise ValueError("Not a boolean: "+value)
+
+    ############################### prive ##################################
+
+    def __section(self, section):
+        try: return self.__sections[section]
+        except KeyError: raise NoSectionError(section)
+
+
+def snapshot(configFile):
+    """Return the ConfigSnapshot of configFile, read anew only if the file
+    has changed since last read. A missing file gives an empty snapshot, as
+    SafeConfigParser.read() ignores it.
+
+    parameters: <string>, config file name
+    return:     <ConfigSnapshot>
+    """
+    path = os.path.abspath(configFile)
+    try:
+        stat  = os.stat(path)
+        stamp = (stat.st_mtime, stat.st_size)
+    except OSError:
+        return ConfigSnapshot(configFile, {})
+
+    _lock.acquire()
+    try:
+        cached = _cache.get(path)
+        if cached and cached[0] == stamp: return cached[1]
+        snap = _read(configFile)
+        _cache[path] = (stamp, snap)
+        return snap
+    finally:
+        _lock.release()
+
+
+def clear():
+    """Empty the cache."""
+    _lock.acquire()
+    try: _cache.clear()
+    finally: _lock.release()
+    return
+
+
+def _read(configFile):
+    conf = configparser()
+    conf.read(configFile)
+    sections = {}
+    for section in conf.sections():
+        sections[section] = OrderedDict(conf.items(section))
+    return ConfigSnapshot(configFile, sections)
@@ -22,7 +22,7 @@ mount point is for UBCO Signals Laboratory, /srv partition mounted on
 
 import os
 
-from ConfigParser import SafeConfigParser as configparser
+from mddb.config.cfgSnapshot import snapshot
 
 class MDDBEnv(object):
 
@@ -41,6 +41,29 @@ class MDDBEnv(object):
         self.schema     = None
         self.collection = None
 
+        self.executable     = None
+        self.executeLimit   = 4
+        self.executeTimeout = 0
+
+        self.cache        = None
+        self.cacheMaxSize = 256
+        self.cacheMaxAge  = 30
+
+        self.validateStore    = 'files'
+        self.validateDatabase = None
+        self.validateCommit   = 100
+
+        self.writeSync = 0
+
+        self.storeBackend   = 'files'
+        self.storeDirectory = None
+        self.storeSegment   = 64
+
+        self.watchDirs     = []
+        self.watchQuiet    = 2.0
+        self.watchInterval = 1.0
+
+        self.serveSocket   = None
 
     def configure(self, configFile):
         """Caller passes a config file.  Method modifies database connection
@@ -54,10 +77,10 @@ class MDDBEnv(object):
         return:     <void>,   configured instance attributes
         """
 
-        conf = configparser()
-        conf.read(configFile)
+        conf = snapshot(configFile)
 
         self.configFile = configFile
+        self.config     = conf
 
         self.CONFIG   = conf.get('dqs_dirs','config')
         self.DATASETS = conf.get('dqs_dirs','datasets')
@@ -66,6 +89,62 @@ class MDDBEnv(object):
         self.VALIDATE = conf.get('dqs_dirs','validate')
         self.logs     = conf.get('dqs_dirs','logs')
         self.scripts  = conf.get('dqs_dirs','scripts')
+
+        # Override cache directory, size limit, MB, and entry age limit, days.
+        if conf.has_option('dqs_dirs','cache'):
+            self.cache = conf.get('dqs_dirs','cache')
+        else:
+            self.cache = os.path.join(conf.get('dqs_dirs','dqs'),'cache')
+        if conf.has_option('cache','maxsize'):
+            self.cacheMaxSize = conf.getfloat('cache','maxsize')
+        if conf.has_option('cache','maxage'):
+            self.cacheMaxAge  = conf.getfloat('cache','maxage')
+
+        # Validation reports, as 'files' in VALIDATE or an 'sqlite' database,
+        # written commit reports at a time.
+        if conf.has_option('validate','store'):
+            self.validateStore = conf.get('validate','store').lower()
+        if conf.has_option('validate','database'):
+            self.validateDatabase = conf.get('validate','database')
+        else:
+            self.validateDatabase = os.path.join(self.VALIDATE,'validation.sqlite')
+        if conf.has_option('validate','commit'):
+            self.validateCommit = conf.getint('validate','commit')
+        if self.validateStore not in ('files','sqlite'):
+            raise ValueError, "Unknown validate store: "+self.validateStore
+
+        # Files written per group fsync, 0 for none.
+        if conf.has_option('write','sync'):
+            self.writeSync = conf.getint('write','sync')
+
+        # Header copies, overrides and validation reports, as 'files' or
+        # packed into 'segments' of segment MB. See utils.segmentStore.
+        if conf.has_option('store','backend'):
+            self.storeBackend = conf.get('store','backend').lower()
+        if conf.has_option('store','directory'):
+            self.storeDirectory = conf.get('store','directory')
+        else:
+            self.storeDirectory = os.path.join(conf.get('dqs_dirs','dqs'),'segments')
+        if conf.has_option('store','segment'):
+            self.storeSegment = conf.getfloat('store','segment')
+        if self.storeBackend not in ('files','segments'):
+            raise ValueError, "Unknown store backend: "+self.storeBackend
+
+        # dbinsert --watch directories, debounce and poll intervals, secs.
+        if conf.has_option('watch','dirs'):
+            self.watchDirs = conf.get('watch','dirs').split()
+        else:
+            self.watchDirs = [self.DATASETS, self.HEADERS]
+        if conf.has_option('watch','quiet'):
+            self.watchQuiet = conf.getfloat('watch','quiet')
+        if conf.has_option('watch','interval'):
+            self.watchInterval = conf.getfloat('watch','interval')
+
+        # dbinsert --serve socket.
+        if conf.has_option('serve','socket'):
+            self.serveSocket = conf.get('serve','socket')
+        else:
+            self.serveSocket = os.path.join(conf.get('dqs_dirs','dqs'),'mddb.sock')
         
         self.server     = conf.get('database','server')
         self.database   = conf.get('database','database')
@@ -74,6 +153,13 @@ class MDDBEnv(object):
 
         self.executable = conf.get('execute','executable')
 
+        # Concurrent fits2caom process limit and per process timeout, secs.
+        # A timeout of 0 is none.
+        if conf.has_option('execute','limit'):
+            self.executeLimit   = conf.getint('execute','limit')
+        if conf.has_option('execute','timeout'):
+            self.executeTimeout = conf.getfloat('execute','timeout')
+
         # Providing CAOM configuration ('.config') and defaults ('.defaults')
         # files, found respectively under DQS/CONFIG, DQS/DEFAULTS.
 
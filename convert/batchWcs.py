@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.convert.batchWcs.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Array versions of the WCS conversions of converters, for the WCS inputs of
+many headers at once,
+
+    cdMatrices()   -- converters.computeMatrix()
+    geocentric()   -- converters.llh2XYZ()
+    decimalizeAll()-- converters.decimalize()
+    raDegrees()    -- converters.decimalize(converters.formatRA(ra))*15
+
+NumPy is used when it can be imported and there are at least MIN_VECTOR
+inputs; otherwise the scalar converters are applied in turn. Either way the
+results are lists of Python floats, the same as those of the scalar functions
+but for rounding in the NumPy trigonometric functions.
+
+rUtils.runBatch() collects the WCS inputs of every header of a batch, as the
+wcsInputs() of the insert classes read them, and solve() converts them all in
+one call of each array function. Each header gets back a WcsTable of its own
+results, which the insert stages look up by input value. An input not in the
+table, eg. one changed by an earlier stage, is converted by the scalar
+function, so a table never changes an override.
+
+eg.,
+
+>>> cdMatrices([-2.7e-05, -1.0e-03], [2.7e-05, 1.0e-03])
+[[-2.7e-05, -0.0, -0.0, 2.7e-05], [-0.001, -0.0, -0.0, 0.001]]
+>>> decimalizeAll(['+0.0.1.0', '-43.01.08.90'])
+[0.0002777777777777778, -43.01913888888889]
+>>> tables = solve([{'cd': [(-2.7e-05, 2.7e-05, 0.0)]}, {'deg': ['+0.0.1.0']}])
+>>> tables[1].decimalize('+0.0.1.0')
+0.0002777777777777778
+"""
+# ------------------------------------------------------------------------------
+
+from converters import computeMatrix, llh2XYZ, decimalize, formatRA
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below this many inputs the scalar functions are quicker
+MIN_VECTOR = 32
+
+# WGS84, as converters.llh2XYZ()
+_A  = 6378137.0
+_FL = 0.00335281066475
+
+
+def vectorized(n):
+    """True if n inputs would be computed with NumPy."""
+    return numpy is not None and n >= MIN_VECTOR
+
+
+def cdMatrices(cdelt1, cdelt2, rho=None):
+    """CD matrices of sequences of CDELT1, CDELT2 and rotation angles, deg.
+
+    parameters: <list>, <list>, <list>, cdelt1s, cdelt2s, rotations, default 0
+    return:     <list>, list of [cd11, cd12, cd21, cd22] lists
+    """
+    if rho is None: rho = [0.0]*len(cdelt1)
+    _sameLength(cdelt1, cdelt2, rho)
+    if not vectorized(len(cdelt1)):
+        return [computeMatrix(c1, c2, r) for c1, c2, r in zip(cdelt1, cdelt2, rho)]
+    c1   = numpy.asarray(cdelt1, dtype=float)
+    c2   = numpy.asarray(cdelt2, dtype=float)
+    rads = numpy.radians(numpy.asarray(rho, dtype=float))
+    cosr = numpy.cos(rads)
+    sinr = numpy.sin(rads)
+    return numpy.column_stack((c1*cosr, -1*c2*sinr, c1*sinr, c2*cosr)).tolist()
+
+
+def geocentric(lat, lon, h):
+    """ITRF geocentric X, Y, Z (m) of sequences of geodetic latitudes,
+    longitudes (rad) and heights (m), as converters.llh2XYZ().
+
+    parameters: <list>, <list>, <list>, lats, lons, heights
+    return:     <tuple>, lists of X, Y, Z
+    """
+    _sameLength(lat, lon, h)
+    if not vectorized(len(lat)):
+        xyz = [llh2XYZ(la, lo, hi) for la, lo, hi in zip(lat, lon, h)]
+        return [p[0] for p in xyz], [p[1] for p in xyz], [p[2] for p in xyz]
+    lat = numpy.asarray(lat, dtype=float)
+    lon = numpy.asarray(lon, dtype=float)
+    h   = numpy.asarray(h, dtype=float)
+
+    flatfn  = (2.0 - _FL)*_FL
+    funsq   = (1.0 - _FL)*(1.0 - _FL)
+    sin_lat = numpy.sin(lat)
+    g1 = _A / numpy.sqrt(1.0 - flatfn * sin_lat*sin_lat)
+    g2 = g1 * funsq + h
+    g1 = g1 + h
+    X  = g1 * numpy.cos(lat)
+    return (X*numpy.cos(lon)).tolist(), (X*numpy.sin(lon)).tolist(), \
+        (g2*sin_lat).tolist()
+
+
+def decimalizeAll(deltaStrings):
+    """Decimal degrees of a sequence of [+-]deg.min.sec strings. Raises
+    ValueError on the first unsigned or malformed string, as decimalize().
+
+    parameters: <list>, increment strings
+    return:     <list>, decimal degrees
+    """
+    if not vectorized(len(deltaStrings)):
+        return [decimalize(delta) for delta in deltaStrings]
+    degs, mins, secs, signs = [], [], [], []
+    for delta in deltaStrings:
+        vals = delta.split('.')
+        if delta[0] not in '+-': raise ValueError, 'Unrecognized increment value.'
+        degs.append(abs(float(vals[0])))
+        mins.append(float(vals[1]))
+        secs.append(float(vals[2]+'.'+vals[3].strip(',')))
+        signs.append(delta[0] == '-' and -1.0 or 1.0)
+    dmin = numpy.asarray(mins) + numpy.asarray(secs)/60
+    ddeg = numpy.asarray(degs) + dmin/60
+    return (ddeg*numpy.asarray(signs)).tolist()
+
+
+def raDegrees(raStrings):
+    """Decimal degrees of a sequence of HH:MM:SS.sss right ascensions, as
+    __setCRVALS of the CASA Image insert.
+
+    parameters: <list>, RA strings
+    return:     <list>, decimal degrees
+    """
+    decimal = decimalizeAll([formatRA(ra) for ra in raStrings])
+    if not vectorized(len(decimal)): return [d*15 for d in decimal]
+    return (numpy.asarray(decimal)*15).tolist()
+
+
+class WcsTable(object):
+
+    def __init__(self):
+        """The WCS conversions of one header, by input value, as solve()
+        returns. Each lookup falls back to the scalar converter for an input
+        not in the table.
+        """
+        self.matrices  = {}
+        self.positions = {}
+        self.degrees   = {}
+        self.ras       = {}
+
+    def __len__(self):
+        return len(self.matrices) + len(self.positions) + len(self.degrees) + \
+            len(self.ras)
+
+    def cdMatrix(self, cdelt1, cdelt2, rho=0):
+        """As converters.computeMatrix()."""
+        matrix = self.matrices.get((cdelt1, cdelt2, rho))
+        if matrix is None: matrix = computeMatrix(cdelt1, cdelt2, rho)
+        return matrix
+
+    def geocentric(self, lat, lon, h):
+        """As converters.llh2XYZ()."""
+        xyz = self.positions.get((lat, lon, h))
+        if xyz is None: xyz = llh2XYZ(lat, lon, h)
+        return xyz
+
+    def decimalize(self, deltaString):
+        """As converters.decimalize()."""
+        degrees = self.degrees.get(deltaString)
+        if degrees is None: degrees = decimalize(deltaString)
+        return degrees
+
+    def raDegrees(self, raString):
+        """As converters.decimalize(converters.formatRA(raString))*15."""
+        degrees = self.ras.get(raString)
+        if degrees is None: degrees = decimalize(formatRA(raString))*15
+        return degrees
+
+
+def solve(inputs):
+    """Convert the WCS inputs of many headers, with one call of each array
+    function. The inputs of a header are a dict of lists, any of,
+
+        'cd':    (cdelt1, cdelt2, rho) float 3-tuples
+        'geo':   (lat, lon, h) float 3-tuples
+        'deg':   [+-]deg.min.sec strings
+        'ra':    HH:MM:SS.sss strings
+        'cdDeg': (cdelt1, cdelt2) pairs of [+-]deg.min.sec strings, for the
+                 CD matrix of their decimal degrees, unrotated
+
+    An input the scalar converter would refuse is left out of the tables,
+    to raise in its own header's stage.
+
+    parameters: <list>, list of WCS input dicts, one per header
+    return:     <list>, list of WcsTables, in the order of inputs
+    """
+    deltas = _unique([s for i in inputs for s in i.get('deg', [])] +
+                     [s for i in inputs for pair in i.get('cdDeg', []) for s in pair])
+    degrees = _convert(decimalizeAll, deltas)
+    ras     = _convert(raDegrees, _unique([s for i in inputs for s in i.get('ra', [])]))
+
+    cds = [cd for i in inputs for cd in i.get('cd', [])]
+    for i in inputs:
+        for cdelt1, cdelt2 in i.get('cdDeg', []):
+            if cdelt1 in degrees and cdelt2 in degrees:
+                cds.append((degrees[cdelt1], degrees[cdelt2], 0))
+    cds = _unique(cds)
+    matrices = dict(zip(cds, cdMatrices([cd[0] for cd in cds], [cd[1] for cd in cds],
+                                        [cd[2] for cd in cds])))
+
+    llhs = _unique([llh for i in inputs for llh in i.get('geo', [])])
+    X, Y, Z = geocentric([p[0] for p in llhs], [p[1] for p in llhs],
+                         [p[2] for p in llhs])
+    positions = dict(zip(llhs, zip(X, Y, Z)))
+
+    tables = []
+    for i in inputs:
+        table = WcsTable()
+        for cd in i.get('cd', []): table.matrices[cd] = matrices[cd]
+        for llh in i.get('geo', []): table.positions[llh] = positions[llh]
+        for delta in i.get('deg', []):
+            if delta in degrees: table.degrees[delta] = degrees[delta]
+        for ra in i.get('ra', []):
+            if ra in ras: table.ras[ra] = ras[ra]
+        for pair in i.get('cdDeg', []):
+            if pair[0] not in degrees or pair[1] not in degrees: continue
+            cd = (degrees[pair[0]], degrees[pair[1]], 0)
+            table.matrices[cd] = matrices[cd]
+            for delta in pair: table.degrees[delta] = degrees[delta]
+        tables.append(table)
+    return tables
+
+
+def _convert(arrayFunc, values):
+    # {value: result} of arrayFunc over values, less any value it refuses
+    try:
+        return dict(zip(values, arrayFunc(values)))
+    except (ValueError, IndexError):
+        pass
+    good = []
+    for value in values:
+        try: arrayFunc([value])
+        except (ValueError, IndexError): continue
+        good.append(value)
+    return dict(zip(good, arrayFunc(good)))
+
+
+def _unique(values):
+    seen = set()
+    return [v for v in values if not (v in seen or seen.add(v))]
+
+
+def _sameLength(*seqs):
+    if len(set([len(seq) for seq in seqs])) > 1:
+        raise ValueError, "Input sequences differ in length."
+    return
@@ -18,7 +18,7 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 #-------------------------------------------------------------------------------
 
 
-from math    import sqrt, sin, cos
+from math    import sqrt, sin, cos, radians
 from keymaps import ctypeMap, projectionMap
 
 
@@ -120,6 +120,21 @@ def llh2XYZ(lat, lon, h):
     return X,Y,Z
 
 
+def computeMatrix(cdelt1, cdelt2, rho=0):
+    """Compute the Coordinate Description matrix. Caller passes
+    three arguments: CDELT1, CDELT2, CROTA2, the rotation angle if 
+    any.
+    
+    parameters: <float>, <float>, <float>
+    return:     <list>, list of four (4) CD matrix values (floats).
+    """
+    cd11 = cdelt1*cos(radians(rho))
+    cd12 = -1*cdelt2*sin(radians(rho))
+    cd21 = cdelt1*sin(radians(rho))
+    cd22 = cdelt2*cos(radians(rho))
+    return [cd11,cd12,cd21,cd22]
+
+
 def revertFrequency(fval, unit):
     """Revert a frequency value in 'unit' measure to pure
     Hz value, where 'unit' may be one of
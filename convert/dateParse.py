@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                      mddb.convert.dateParse.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Observation date parsing for the insert classes. Date values of the forms
+
+    yyyy-mm-dd[Thh:mm[:ss[.sss]]][Z]    ISO 8601, as FITS DATE-OBS
+    yyyy-mm-dd.ddd                      fractional day
+    dd/mm/yy                            legacy FITS, 19yy
+
+are converted to MJD, cached on the value string. bestTime() picks the time
+source of a header from its observation date keywords, in one pass of
+
+    MJD-OBS, DATE-OBS       the first of these in the header
+    MJD-BEG, DATE-BEG       "
+    OBSDATE
+    DATE                    the date the HDU was written, a last resort
+
+The MJD keywords are taken as numbers, the others parsed as dates.
+
+eg.,
+
+>>> dateMjd("'2011-09-10T18:28:58.511999'")
+55814.7701216666
+>>> dateMjd('10/09/94')
+49605.0
+>>> dateMjds(['2011-09-10.5', 'yesterday'])
+[55814.5, None]
+"""
+# ------------------------------------------------------------------------------
+
+import re
+
+from mjdConversions import modified_julian_date
+
+# Time source keywords, in groups of equal preference.
+fitsTimeKeys = [('MJD-OBS', 'DATE-OBS'), ('MJD-BEG', 'DATE-BEG'), ('OBSDATE',),
+                ('DATE',)]
+casaTimeKeys = [('MJD-OBS', 'DATE-OBS-MJD', 'DATE-OBS'), ('MJD-BEG', 'DATE-BEG'),
+                ('OBSDATE',), ('DATE',)]
+
+# Keywords whose values are MJDs.
+mjdKeys = ['MJD-OBS', 'MJD-BEG', 'DATE-OBS-MJD']
+
+# Most date strings converted are kept, to this many.
+MEMO_SIZE = 8192
+
+_isoRe    = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})"
+                       r"(?:[T ](\d{1,2}):(\d{1,2})(?::(\d{1,2}(?:\.\d*)?))?)?Z?$")
+_fracRe   = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(\.\d*)$")
+_legacyRe = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2})$")
+
+_MONTH_DAYS = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+_memo = {}
+
+
+class DateParseError(ValueError):
+    """A date value of no recognized form."""
+
+
+def dateMjd(value):
+    """Return the MJD of a date string, memoized on the string. Raises
+    DateParseError if the string is of no recognized form.
+
+    parameters: <string>, date value, quoted or not
+    return:     <float>,  MJD
+    """
+    try: return _memo[value]
+    except KeyError: pass
+
+    date = value.strip().strip("'").strip()
+    iso  = _isoRe.match(date)
+    if iso:
+        year, month, day, hour, minute, second = iso.groups()
+        _assertDate(value, year, month, day, hour, minute, second)
+        mjd = modified_julian_date(year, month, day, hour or 0, minute or 0,
+                                   second or '0.0')
+    else:
+        frac   = _fracRe.match(date)
+        legacy = _legacyRe.match(date)
+        if frac:
+            year, month, day, fday = frac.groups()
+            _assertDate(value, year, month, day)
+            mjd = modified_julian_date(year, month, day) + float('0'+fday)
+        elif legacy:
+            day, month, year = legacy.groups()
+            _assertDate(value, 1900+int(year), month, day)
+            mjd = modified_julian_date(1900+int(year), month, day)
+        else:
+            raise DateParseError("Unrecognized date value: "+value)
+
+    if len(_memo) >= MEMO_SIZE: _memo.clear()
+    _memo[value] = mjd
+    return mjd
+
+
+def dateMjds(values):
+    """Return the MJDs of a column of date strings, None where a value is not
+    recognized.
+
+    parameters: <list>, date values
+    return:     <list>, MJDs
+    """
+    mjds = []
+    for value in values:
+        try: mjds.append(dateMjd(value))
+        except DateParseError: mjds.append(None)
+    return mjds
+
+
+def bestTime(lines, timeKeys=fitsTimeKeys):
+    """Pick the observation time source of a header. Groups of timeKeys are
+    tried in turn; within a group the first card in the header which gives
+    an MJD is taken.
+
+    parameters: <Header>, <list>, header, groups of time keywords
+    return:     <tuple>, (card, mjd, rejected), where card is None if no
+                source is found, and rejected lists (keyword, value) of the
+                time cards whose values are not understood, in header order
+    """
+    rejected = []
+    for group in timeKeys:
+        cards = lines.ordered([lines.cardOf(key) for key in group if lines.has(key)])
+        for card in cards:
+            try:
+                if card.keyword in mjdKeys: mjd = card.number()
+                else: mjd = dateMjd(card.string())
+            except ValueError:
+                rejected.append((card.keyword, card.raw))
+                continue
+            return card, mjd, rejected
+    return None, None, rejected
+
+
+def _monthDays(year, month):
+    # days in the month; Julian leap years on or before 1582, as
+    # modified_julian_date()
+    if month != 2: return _MONTH_DAYS[month-1]
+    if year % 4: return 28
+    if year > 1582 and not year % 100 and year % 400: return 28
+    return 29
+
+
+def _assertDate(value, year, month, day, hour=None, minute=None, second=None):
+    if not 1 <= int(month) <= 12 or \
+            not 1 <= int(day) <= _monthDays(int(year), int(month)) or \
+            (hour and int(hour) > 23) or (minute and int(minute) > 59) or \
+            (second and float(second) >= 61):
+        raise DateParseError("Date out of range: "+value)
+    return
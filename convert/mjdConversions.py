@@ -125,6 +125,31 @@ def julian_date(year,month,day,hour,minute,second):
   return MJD0 + mjdmidnight + fracofday
 
 
+def modified_julian_date(year,month,day,hour=0,minute=0,second=0.0):
+  """Given year, month, day, hour, minute and second return MJD, by direct
+  arithmetic. The result is exactly julian_date(...) - MJD0, including the
+  rounding of a float ``second`` through str(), and the switch from the
+  Julian to the Gregorian calendar after 1582 October 4.
+  """
+  year, month, day, hour, minute =\
+  int(year),int(month),int(day),int(hour),int(minute)
+
+  if month <= 2:
+    month += 12
+    year  -= 1
+
+  if 10000*year+100*month+day <= 15821004:
+    b = -2 + (year+4716)//4 - 1179
+  else:
+    b = year//400 - year//100 + year//4
+
+  mjdmidnight = 365*year - 679004 + b + int(30.6001*(month+1)) + day
+
+  fracofday = float(abs(hour)) + abs(minute)/60.0 + abs(float(str(second)))/3600.0
+  if hour < 0: fracofday = -fracofday
+  return MJD0 + mjdmidnight + fracofday/24.0 - MJD0
+
+
 def caldate(mjd):
   """Given mjd return calendar date. 
 
@@ -16,6 +16,9 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 
 checkFitsKeys = [ 'OBJECT', 'INSTRUME', 'TELESCOP', 'OBSERVER' ]
 
+# commentary cards, dropped by keyword as a FITS header is read
+commentaryKeys = [ 'COMMENT', 'HISTORY' ]
+
 setFitsKeys = {
     'OBJECT'   : 'OBJECT  =               Unknown /mddb insert',
     'OBSERVER' : 'OBSERVER=               Unknown /mddb insert',
@@ -26,6 +29,34 @@ setFitsKeys = {
     'GMRT_INS' : 'INSTRUME=                  GMRT /mddb insert'
     }
 
+# Remediation rules of checkFitsKeys, applied by utils.ruleEngine.RuleSet. Of
+# the rules of a keyword, the first whose conditions hold is applied; missing
+# keywords are inserted at line insertAt.
+#
+#   (keyword, when, action, line, message)
+
+insertAt = 3
+
+_interpolated = ('WARN: ', 'Interpolated value: %(line)s')
+
+fitsRules = [
+    ('OBJECT',   (('OBJECT', 'absent'),),
+                 'insert', setFitsKeys['OBJECT'], None),
+    ('INSTRUME', (('INSTRUME', 'absent'), ('OBJECT', 'contains', 'GALFACT')),
+                 'insert', setFitsKeys['INS_GALFA'], _interpolated),
+    ('INSTRUME', (('INSTRUME', 'absent'), ('TELESCOP', 'present')),
+                 'insert', 'INSTRUME=                  %(TELESCOP)s /mddb insert',
+                 ('WARN: ', 'INSTRUME set to %(TELESCOP)s')),
+    ('INSTRUME', (('INSTRUME', 'absent'),),
+                 'insert', setFitsKeys['INSTRUME'], None),
+    ('TELESCOP', (('TELESCOP', 'absent'), ('OBJECT', 'contains', 'GALFACT')),
+                 'insert', setFitsKeys['TEL_GALFA'], _interpolated),
+    ('TELESCOP', (('TELESCOP', 'absent'),),
+                 'insert', setFitsKeys['TELESCOP'], None),
+    ('OBSERVER', (('OBSERVER', 'absent'),),
+                 'insert', setFitsKeys['OBSERVER'], None),
+    ]
+
 directionCodes  = ['RA', 'DEC', 'GLON', 'GLAT', 'ELON', 'ELAT']
 
 projectionCodes = ['DEF','AZP','TAN','SIN','STG','ARC','ZPN','ZEA','AIR','CYP',
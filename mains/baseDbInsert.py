@@ -20,20 +20,40 @@ metadata database (MDDB).
 
 import os
 
-from subprocess import Popen, CalledProcessError, PIPE, STDOUT
-from shutil     import copyfile
 from datetime   import date
 
 from mddb import mddbVersion
 
-from mddb.db     import confirmKeys
 from mddb.config import mddbEnv
-from mddb.utils  import f2cArgs
+from mddb.utils  import atomicFile
+from mddb.utils  import fitsReader
+from mddb.utils  import mtypeRegistry
+from mddb.utils.header import Header
+
+# The store, cache, profile and fits2caom modules are imported where used,
+# and only for the [validate] store, [store] backend and switches set, so a
+# single dataset insert loads no more than it needs.
+
+
+def overrideKeys(lines):
+    """Return the set of keywords of override lines, the text before '='.
+
+    parameters: <list>, override lines, or an open override file
+    return:     <set>
+    """
+    return set([line.partition('=')[0].strip() for line in lines])
 
 
 class BaseDbInsert(object):
 
-    def __init__(self, configFile, verbose):
+    # instance attributes set by configureOverride(), kept with a cached
+    # override.
+    cachedAttributes = ('ndims',)
+
+    # MIME-type of the subclass, its key in utils.mtypeRegistry
+    mtype = None
+
+    def __init__(self, configFile, verbose, cache=True, profile=False):
         """Constructor for the base insert class. Builds the environment.
         The datasetType is determined by an upper layer, and the appropriate
         subclass is called.  This class should be not be called directly.
@@ -41,48 +61,121 @@ class BaseDbInsert(object):
         That is up to the apprpriate subclass and is based on the datasetType,
         i.e. FITS, CASA Image, UVFITS, UV MS. Each of these types will be
         provided a specific subclass in this package.
+
+        Built overrides are kept in an overrideCache.OverrideCache, unless
+        cache is False. If profile is True, each buildOverride() records the
+        stages of configureOverride() in a stageProfile.StageProfile, as
+        self.profile. A batch may set self.wcs, a batchWcs.WcsTable of the
+        WCS conversions of the next header, computed with those of others.
+
+        Validation reports go to a validStore.ValidStore when the [validate]
+        store is 'sqlite', as self.validStore; otherwise to VALIDATE files.
+        Files are written by atomicFile, fsync'ed in groups of [write] sync,
+        through self.syncGroup. Header copies are archived in a
+        headerStore.HeaderStore, as self.headerStore. When the [store]
+        backend is 'segments', header copies, overrides and validation
+        reports are instead appended to a segmentStore.SegmentStore, as
+        self.segments. Each of these modules is imported only when used.
         """
         self.verbose = verbose
         self.validationMsg  = []
         self.configFile = configFile
         self.dbEnv = mddbEnv.MDDBEnv()
         self.dbEnv.configure(configFile)
+        self.cache = None
+        self.wcs   = None
+        if cache:
+            from mddb.utils import overrideCache
+            self.cache = overrideCache.OverrideCache(self.dbEnv)
+        self.profiling = profile
+        self.profile   = None
+        self.override  = None
+        self.validStore = None
+        if self.dbEnv.validateStore == 'sqlite':
+            from mddb.utils import validStore
+            self.validStore = validStore.openStore(self.dbEnv.validateDatabase,
+                                                   self.dbEnv.validateCommit)
+        self.syncGroup = atomicFile.syncGroup(self.dbEnv.writeSync)
+        self.headerStore = None
+        self.segments = None
+        if self.dbEnv.storeBackend == 'segments':
+            from mddb.utils import segmentStore
+            self.segments = segmentStore.openStore(self.dbEnv.storeDirectory,
+                                                   self.dbEnv.storeSegment)
 
     def buildOverride(self, header, uri, public):
         """This method receives a filename as a path to a textual header file,
         and a URI to the described data resource. The file must be either a
         pure header or a header as produced by the metaData package.
         The file can have an arbitrary location, but the buildOverride() method
-        will put a copy in the MDDBEnv.HEADERS directory as a matter of record.
+        will put a copy in the MDDBEnv.HEADERS directory as a matter of record,
+        through self.headerStore, which skips the copy of an unchanged header.
         Method will build a full override file ready for MDDB insertion. If
         no path is given to the header, and the file is not found in '.',
         the MDDBEnv.DATASETS directory is applied. The public parameter is a 
         boolean indicating public access or not.
 
+        The file may also be a FITS file proper. Only its primary header is
+        read, and written to MDDBEnv.HEADERS as the '.hdr' metaData would
+        write, eg. m100.fits --> m100.fits.hdr. The data are not copied.
+
         parameters: <string>, <string>, <bool> header name, uri, public
         return:     <string>, string indicating file written
         """
 
+        # Instances may be reused over many datasets, eg. by rUtils.runBatch()
+        self.validationMsg = []
+        self.profile       = None
+        self.override      = None
+
         fpath, fname = os.path.split(header)
-        overrideName = os.path.splitext(fname)[0]+".override"
-        newHdr       = os.path.join(self.dbEnv.HEADERS,fname)
+        source       = None
 
         if not fpath:
             if os.path.isfile(header):
-                copyfile(header,newHdr)
+                source = header
             elif os.path.isfile(os.path.join(self.dbEnv.DATASETS,fname)):
-                    copyfile(os.path.join(self.dbEnv.DATASETS,fname),newHdr)
+                source = os.path.join(self.dbEnv.DATASETS,fname)
+            elif self.segments and self.segments.has('header',fname) and \
+                    not os.path.isfile(os.path.join(self.dbEnv.HEADERS,fname)):
+                self.segments.export('header',fname,self.dbEnv.HEADERS)
             else:
-                if not os.path.isfile(newHdr):
+                if not os.path.isfile(os.path.join(self.dbEnv.HEADERS,fname)):
                    raise IOError, "Cannot find header: "+fname
                 else: pass
         else: 
-            copyfile(header,newHdr)
+            source = header
+
+        if source and fitsReader.isFits(source):
+            fname  = fname+".hdr"
+            newHdr = os.path.join(self.dbEnv.HEADERS,fname)
+            ncards = fitsReader.writeHeader(source,newHdr,self.syncGroup)
+            if self.verbose:
+                print "Read",ncards,"primary header cards from",source
+        elif source and self.segments:
+            # the header is configured from source, its copy kept in a segment
+            newHdr = source
+            hfob = open(source)
+            try: self.segments.put('header',fname,hfob.read(),self.syncGroup)
+            finally: hfob.close()
+        else:
+            newHdr = os.path.join(self.dbEnv.HEADERS,fname)
+            if source: self.__headerStore().archive(source,fname)
+        overrideName = os.path.splitext(fname)[0]+".override"
 
-        overrideLines = self.configureOverride(newHdr,uri, public)
-        self.signature(overrideLines)
+        if self.profiling:
+            from mddb.utils import stageProfile
+            self.profile = stageProfile.StageProfile(newHdr, self.__class__.__name__)
+        overrideLines = self.__cachedOverride(newHdr, uri, public)
+        if overrideLines is not None:
+            if self.profile: self.profile.cached = True
+        else:
+            overrideLines = self.configureOverride(newHdr,uri, public)
+            self.signature(overrideLines)
+            self.__cacheOverride(overrideLines)
         if self.verbose: self.printOverride(overrideLines)
         ofile = self.writeOverride(overrideLines,overrideName)
+        self.override = (ofile, overrideLines)
         if self.verbose:
             print "\nWrote override file:\t",os.path.join(self.dbEnv.OVERRIDE,ofile)
         return ofile
@@ -101,50 +194,120 @@ class BaseDbInsert(object):
         raise NotImplementedError, err
         return
 
+    def wcsInputs(self, header):
+        """Read the WCS inputs of a header, as batchWcs.solve() takes them,
+        without building or writing anything. The header is looked for as
+        buildOverride() looks for it, but not in a segment store. The batch
+        results are set as self.wcs, a batchWcs.WcsTable, for the stages of
+        configureOverride() to look up.
+
+        parameters: <string>, header name
+        return:     <dict>, WCS inputs, empty if the header is not found
+        """
+        fpath, fname = os.path.split(header)
+        if fpath or os.path.isfile(header): path = header
+        elif os.path.isfile(os.path.join(self.dbEnv.DATASETS,fname)):
+            path = os.path.join(self.dbEnv.DATASETS,fname)
+        else: path = os.path.join(self.dbEnv.HEADERS,fname)
+        if not os.path.isfile(path): return {}
+        if fitsReader.isFits(path): return self.readWcsInputs(fitsReader.readHeader(path))
+        hfob = open(path)
+        try: return self.readWcsInputs(hfob.readlines())
+        finally: hfob.close()
+
+    def readWcsInputs(self, lines):
+        """The WCS inputs of header lines, for wcsInputs(). Subclasses with
+        WCS conversions in configureOverride() implement this.
+
+        parameters: <list>, header lines
+        return:     <dict>, WCS inputs, as batchWcs.solve()
+        """
+        return {}
+
+    def stage(self, func, *args):
+        """Run one stage of configureOverride(), func(*args), recorded in
+        self.profile when profiling.
+
+        parameters: <callable>, stage method, its arguments
+        return:     the return of func
+        """
+        if self.profile is None: return func(*args)
+        return self.profile.run(func, *args)
+
+    def writeProfile(self, collid):
+        """Write the stage profile of the last buildOverride() as JSON to
+        $DQS/logs/<collid>.profile.json.
+
+        parameters: <string>, collection id
+        return:     <string>, profile file name, or None if not profiling
+        """
+        if self.profile is None: return None
+        if not os.path.isdir(self.dbEnv.logs): os.makedirs(self.dbEnv.logs)
+        pfile = os.path.join(self.dbEnv.logs, collid+".profile.json")
+        self.profile.write(pfile)
+        if self.verbose: print "Wrote stage profile:\t",pfile
+        return pfile
+
     def signature(self, olines):
         """Add a data engineering signature."""
         olines.append("ENGINEER=\t\t"+ mddbVersion.pkg_name +" v"+mddbVersion.version)
         return
 
-    def confirmOverride(self, ofile, ftype):
+    def confirmOverride(self, ofile, ftype, lines=None):
         """This method confirms the presence of keyword subsets for each data type, 
         FITS, CASA Image, UVFits, and UV MS. The method should return True on successful
         testing, or the filename of a validation error/warning file.
 
-        parameters: <string>, <string>, <string>, override fileaname, filetype, collid
-        return:     <void>
+        The keywords are taken from lines, a list of override lines or a
+        Header, if passed. Otherwise, if ofile is the override just written by
+        buildOverride(), from the override lines in memory, or else from the
+        file itself.
+
+        parameters: <string>, <string>, <list>|<Header>, override fileaname, filetype, lines
+        return:     <list>, list of validation message types
         """
         confirmErr  = "VO compliance metadata not found: "
-        keysActual  = []
-        keysMissing = []
         messageTypes= []
 
-        if ftype == 'image/fits-image':
-            checkKeys = confirmKeys.requireFITSKeys
-        elif ftype == 'image/ms-image':
-            checkKeys = confirmKeys.requireCASAKeys
-        elif ftype == 'image/fits-uvw':
-            raise NotImplementedError
-        elif ftype == 'image/ms-uvw':
-            raise NotImplementedError
-
-        olines = open(ofile).readlines()
-        for line in olines:
-            keysActual.append(line.split('=',1)[0].strip())
-
-        for ckey in checkKeys:
-            try: assert(ckey in keysActual)
-            except AssertionError:
-                keysMissing.append(ckey)
-                continue
-        if keysMissing:
-            for key in keysMissing:
+        checkKeys = mtypeRegistry.handler(ftype).requiredKeys()
+
+        if lines is None and self.override and self.override[0] == ofile:
+            lines = self.override[1]
+        if lines is None and self.segments and not os.path.isfile(ofile):
+            lines = self.segments.get('override',os.path.basename(ofile))
+            if lines is None: raise IOError, "Cannot find override: "+ofile
+            lines = lines.splitlines()
+        if lines is None:
+            ofob = open(ofile)
+            try: keysActual = overrideKeys(ofob)
+            finally: ofob.close()
+        elif isinstance(lines, Header):
+            keysActual = lines.index
+        else:
+            keysActual = overrideKeys(lines)
+
+        for key in checkKeys:
+            if key not in keysActual:
                 self.validationMsg.append(("ERROR:",confirmErr+key))
         for msgType,msg in self.validationMsg:
             messageTypes.append(msgType.strip())
         vfile = self.writeValidation(ofile)
         return messageTypes
 
+    def confirmOverrides(self, ofiles, ftype):
+        """Confirm existing override files in bulk, read from disk, each
+        with its own validation file.
+
+        parameters: <list>, <string>, override file names, filetype
+        return:     <dict>, override file name to list of validation message types
+        """
+        confirmed = {}
+        for ofile in ofiles:
+            self.validationMsg = []
+            self.override      = None
+            confirmed[ofile]   = self.confirmOverride(ofile, ftype)
+        return confirmed
+
     def printOverride(self, lines):
         """Print the override lines to stdout.
 
@@ -155,49 +318,70 @@ class BaseDbInsert(object):
         return
 
     def writeOverride(self, overrideLines, overrideName):
-        """Write the override file actual into $DQS/OVERRIDE.
+        """Write the override file actual into $DQS/OVERRIDE, or append it to
+        the segment store, when the name is returned but not written.
 
         parameters: <list>, <string> list of override header lines, override name
         return:     <string> overrride file name 
         """
         overrideFile = os.path.join(self.dbEnv.OVERRIDE,overrideName)
-        ovride = open(overrideFile,'w')
-        for line in overrideLines:
-            ovride.write(line+"\n")
-        ovride.close()
-        return overrideFile
+        if self.segments:
+            self.segments.put('override', overrideName,
+                              "".join([line+"\n" for line in overrideLines]),
+                              self.syncGroup)
+            return overrideFile
+        return atomicFile.writeLines(overrideFile, overrideLines, self.syncGroup)
 
     def writeValidation(self, ofile):
-        """Write a validation file from the self.validationMsg object."""
+        """Write a validation file from the self.validationMsg object, or,
+        with a validStore, record it there. With a segment store, the file is
+        appended there.
+
+        parameters: <string>, override file
+        return:     <string>, validation file, or validation database
+        """
+        if self.validStore:
+            self.validStore.record(ofile, self.validationMsg)
+            if self.verbose: print "Recorded validation:\t",self.validStore.dbFile
+            return self.validStore.dbFile
         opath,oname = os.path.split(ofile)
         vname = os.path.splitext(oname)[0]+".valid"
         vfile = os.path.join(self.dbEnv.VALIDATE,vname)
-        vfob = open(vfile,'w')
-        vfob.write("# MDDB Validation report for "+ofile+"\n")
-        vfob.write("# Written "+date.today().isoformat()+"\n")
-        vfob.write("# Package Name: "+mddbVersion.pkg_name+"\n")
-        vfob.write("# Package Version: "+mddbVersion.version+"\n\n")
+        report = ["# MDDB Validation report for "+ofile,
+                  "# Written "+date.today().isoformat(),
+                  "# Package Name: "+mddbVersion.pkg_name,
+                  "# Package Version: "+mddbVersion.version,
+                  ""]
         for level, msg in self.validationMsg:
-            vfob.write(level+" "+msg+"\n")
-        vfob.close()
-        del vfob
+            report.append(level+" "+msg)
+        if self.segments:
+            self.segments.put('valid', vname, "".join([line+"\n" for line in report]),
+                              self.syncGroup)
+        else:
+            atomicFile.writeLines(vfile, report, self.syncGroup)
         if self.verbose: print "Wrote valid file:\t",vfile
         return vfile
         
 
-    def executeInsert(self, collid, oride, uri):
-        """Run fits2caom, called from super() in the subclass. Subclasses
-        *must* define 
+    def insertCommand(self, collid, oride, uri):
+        """Build the fits2caom command line, called from super() in the
+        subclass. Subclasses *must* define
 
         self.cfgf
         self.deff
 
         which are the CAOM db config, defaults files, respectively.
        
+        With a segment store, the override is first exported to OVERRIDE,
+        as fits2caom reads it as a file.
+
         parameters: <string>, <string>, <string>, collection id, override file, uri
-        return:     <void>
+        return:     <list>,   fits2caom command line
         """
-
+        if self.segments:
+            self.segments.export('override', os.path.basename(oride),
+                                 os.path.dirname(oride) or self.dbEnv.OVERRIDE)
+        from mddb.utils import f2cArgs
         fargs= f2cArgs.F2CArgs(self.configFile)
         cmd  = fargs.buildCmdLine(collid, oride, self.cfgf, self.deff, uri)
         if self.verbose:
@@ -206,16 +390,56 @@ class BaseDbInsert(object):
             for carg in cmd:
                 print "\t",carg
             print "++++++++++++++"
-        try:
-            dbiproc = Popen(cmd, stdout=PIPE, stderr=PIPE)
-            sout,serr = dbiproc.communicate()
-            print sout,serr
-        except CalledProcessError, err:
-            print "Remote process call failed:",err
-        
-        return
+        return cmd
+
+    def executeInsert(self, collid, oride, uri):
+        """Run fits2caom on the override. Output of fits2caom is written to a
+        log in $DQS/logs, under the [execute] timeout of the config file.
+        See utils.f2cExecutor.
+
+        parameters: <string>, <string>, <string>, collection id, override file, uri
+        return:     <F2CResult>, exit code, wall time, log file of the run
+        """
+        from mddb.utils import f2cExecutor
+        cmd      = self.insertCommand(collid, oride, uri)
+        executor = f2cExecutor.F2CExecutor(self.configFile)
+        result   = executor.run([(os.path.basename(oride), collid, cmd)])[0]
+        if not result.ok():
+            print "Remote process call failed:", result.describe()
+        elif self.verbose:
+            print "fits2caom done in %.1fs, log: %s" % (result.wallTime, result.logFile)
+        return result
         
             
     ################################ prive #################################   
     # private methods must be implemented by subclasses.
 
+    def __headerStore(self):
+        # the headerStore.HeaderStore of HEADERS, opened on first use
+        if self.headerStore is None:
+            from mddb.utils import headerStore
+            self.headerStore = headerStore.HeaderStore(self.dbEnv.HEADERS)
+        return self.headerStore
+
+    def __cachedOverride(self, hdr, uri, public):
+        """Return the cached override lines for the header, restoring the
+        validation messages and cachedAttributes, or None."""
+        self.cacheKey = None
+        if not self.cache: return None
+        self.cacheKey = self.cache.key(hdr, uri, public, self.__class__.__name__)
+        entry = self.cache.fetch(self.cacheKey)
+        if entry is None: return None
+        lines, messages, state = entry
+        self.validationMsg = messages
+        for name, value in state.items(): setattr(self, name, value)
+        if self.verbose: print "Override cache hit:",hdr
+        return lines
+
+    def __cacheOverride(self, lines):
+        if not self.cacheKey: return
+        state = {}
+        for name in self.cachedAttributes:
+            if hasattr(self, name): state[name] = getattr(self, name)
+        self.cache.store(self.cacheKey, lines, self.validationMsg, state)
+        return
+
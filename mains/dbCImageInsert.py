@@ -17,16 +17,19 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 (MDDB).
 """
 
-from types    import NoneType
-from math     import sin, cos, radians
 from datetime import date
 
 from mddb.mains.baseDbInsert import BaseDbInsert
 from mddb.convert.converters import decimalize, formatRA, llh2XYZ
-from mddb.convert.converters import revertFrequency, fitsify
+from mddb.convert.converters import revertFrequency, fitsify, computeMatrix
 from mddb.convert import keymaps
+from mddb.convert import dateParse
 
 from mddb.db import xDBKeys
+from mddb.utils.header import Header
+from mddb.utils.cards  import parseCasaCard
+from mddb.utils.casaHeader import CasaImageHeader
+from mddb.utils import mtypeRegistry
 
 
 class CasaImageHeaderError(IndexError):
@@ -38,42 +41,66 @@ class CasaImageHeaderError(IndexError):
 
 class DbCImageInsert(BaseDbInsert):
 
+    mtype = 'image/ms-image'
+
     def configureOverride(self, hdr, uri, public):
         """Bundles calls to private methods to validate, check coordinate 
         reference system, insert CD matrix, insert DB keys, and various other
-        dreadfully tedious chores.
+        dreadfully tedious chores. Each is run through self.stage(), to be
+        profiled when asked.
         
         parameters: <string>, <string> header file name, uri
         return:     <list>,   list of configured db override lines 
         """
         symbol = "="
-        flines = self.__validate(hdr)
-        self.__setMetaRelease(flines, public)
-        self.__setOBSGEO(flines)
-        self.ndims = self.__setImageDims(flines) # get a NAXIS value return
-        self.__revertFrequencies(flines)
-        self.__directionCoordUnits(flines)
-        self.__setCTYPES(flines)  
-        self.__setCoordSys(flines)
-        self.__setCRVALS(flines)
-        self.__setDirectionRefPixels(flines)
-        self.__insertCDMatrix(flines)
-        self.__insertDBKeys(flines, uri)
-        self.__dates2mjd(flines)
-        self.__setParseSymbol(flines, symbol)
-        dblines = self.__stripSlashN(flines)
+        stage  = self.stage
+        flines = stage(self.__validate, hdr)
+        stage(self.__setMetaRelease, flines, public)
+        stage(self.__setOBSGEO, flines)
+        self.ndims = stage(self.__setImageDims, flines) # get a NAXIS value return
+        stage(self.__revertFrequencies, flines)
+        stage(self.__directionCoordUnits, flines)
+        stage(self.__setCTYPES, flines)
+        stage(self.__setCoordSys, flines)
+        stage(self.__setCRVALS, flines)
+        stage(self.__setDirectionRefPixels, flines)
+        stage(self.__insertCDMatrix, flines)
+        stage(self.__insertDBKeys, flines, uri)
+        stage(self.__dates2mjd, flines)
+        dblines = flines.materialize()
+        stage(self.__setParseSymbol, dblines, symbol)
+        dblines = stage(self.__stripSlashN, dblines)
         return dblines
 
-    def executeInsert(self, collid, oride, uri):
-        """Run fits2caom.
+    def insertCommand(self, collid, oride, uri):
+        """Build the fits2caom command line, with the CAOM db config and
+        defaults files for this dataset.
 
         parameters: <string>, <string>, <string> collection id, override file, uri
-        return:     <void>
+        return:     <list>,   fits2caom command line
         """
-        self.cfgf = self.dbEnv.cimageDBConfig
-        self.deff = self.dbEnv.cimageDBDefault
-        super(DbCImageInsert, self).executeInsert(collid, oride, uri)
-        return
+        self.cfgf, self.deff = mtypeRegistry.handler(self.mtype).caomConfig(self.dbEnv)
+        return super(DbCImageInsert, self).insertCommand(collid, oride, uri)
+
+    def readWcsInputs(self, lines):
+        """The telescope position, direction reference value and increment
+        of header lines, for a batch conversion by batchWcs.solve().
+
+        parameters: <list>, header lines
+        return:     <dict>, WCS inputs
+        """
+        casa   = CasaImageHeader(Header(lines, parseCasaCard))
+        inputs = {}
+        if casa.position is not None: inputs['geo'] = [casa.position]
+        direction = casa.coordinate('direction')
+        if direction is None: return inputs
+        if direction.refValue is not None:
+            dec, ra = direction.refValue.pair()
+            inputs['deg'], inputs['ra'] = [dec], [ra]
+        if direction.increment is not None:
+            cdelta2Str, cdelta1Str = direction.increment.pair()
+            inputs['cdDeg'] = [(cdelta1Str, cdelta2Str)]
+        return inputs
 
             
     ################################ prive #################################   
@@ -82,16 +109,19 @@ class DbCImageInsert(BaseDbInsert):
         """Method determines the type of file passed by Caller, whether a
         header file contains some CASA Image signifiers, as '.hdr' file as 
         written by metaData. This will be the full path name to the copy of the 
-        header placed in MDDBEnv.HDRS
+        header placed in MDDBEnv.HDRS. The header is read once into
+        self.casa, a casaHeader.CasaImageHeader, from which the FITS
+        translation runs.
 
         parameters: <string>, header file name
-        return:     <list>,   list of read lines from CASA Image header file.
+        return:     <Header>, indexed header of read lines from CASA Image header file.
         """
         errstr='Invalid CASA Image header file. Missing: FILETYPE\t\tCASA Image\n'
         
-        clines = open(cimageHdr).readlines()
+        clines = Header(open(cimageHdr).readlines(), parseCasaCard)
+        self.casa = CasaImageHeader(clines)
         try:
-            assert("CASA Image" in clines[0]) 
+            assert(self.casa.cards and "CASA Image" in self.casa.cards[0].image)
         except AssertionError:
             self.validationMsg.append(("ERROR:",errstr))
         return clines
@@ -121,39 +151,28 @@ class DbCImageInsert(BaseDbInsert):
         TELESCOP_LON
         TELESCOP_HGT	
 
+        read into the telescope position of self.casa. The OBSGEO lines are
+        placed three lines below TELESCOP_HGT.
+
         parameters: <list>, list of header lines
         return:     <void>
         """
-        tlat = 'TELESCOP_LAT'
-        tlon = 'TELESCOP_LON'
-        thgt = 'TELESCOP_HGT'
         obsX = 'OBSGEO-X'
         obsY = 'OBSGEO-Y'
         obsZ = 'OBSGEO-Z'
         geounit = 'm'
         err = "Telscope position parameters not found."
-        lat = lon = hgt = posIndex = None
-
-        for idx in range(len(lines)):
-            lvals = lines[idx].split('\t')
-            if lvals[0] == tlat:
-                lat = lvals[2]
-                continue
-            if lvals[0] == tlon:
-                lon = lvals[2]
-                continue
-            if lvals[0] == thgt:
-                hgt = lvals[2]
-                posIndex = idx
-                continue
-            if hgt and lon and lat: break
-
-        if not hgt and not lon and not lat: raise CasaImageHeaderError,err
-        X,Y,Z = llh2XYZ(float(lat), float(lon), float(hgt))
-        lines.insert(posIndex+3,obsX+'\t\t'+str(X))
-        lines.insert(posIndex+4,obsY+'\t\t'+str(Y))
-        lines.insert(posIndex+5,obsZ+'\t\t'+str(Z))
-        lines.insert(posIndex+6,"OBSGEO_UNIT"+'\t\t'+geounit)
+        if self.casa.position is None: raise CasaImageHeaderError,err
+
+        if self.wcs: X,Y,Z = self.wcs.geocentric(*self.casa.position)
+        else: X,Y,Z = llh2XYZ(*self.casa.position)
+        geoLines = [obsX+'\t\t'+str(X),
+                    obsY+'\t\t'+str(Y),
+                    obsZ+'\t\t'+str(Z),
+                    "OBSGEO_UNIT"+'\t\t'+geounit]
+        anchor = self.casa.following(self.casa.positionCard, 3)
+        if anchor is None: lines.append(geoLines)
+        else: lines.insertBefore(anchor, geoLines)
         self.validationMsg.append(("INFO: ","SET OBSGEO keywords"))
         return
 
@@ -173,30 +192,18 @@ class DbCImageInsert(BaseDbInsert):
         parameters: <list>, header lines
         return:     <int>,  number of image dimensions
         """
-        axesKey   = 'IMAGE-SHAPE'
         baseNaxis = 'NAXIS'
-        dimIndex  = None
-
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == axesKey:
-                dimIndex = idx
-                break
-            else: continue
-        shape = lines[dimIndex].split('E')[2].strip()
-        dims  = shape.strip(']').strip('[').split(',')
-        # dims should be a list like ['1', ' 1', ' 64', ' 64']
-        # iterable
-        naxis = len(dims)
-        for i in range(naxis):
-            lines.insert(dimIndex+1+i,baseNaxis+str(i+1) \
-                             +"\t\t\t"+dims[i].strip())
-        return naxis
+        shape     = self.casa.shape
+        if shape is None: raise CasaImageHeaderError, "IMAGE-SHAPE not found."
+        lines.insertAfter(self.casa.shapeCard,
+                          [baseNaxis+str(i+1)+"\t\t\t"+str(shape[i])
+                           for i in range(len(shape))])
+        return len(shape)
 
     def __revertFrequencies(self,lines):
         """Revert Frequency values in lines to simple 'Hz' numbers.
         Current, CASA Image headers will specify frequency values in
-        the COORDINATE0 related keywords in 'human readable' form.
+        the spectral coordinate related keywords in 'human readable' form.
 
         eg.,
         REFERENCE0-VALUE	115, GHz
@@ -206,44 +213,35 @@ class DbCImageInsert(BaseDbInsert):
         parameters: <list>, header lines
         return:     <void>
         """
-        freqKeys = ['REFERENCE0-VALUE','INCREMENT0','REST-FREQUENCY']
-        matched  = 0
-
-        for idx in range(len(lines)):
-            if matched == 3: break
-            key = self.__getKeyWord(lines[idx])
-            if key in freqKeys:
-                matched += 1
-                lvals = lines[idx].split()
-                fval  = float(lvals[1].strip().strip(','))
-                unit  = lvals[2].strip()
-                pureHz = revertFrequency(fval,unit)
-                if key == freqKeys[0]:
-                    lines[idx]   = key+"\t"+str(pureHz)
-                else: lines[idx] = key+"\t\t"+str(pureHz)
-            else: continue
+        freqs = [self.casa.restFrequency]
+        spectral = self.casa.coordinate('spectral')
+        if spectral is not None: freqs[0:0] = [spectral.refValue, spectral.increment]
+
+        for freq in freqs:
+            if freq is None: continue
+            key    = freq.card.keyword
+            pureHz = revertFrequency(freq.numbers()[0], freq.unit)
+            if key.startswith('REFERENCE'):
+                lines.replace(freq.card, key+"\t"+str(pureHz))
+            else: lines.replace(freq.card, key+"\t\t"+str(pureHz))
         return
 
     def __directionCoordUnits(self, lines):
-        """Break out the direction coordinate (COORDINATE2) units, insert two
-        (2) lines for CUNITs.
+        """Break out the direction coordinate units, INCREMENT2_UNITS, insert
+        two (2) lines for CUNITs.
 
         parameters: <list>, header lines list
         return:     <void>
         """
-        unitKey   = 'INCREMENT2_UNITS'
-        dirCunit1 = None
-        dirCunit2 = None
         dir1Cunit = "DIR1_UNIT"
         dir2Cunit = "DIR2_UNIT"
 
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == unitKey:
-                dirCunit1,dirCunit2 = self.__getValTuple(lines[idx])
-                break
-        lines.insert(idx+1, dir1Cunit+"\t\t"+dirCunit1)
-        lines.insert(idx+2, dir2Cunit+"\t\t"+dirCunit2)
+        direction = self.__direction()
+        if direction.units is None or len(direction.units) != 2:
+            raise CasaImageHeaderError, "Direction coordinate units not found."
+        dirCunit1,dirCunit2 = direction.units
+        lines.insertAfter(direction.cards['units'],[dir1Cunit+"\t\t"+dirCunit1,
+                                                    dir2Cunit+"\t\t"+dirCunit2])
         return
 
     def __setCTYPES(self, lines):
@@ -277,61 +275,37 @@ class DbCImageInsert(BaseDbInsert):
 
         COORDINATE[i]_1      GLON--CAR
         COORDINATE[i]_2      GLAT--CAR
+
+        The coordinates, numbered below N_OF-AXES, are taken from self.casa in
+        header order. The CTYPE lines are placed after the direction coordinate
+        projection, the last first, and the CTYPE numbers of the direction
+        axes kept for __setDirectionRefPixels().
         
         parameters: <list>, header lines
         return:     <void>
         """
-        # Find all coordinate type parameters, based on N_OF-AXES value
-        naxis    = 'N_OF-AXES'
-        projTag  = 'PROJECTION'
-        coordTyp = []
-        coordNam = []
-        nIndex   = None
-        projection = None
-
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == naxis:
-                nIndex = idx
-                naxisVal = self.__getNumVal(lines[idx])
-                break
-            else: continue
-
-        # construct coordinate[n] name keywords. If one coordinate is of
-        # type 'direction', n will be one greater than the number of
-        # coordinates actual.
-        for n in range(int(naxisVal)):
-            coordTyp.append('COORDINATE'+str(n)+'-TYPE')
-        # get values for each coord type.
-        for i in range(nIndex, len(lines)):
-            line = lines[i]
-            key = self.__getKeyWord(line)
-            if key in coordTyp:
-                ctype = self.__getStringVal(line)
-                if ctype == 'direction':
-                    cname1,cname2 = self.__getValTuple(lines[i+1])
-                    coordNam.append(key+'_NAME:'+cname1+' & '+cname2)
-                else:
-                    coordNam.append(key+'_NAME:'+self.__getStringVal(lines[i+1]))
-            elif projTag in key:
-                projIndex  = i
-                projection = self.__getStringVal(line)
-            else: continue
-
-        # coordNam now looks like,
-        # ['COORDINATE0-TYPE_NAME:Frequency',
-        #  'COORDINATE1-TYPE_NAME:Stokes',
-        #  'COORDINATE2-TYPE_NAME:Declination & Right Ascension'
-        # ]
-        # where list index equals coordinate number, i.e. COORDINATE[i]
-
-        for i in range(len(coordNam)):
-            fitsCTYPE = fitsify(coordNam[i], i+1, projection)
+        direction  = self.__direction()
+        projection = direction.projection
+        if projection is None:
+            raise CasaImageHeaderError, "Direction coordinate projection not found."
+
+        ctypeLines = []
+        for i, coord in enumerate(self.casa.axes()):
+            if coord.names is None:
+                raise CasaImageHeaderError, "COORDINATE%d-NAME not found." % coord.index
+            if coord.type == 'direction':
+                cname1,cname2 = coord.names
+                coordNam = 'COORDINATE%d-TYPE_NAME:%s & %s' % (coord.index, cname1, cname2)
+            else:
+                coordNam = 'COORDINATE%d-TYPE_NAME:%s' % (coord.index, coord.names[0])
+            fitsCTYPE = fitsify(coordNam, i+1, projection)
             if len(fitsCTYPE) == 2:
-                lines.insert(projIndex+1, fitsCTYPE[0]+"\t\t\t"+fitsCTYPE[1])
+                ctypeLines[0:0] = [fitsCTYPE[0]+"\t\t\t"+fitsCTYPE[1]]
             elif len(fitsCTYPE) == 4:
-                lines.insert(projIndex+1, fitsCTYPE[2]+"\t\t\t"+fitsCTYPE[3])
-                lines.insert(projIndex+2, fitsCTYPE[0]+"\t\t\t"+fitsCTYPE[1])
+                ctypeLines[0:0] = [fitsCTYPE[2]+"\t\t\t"+fitsCTYPE[3],
+                                   fitsCTYPE[0]+"\t\t\t"+fitsCTYPE[1]]
+                if coord is direction: self.directionAxes = (i+1, i+2)
+        lines.insertAfter(direction.cards['projection'], ctypeLines)
         return
 
     def __setCRVALS(self, lines):
@@ -347,48 +321,37 @@ class DbCImageInsert(BaseDbInsert):
         parameters: <list>, header lines 
         return:     <void>
         """
-        crvalKey   = 'REFERENCE2-VALUE'
-        pixval_ra  = 'CRVAL2_2'
-        pixval_dec = 'CRVAL2_1'
-        crvalIndex = None
-
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == crvalKey:
-                linevals = lines[idx].split()
-                dec = linevals[1].strip()
-                ra  = linevals[2].strip()
-                crvalIndex = idx + 1
-                break
-            else: continue
-        
-        crval_dec = decimalize(dec)
-        crval_ra  = decimalize(formatRA(ra))*15
-        lines.insert(crvalIndex,pixval_dec+'\t\t'+str(crval_dec))
-        lines.insert(crvalIndex+1,pixval_ra+'\t\t'+str(crval_ra))
+        direction  = self.__direction()
+        pixval_dec = 'CRVAL%d_1' % direction.index
+        pixval_ra  = 'CRVAL%d_2' % direction.index
+        if direction.refValue is None:
+            raise CasaImageHeaderError, "Direction reference value not found."
+
+        dec, ra   = direction.refValue.pair()
+        if self.wcs:
+            crval_dec = self.wcs.decimalize(dec)
+            crval_ra  = self.wcs.raDegrees(ra)
+        else:
+            crval_dec = decimalize(dec)
+            crval_ra  = decimalize(formatRA(ra))*15
+        lines.insertAfter(direction.refValue.card,[pixval_dec+'\t\t'+str(crval_dec),
+                                                   pixval_ra+'\t\t'+str(crval_ra)])
         return
 
     def __setDirectionRefPixels(self, lines):
         """Set the reference pixels for the direction coordinate to a pair of
-        CRPIX[i] keywords
+        CRPIX[i] keywords, numbered as the direction CTYPEs.
 
         parameters: <list>, header lines list
         return:     <void>
         """
-        crpix3 = 'CRPIX3'
-        crpix4 = 'CRPIX4'
-        refPixelKey = 'REFERENCE2-PIXEL'
-        for idx in range(len(lines)):
-            pixKey = self.__getKeyWord(lines[idx])
-            if pixKey == refPixelKey:
-                pixelIndex = idx
-                strpix1,strpix2 = self.__getValTuple(lines[idx])
-                break
-            else: continue
-        pix1 = float(strpix1)+1.0 # +1 for fits2caom indexing
-        pix2 = float(strpix2)+1.0 # +1 for fits2caom indexing
-        lines.insert(idx+1, crpix3+"\t\t\t"+str(pix1))
-        lines.insert(idx+2, crpix4+"\t\t\t"+str(pix2))
+        direction = self.__direction()
+        if direction.refPixel is None:
+            raise CasaImageHeaderError, "Direction reference pixel not found."
+        pix1, pix2 = [pix+1.0 for pix in direction.refPixel.numbers()] # +1 for fits2caom indexing
+        axis1, axis2 = self.directionAxes
+        lines.insertAfter(direction.refPixel.card,["CRPIX%d\t\t\t%s" % (axis1, pix1),
+                                                   "CRPIX%d\t\t\t%s" % (axis2, pix2)])
         return
 
     def __setCoordSys(self, lines):
@@ -425,36 +388,21 @@ class DbCImageInsert(BaseDbInsert):
         return:     <void>
         """
         errstr      = 'Coordinate reference frame not found in header.\n'
-        frameKey    = 'FRAME2'
         radeRef     = 'RADESYS'
-        refSys      = {}
-        refsysIndex = None
-
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == frameKey:
-                refSys[key] = self.__getStringVal(lines[idx])
-                if not refsysIndex: refsysIndex = idx
-                break
-            else: continue
+        direction   = self.__direction()
+        frame       = direction.frame
+        if not frame: raise CasaImageHeaderError, errstr
+        refsysCard  = direction.cards['frame']
+        frameKey    = refsysCard.keyword
 
         # Defaults spec'd in Calabretta & Greisen, p.1082
 
-        if  '2000' in refSys[frameKey]: 
-            refSys[radeRef] = 'FK5'
-            refSys[frameKey] = keymaps.frameValueMap[refSys[frameKey]]
-            lines.pop(refsysIndex)
-            lines.insert(refsysIndex,frameKey+"\t\t\t"+refSys[frameKey])
-            self.validationMsg.append(("INFO: ","Set "+radeRef+": "+refSys[radeRef]))
-        elif '1950' in refSys[frameKey]: 
-            refSys[radeRef] = 'FK4'
-            refSys[frameKey] = keymaps.frameValueMap[refSys[frameKey]]
-            lines.pop(refsysIndex)
-            lines.insert(refsysIndex,frameKey+"\t\t\t"+refSys[frameKey])
-            self.validationMsg.append(("INFO: ","Set "+radeRef+": "+refSys[radeRef]))
-        if not refSys[frameKey]:
-            raise CasaImageHeaderError, errstr
-        lines.insert(refsysIndex+1,radeRef+"\t\t"+refSys[radeRef])
+        if   '2000' in frame: radesys = 'FK5'
+        elif '1950' in frame: radesys = 'FK4'
+        else: raise CasaImageHeaderError, "Unrecognized reference frame: "+frame
+        refsysCard = lines.replace(refsysCard, frameKey+"\t\t\t"+keymaps.frameValueMap[frame])
+        self.validationMsg.append(("INFO: ","Set "+radeRef+": "+radesys))
+        lines.insertAfter(refsysCard,radeRef+"\t\t"+radesys)
         return
 
     def __insertCDMatrix(self, lines):
@@ -484,63 +432,42 @@ class DbCImageInsert(BaseDbInsert):
         parameters: <list>, header lines list of strings from CASA Image header file.
         return:     <void>, referenced list is updated.
         """
-        errstr   = "Image Foul: cdelt values not found."
-        cdelta2Str = cdelta1Str = cdelta1 = cdelta2 = None
-        deltaKey = 'INCREMENT2'
-
-        for idx in range(len(lines)):
-            if deltaKey in lines[idx]:
-                insertIndex = idx
-                break
-        cdelta2Str, cdelta1Str = self.__getValTuple(lines[insertIndex])
-
-        if type(cdelta2Str) == NoneType:
-            raise CasaImageHeaderError, errstr
-        elif type(cdelta1Str) == NoneType:
-            raise CasaImageHeaderError, errstr
+        errstr    = "Image Foul: cdelt values not found."
+        direction = self.__direction()
+        if direction.increment is None: raise CasaImageHeaderError, errstr
+        cdelta2Str, cdelta1Str = direction.increment.pair()
 
         # convert string dms cdelta values to float decimal deg.
-        cdelta1 = decimalize(cdelta1Str)
-        cdelta2 = decimalize(cdelta2Str)
-
-        cdMatrix= self.__computeMatrix(cdelta1,cdelta2)
-
-        lines.insert(insertIndex+1,"CD1_1    \t\t"+str(cdMatrix[0]))
-        lines.insert(insertIndex+2,"CD1_2    \t\t"+str(cdMatrix[1]))
-        lines.insert(insertIndex+3,"CD2_1    \t\t"+str(cdMatrix[2]))
-        lines.insert(insertIndex+4,"CD2_2    \t\t"+str(cdMatrix[3]))
+        if self.wcs:
+            cdelta1 = self.wcs.decimalize(cdelta1Str)
+            cdelta2 = self.wcs.decimalize(cdelta2Str)
+            cdMatrix= self.wcs.cdMatrix(cdelta1,cdelta2)
+        else:
+            cdelta1 = decimalize(cdelta1Str)
+            cdelta2 = decimalize(cdelta2Str)
+            cdMatrix= computeMatrix(cdelta1,cdelta2)
+
+        lines.insertAfter(direction.increment.card,["CD1_1    \t\t"+str(cdMatrix[0]),
+                                                    "CD1_2    \t\t"+str(cdMatrix[1]),
+                                                    "CD2_1    \t\t"+str(cdMatrix[2]),
+                                                    "CD2_2    \t\t"+str(cdMatrix[3])])
         self.validationMsg.append(("INFO: ","Wrote CD Matrix"))
         return
 
-    def __computeMatrix(self, cdelt1, cdelt2, rho=0):
-        """Compute the Coordinate Description matrix. Caller passes
-        three arguments: CDELT1, CDELT2, CROTA2, the rotation angle if 
-        any.
-        
-        parameters: <float>, <float>, <float>
-        return:     <list>, list of four (4) CD matrix values (floats).
-        """
-
-        cd11 = cdelt1*cos(radians(rho))
-        cd12 = -1*cdelt2*sin(radians(rho))
-        cd21 = cdelt1*sin(radians(rho))
-        cd22 = cdelt2*cos(radians(rho))
-        return [cd11,cd12,cd21,cd22]
-
     def __insertDBKeys(self,headerLines, uri):
         """Insert required MDDB keywords for CAOM database insertion.
 
         parameters: <list>, a list of header line strings
         return:     <void>, referenced list updated w/ xdbkeys
         """
-
+        dbLines = []
         for xi in range(len(xDBKeys.xcimdbkeys)):
             if 'DATAURI' in xDBKeys.xdbkeys[xi][0]:
-                headerLines.insert(xi+3,xDBKeys.xcimdbkeys[xi][0]+ \
-                                       ' \t\t'+ uri)
+                dbLines.append(xDBKeys.xcimdbkeys[xi][0]+' \t\t'+ uri)
             else:
-                headerLines.insert(xi+3,xDBKeys.xcimdbkeys[xi][0]+ \
-                                       ' \t\t'+str(xDBKeys.xcimdbkeys[xi][1]))
+                dbLines.append(xDBKeys.xcimdbkeys[xi][0]+ \
+                               ' \t\t'+str(xDBKeys.xcimdbkeys[xi][1]))
+        headerLines.insert(3, dbLines)
         self.validationMsg.append(("INFO: ","DB Keys inserted."))
         return
 
@@ -549,33 +476,36 @@ class DbCImageInsert(BaseDbInsert):
         return [line.strip() for line in lines]
 
     def __dates2mjd(self,lines):
-        """Null method (for now)"""
-        mjdKeys  = ['MJD-OBS','DATE-OBS-MJD']
-        taxisKey = 'CRVAL5'
-        mjdIndex = None
-        mjdDate  = None
+        """Insert the CAOM time axis keywords, CTYPE5, CUNIT5, CRPIX5, CRVAL5,
+        for the observation MJD. The time source is picked by
+        dateParse.bestTime(), from the first of MJD-OBS, DATE-OBS-MJD or
+        DATE-OBS, then MJD-BEG or DATE-BEG, then OBSDATE, then DATE. A source
+        not itself an MJD is followed by an MJD-OBS line.
 
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key in mjdKeys:
-                mjdIndex = idx
-                mjdDate = self.__getNumVal(lines[idx])
-                break
-        try:
-            assert(mjdDate)
-            for i in range(len(xDBKeys.dbWcsTimeKeys)):
-                if taxisKey in xDBKeys.dbWcsTimeKeys[i][0]:
-                    lines.insert(mjdIndex+i+1,xDBKeys.dbWcsTimeKeys[i][0]+ \
-                                     '\t\t'+ str(mjdDate))
-                    continue
-                lines.insert(mjdIndex+i+1,xDBKeys.dbWcsTimeKeys[i][0]+ \
-                                '\t\t'+str(xDBKeys.dbWcsTimeKeys[i][1]))
-        except AssertionError:
-            err = 'Observation Date not found.'
+        parameters: <list>, header lines
+        return:     <void>
+        """
+        taxisKey  = 'CRVAL5'
+        timeLines = []
+
+        mjdCard, mjdDate, rejected = dateParse.bestTime(lines, dateParse.casaTimeKeys)
+        for key, raw in rejected:
+            self.validationMsg.append(("WARN: ","Unrecognized "+key+" value: "+raw))
+        if not mjdDate:
             self.validationMsg.append(("ERROR:","Observation Date not found."))
+            return
+        if mjdCard.keyword not in dateParse.mjdKeys:
+            timeLines.append('MJD-OBS\t\t'+str(mjdDate))
+            self.validationMsg.append(("INFO: ","MJD-OBS from "+mjdCard.keyword))
+        for i in range(len(xDBKeys.dbWcsTimeKeys)):
+            if taxisKey in xDBKeys.dbWcsTimeKeys[i][0]:
+                timeLines.append(xDBKeys.dbWcsTimeKeys[i][0]+'\t\t'+ str(mjdDate))
+                continue
+            timeLines.append(xDBKeys.dbWcsTimeKeys[i][0]+ \
+                             '\t\t'+str(xDBKeys.dbWcsTimeKeys[i][1]))
+        lines.insertAfter(mjdCard, timeLines)
         return
 
-
     def __setParseSymbol(self, lines, symbol):
         """Inject the passed parse symbol into lines. The symbol is injected 
         into each line of lines after the first field of the line, i.e. a nominal
@@ -587,61 +517,18 @@ class DbCImageInsert(BaseDbInsert):
         """
         symbol = symbol+"\t"
         for idx in range(len(lines)):
-            oldline = lines.pop(idx)
-            newline = symbol.join(oldline.split('\t',1))
-            lines.insert(idx,newline)
+            lines[idx] = symbol.join(lines[idx].split('\t',1))
         return
 
-    ############### List line keys & values methods. ########################
-
-    def __getValTuple(self, line):
-        """Return a 2-tuple of values from a multiply valued header line.
-
-        egs.,
-        >>>__getValTuple('POINTING          03:41:47.8999999999   +62.38.53.9999999988')
-        ('03:41:47.8999999999', '+62.38.53.9999999988')
-        >>>__getValTuple('COORDINATE2-NAME       Declination, Right Ascension')
-        ('Declination', 'Right Ascension')
-
-        N.B. This method handles only lines with two parsable values, as above. It is
-        inappropriate for lines containing more than two values.
+    ############### Model lookups. ##########################################
 
-        parameters: <string>, header line comprising a keyword and csv values.
-        return:     <tuple>,  2-tuple of strings
-        """
-        val1 = val2 = ''
-        vals = line.split()
-        if len(vals) == 3:
-            val1 = vals[1]
-            val2 = vals[2]
-        elif len(vals) == 4:
-            val1 = vals[1]
-            for val in vals[2:]:
-                val2 += ' '+val
-        else: raise TypeError, 'inappropriate line for this method.'
-        return val1.strip(','),val2.strip()
-
-    def __getNumVal(self, line):
-        """Pare a numeric value from a header line string.
-
-        parameters: <string>
-        return:     <float>
-        """
-        return float(line.split()[1].strip())
+    def __direction(self):
+        """Return the direction Coordinate of self.casa. Raise
+        CasaImageHeaderError if there is none.
 
-    def __getStringVal(self, line):
-        """Pare string value from a header line string.
-
-        parameters: <string>
-        return:     <string>
+        return: <casaHeader.Coordinate>
         """
-        return line.split()[1].strip()
-
-    def __getKeyWord(self, line):
-        """Pare a keyword from a header line string.
-
-        parameters: <string>
-        return:     <string>
-        """
-        return line.split()[0].strip()
-
+        direction = self.casa.coordinate('direction')
+        if direction is None:
+            raise CasaImageHeaderError, "Direction coordinate not found."
+        return direction
@@ -18,14 +18,21 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 """
 
 from types import NoneType
-from math  import sin, cos, radians
 from datetime import date
 
 from mddb.mains.baseDbInsert import BaseDbInsert
 
 from mddb.convert import keymaps
-from mddb.convert import mjdConversions
+from mddb.convert.converters import computeMatrix
+from mddb.convert import dateParse
 from mddb.db      import xDBKeys, checkSetKeys
+from mddb.utils.header import Header
+from mddb.utils.cards  import parseCard, Dropped, streamCards
+from mddb.utils.ruleEngine import RuleSet
+from mddb.utils import mtypeRegistry
+
+# keyword remediation rules, compiled once
+fitsRules = RuleSet(checkSetKeys.fitsRules, checkSetKeys.insertAt)
 
 
 class FitsHeaderError(IndexError):
@@ -37,44 +44,63 @@ class FitsHeaderError(IndexError):
 
 class DbFitsInsert(BaseDbInsert):
 
+    mtype = 'image/fits-image'
+
     def configureOverride(self, hdr, uri, public):
         """Bundles calls to private methods to validate, check coordinate
         reference system, insert CD matrix, insert DB keys, and various other
-        dreadfully tedious chores.
+        dreadfully tedious chores. Each is run through self.stage(), to be
+        profiled when asked.
         
         parameters: <string>, <string>, <bool> file name, uri, public switch
         return:     <list>,   header lines, list of strings
         """
-        flines = self.__validate(hdr)
-        self.__assertSimple(flines)
-        self.__setMetaRelease(flines, public)
-        self.ndims = self.__naxis(flines)
-        self.__assertDirectionCoord(flines)
-        self.__setSpectralCoord(flines)
-        self.__checkSetKeys(flines)
-        self.__setFreqUnit(flines)
-        self.__setSpecSys(flines)
-        self.__setCoordSys(flines)
-        try: self.__insertCDMatrix(flines)
+        stage  = self.stage
+        flines = stage(self.__validate, hdr)
+        stage(self.__assertSimple, flines)
+        stage(self.__setMetaRelease, flines, public)
+        self.ndims = stage(self.__naxis, flines)
+        stage(self.__assertDirectionCoord, flines)
+        stage(self.__setSpectralCoord, flines)
+        stage(self.__checkSetKeys, flines)
+        stage(self.__setFreqUnit, flines)
+        stage(self.__setSpecSys, flines)
+        stage(self.__setCoordSys, flines)
+        try: stage(self.__insertCDMatrix, flines)
         except FitsHeaderError: pass
-        self.__insertDBKeys(flines, uri)
-        try: self.__dates2mjd(flines)
+        stage(self.__insertDBKeys, flines, uri)
+        try: stage(self.__dates2mjd, flines)
         except FitsHeaderError: pass
-        return flines
+        return flines.materialize()
 
-    def executeInsert(self, collid, oride, uri):
-        """Run fits2caom.
+    def insertCommand(self, collid, oride, uri):
+        """Build the fits2caom command line, with the CAOM db config and
+        defaults files for this dataset.
 
         parameters: <string>, <string>, <string> collection id, override file, uri
-        return:     <void>
+        return:     <list>,   fits2caom command line
         """
-        if   self.ndims == 2: self.cfgf = self.dbEnv.fits2dDBConfig
-        elif self.ndims == 3: self.cfgf = self.dbEnv.fits3dDBConfig
-        elif self.ndims == 4: self.cfgf = self.dbEnv.fitsDBConfig
-        else: raise FitsHeaderError("Cannot handle "+str(self.ndims)+"D image.")
-        self.deff = self.dbEnv.fitsDBDefault
-        super(DbFitsInsert, self).executeInsert(collid, oride, uri)
-        return
+        self.cfgf, self.deff = mtypeRegistry.handler(self.mtype).caomConfig(self.dbEnv,
+                                                                            self.ndims)
+        if self.cfgf is None:
+            raise FitsHeaderError("Cannot handle "+str(self.ndims)+"D image.")
+        return super(DbFitsInsert, self).insertCommand(collid, oride, uri)
+
+    def readWcsInputs(self, lines):
+        """The CDELTn/CROTAn of header lines with no CD matrix, for a batch
+        computation of the matrix by batchWcs.solve().
+
+        parameters: <list>, header lines
+        return:     <dict>, WCS inputs
+        """
+        lines = Header(streamCards(lines, checkSetKeys.commentaryKeys))
+        if lines.has('CD1_1'): return {}
+        wcsCards, wcsVals = _cdeltCards(lines)
+        delta1 = wcsVals.get('CDELT1')
+        delta2 = wcsVals.get('CDELT2')
+        if delta1 is None or delta2 is None: return {}
+        return {'cd': [(delta1, delta2, _rotation(wcsVals.get('CROTA1'),
+                                                  wcsVals.get('CROTA2')))]}
 
       
     ################################ prive #################################   
@@ -85,13 +111,23 @@ class DbFitsInsert(BaseDbInsert):
         This will be the full path name to the copy of the fits header placed in
         MDDBEnv.HEADERS
 
+        The header is streamed from the file into the Header, its COMMENT and
+        HISTORY cards dropped by keyword as read. The number dropped is
+        reported in the validationMsg list.
+
         parameters: <string>, header file name
-        return:     <list>, list of read lines from fits header file.
+        return:     <Header>, indexed header of read lines from fits header file.
         """
         errstr='Invalid FITS type header file. Missing keyword signifier: SIMPLE'
-        
-        flines = open(fitsHdr).readlines()
-        strippedLines = self.__stripComment(flines)
+
+        dropped = Dropped()
+        hfob    = open(fitsHdr)
+        try:
+            strippedLines = Header(streamCards(hfob, checkSetKeys.commentaryKeys, dropped))
+        finally:
+            hfob.close()
+        if dropped:
+            self.validationMsg.append(("INFO: ","Dropped commentary cards: "+dropped.report()))
         try:
             assert("SIMPLE" in strippedLines[0])
         except AssertionError: 
@@ -111,13 +147,10 @@ class DbFitsInsert(BaseDbInsert):
         """
         errstr = "[N]EXTEND keyword(s) detected. Cannot insert MEF files"
         xtendKeys = ['EXTEND','NEXTEND']
-        for line in lines:
-            key = self.__getKeyWord(line)
-            try:
-                assert(key in xtendKeys)
+        for key in xtendKeys:
+            if lines.has(key):
                 self.validationMsg.append(("ERROR:",errstr))
                 break
-            except AssertionError: continue
         return
 
     def __setMetaRelease(self, lines, public):
@@ -142,11 +175,7 @@ class DbFitsInsert(BaseDbInsert):
         return:      <int>, naxis value
         """
         naxisKey = 'NAXIS'
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == naxisKey:
-                naxis = self.__getNumVal(lines[idx])
-                break
+        naxis = lines.cardOf(naxisKey).number()
         return int(naxis)
 
     def __assertDirectionCoord(self, lines):
@@ -157,16 +186,11 @@ class DbFitsInsert(BaseDbInsert):
         return:     <void> 
         """
         directionError = "VO services require a Direction Coordinate. None Found."
-        tcount = 0
-        for line in lines:
-            if "CTYPE1" in line:
-                self.__affirmDirection(line)
-                tcount += 1
-            if "CTYPE2" in line:
-                self.__affirmDirection(line)
-                tcount += 1
-            if tcount == 2: break
-            else: continue
+        dirKeys = ['CTYPE1','CTYPE2']
+        found   = lines.ordered([lines.cardOf(key) for key in dirKeys if lines.has(key)])
+        for card in found:
+            self.__affirmDirection(card)
+        tcount = len(found)
 
         if not tcount == 2:
             if self.verbose:
@@ -174,19 +198,19 @@ class DbFitsInsert(BaseDbInsert):
             self.validationMsg.append(("ERROR:",directionError))
         return
 
-    def __affirmDirection(self,line):
+    def __affirmDirection(self,card):
         directionError = "Unrecognized direction coordinate:: "
         projectionError= "Unrecognized FITS projection code:: "
         dCoord = None
         dProj  = None
-        dkey   = self.__getKeyWord(line)
-        pvals  = self.__getStringVal(line).split('-')
+        dkey   = card.keyword
+        pvals  = card.string().split('-')
         dCoord = pvals[0]
 
         if len(pvals) == 1:
             dProj = ''
         else:
-            dProj = self.__getStringVal(line).split('-')[-1]
+            dProj = pvals[-1]
 
         if dCoord in checkSetKeys.directionCodes:
             if self.verbose:
@@ -208,83 +232,28 @@ class DbFitsInsert(BaseDbInsert):
     def __setSpectralCoord(self,lines):
         warnmsg = "Spectral coordinate value in %s interpreted as FREQ"
         spectralCoordLine = "%s  =                  FREQ"
-        specIdx = None
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if 'CTYPE' in key:
-                sval = self.__getStringVal(lines[idx])
-                if sval == 'Frequency':
-                    lines.pop(idx)
-                    lines.insert(idx,spectralCoordLine % key)
-                    self.validationMsg.append(("WARN: ",warnmsg % key))
-                    break
-                elif sval == 'FREQUENC':
-                    lines.pop(idx)
-                    lines.insert(idx,spectralCoordLine % key)
-                    self.validationMsg.append(("WARN: ",warnmsg % key))
-                    break
-            else: continue
+        for card in lines.cardsWithPrefix('CTYPE'):
+            key  = card.keyword
+            sval = card.string()
+            if sval in ('Frequency', 'FREQUENC'):
+                lines.replace(card, spectralCoordLine % key)
+                self.validationMsg.append(("WARN: ",warnmsg % key))
+                break
         return
 
     def __checkSetKeys(self, lines):
         """Method asserts presence of keywords in the header lines. The set of
         keywords is provided by checkSetKeys.checkFitsKeys list, and currently
         includes 'OBJECT', 'INSTRUME', 'TELESCOP', 'OBSERVER'. Missing keywords
-        are set by values specified in checkSetKeys.setFitsKeys dict.
+        are set by the remediation rules of checkSetKeys.fitsRules, compiled
+        once into fitsRules, a ruleEngine.RuleSet.
 
         parameters: <list>, header lines
         return:     <void>
         """
-        warnStr  = "Interpolated value: "
-        sansKeys = []
-        galfa    = False
-        telescop = False
-
-        for checkKey in checkSetKeys.checkFitsKeys:
-            keyThere = self.__assertKey(checkKey, lines)
-            if not keyThere:
-                sansKeys.append(checkKey)
-            else:
-                if checkKey == 'OBJECT' and 'GALFACT' in keyThere:
-                    galfa    = True
-                elif checkKey == 'TELESCOP':
-                    telescop = True
-                    teleValu = keyThere
-                continue
-
-        for skey in sansKeys:
-            if skey == 'TELESCOP'   and galfa is True:
-                lines.insert(3, checkSetKeys.setFitsKeys['TEL_GALFA'])
-                self.validationMsg.append(("WARN: ",warnStr+checkSetKeys.setFitsKeys['TEL_GALFA']))
-            elif skey == 'INSTRUME' and galfa is True:
-                lines.insert(3, checkSetKeys.setFitsKeys['INS_GALFA'])
-                self.validationMsg.append(("WARN: ",warnStr+checkSetKeys.setFitsKeys['INS_GALFA']))
-            elif skey == 'INSTRUME' and telescop is True:
-                lines.insert(3,self.__setInstrumentLineBasedOnTelescopeValue(teleValu))
-                self.validationMsg.append(("WARN: ",skey+" set to "+teleValu))
-            else: lines.insert(3, checkSetKeys.setFitsKeys[skey])
+        self.validationMsg.extend(fitsRules.apply(lines))
         return
 
-    def __assertKey(self, checkKey, lines):
-        """Determine the presence of a passed keyword in lines. Returns a null string
-        or the string value if found.
-
-        parameters:  <string>, <list>, keyword, header lines
-        return:      <string>, '' or string value found for the passed key.
-        """
-        keyPresent = ''
-        for line in lines:
-            key = self.__getKeyWord(line)
-            if key == checkKey:
-                keyPresent = self.__getStringVal(line)
-                break
-            else: continue
-        return keyPresent
-
-    # imitating java  ...
-    def __setInstrumentLineBasedOnTelescopeValue(self, tvalue):
-        return 'INSTRUME=                  %s /mddb insert' % tvalue
-
     def __setSpecSys(self,lines):
         """Set the spectral coordinate reference system, SPECSYS, if not present
         in the header. SPECSYS may be determined from the VELREF keyword value,
@@ -306,27 +275,23 @@ class DbFitsInsert(BaseDbInsert):
         specsysLine    = 'SPECSYS =              '
         specsysDefault = 'TOPOCENT'
         specDefIndex   = 20
-        spec = velr = vindex = False
+        spec = velr = velref = False
 
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == 'SPECSYS':
-                spec = True
-                break
-            elif key == 'VELREF':
-                velr = True
-                vindex = idx
-            else: continue
+        if lines.has('SPECSYS'):
+            spec = True
+        elif lines.has('VELREF'):
+            velr = True
+            velref = lines.cardsOf('VELREF')[-1]
 
         if not velr and not spec:
             if self.verbose: print "\n\tWriting default SPECSYS keyword..."
             lines.insert(specDefIndex,specsysLine+specsysDefault)
         elif velr and not spec:
             if self.verbose: print "\n\tFound VELREF keyword. Interpolating ..."
-            velrefValue = self.__getNumVal(lines[vindex])
+            velrefValue = velref.number()
             specsysTerm = keymaps.velrefMap[velrefValue]
             if self.verbose: print "\n\tInterpolated SPECSYS Term:",specsysTerm
-            lines.insert(vindex,specsysLine+specsysTerm)
+            lines.insertBefore(velref,specsysLine+specsysTerm)
             self.validationMsg.append(("INFO: ","VELREF keyword: "+ str(velrefValue)))
             self.validationMsg.append(("INFO: ","Interpolated SPECSYS Term: "+specsysTerm))
         else: pass
@@ -363,57 +328,45 @@ class DbFitsInsert(BaseDbInsert):
         eqRef   = "EQUINOX" + " =                "
         radeRef = "RADESYS" + " =                   "
         refSys  = {}
-        syskeys = poplist = []
-        poppings = 0
-        eqIndex = epIndex = radeIndex = refsysIndex = None
-
-        for idx in range(len(lines)):
-            key = self.__getKeyWord(lines[idx])
-            if key == 'EQUINOX':
-                eqIndex = idx
-                refSys[key] = self.__getNumVal(lines[idx])
-                syskeys.append(key)
-                if not refsysIndex: refsysIndex = idx
-                continue
-            elif key == 'EPOCH':
-                epIndex = idx
-                refSys[key] = self.__getNumVal(lines[idx])
-                syskeys.append(key)
-                if not refsysIndex: refsysIndex = idx
-                continue
-            elif key == 'RADESYS':
-                radeIndex = idx
-                refSys[key] = self.__getStringVal(lines[idx])
-                syskeys.append(key)
-                if not refsysIndex: refsysIndex = idx
-                continue
+        syskeys = []
+        poplist = []
+        refsysCard = None
 
-            # Sanity checks on extant ref sys keys ...
-            # Nominal headers, i.e. ones with both RADESYS and EQUINOX 
-            # keywords will *return* 'lines' after true assertions.
-
-            if 'EQUINOX' in syskeys and 'RADESYS' in syskeys:
-                if refSys['RADESYS'] == 'FK5':
-                    try: assert(refSys['EQUINOX'] == 2000.0)
-                    except AssertionError:
-                        self.validationMsg.append(("ERROR:","Conflicting RADESYS, EQUINOX"))
-                elif refSys['RADESYS'] == 'FK4':
-                    try:assert(refSys['EQUINOX'] == 1950)
-                    except AssertionError:
-                        self.validationMsg.append(("ERROR:","Conflicting RADESYS, EQUINOX"))
-                if self.verbose: print "\n\tFound RADESYS and EQUINOX keywords.\n"
-                return lines
-            elif len(syskeys) == 3: break
-            else: pass
+        if lines.has('EQUINOX'):
+            poplist.append(lines.cardsOf('EQUINOX')[-1])
+            refSys['EQUINOX'] = poplist[-1].number()
+            syskeys.append('EQUINOX')
+        if lines.has('EPOCH'):
+            poplist.append(lines.cardsOf('EPOCH')[-1])
+            refSys['EPOCH'] = poplist[-1].number()
+            syskeys.append('EPOCH')
+        if lines.has('RADESYS'):
+            poplist.append(lines.cardsOf('RADESYS')[-1])
+            refSys['RADESYS'] = poplist[-1].string()
+            syskeys.append('RADESYS')
+        if syskeys:
+            refsysCard = lines.ordered([lines.cardOf(key) for key in syskeys])[0]
+
+        # Sanity checks on extant ref sys keys ...
+        # Nominal headers, i.e. ones with both RADESYS and EQUINOX 
+        # keywords will *return* 'lines' after true assertions.
+
+        if 'EQUINOX' in syskeys and 'RADESYS' in syskeys:
+            if refSys['RADESYS'] == 'FK5':
+                try: assert(refSys['EQUINOX'] == 2000.0)
+                except AssertionError:
+                    self.validationMsg.append(("ERROR:","Conflicting RADESYS, EQUINOX"))
+            elif refSys['RADESYS'] == 'FK4':
+                try:assert(refSys['EQUINOX'] == 1950)
+                except AssertionError:
+                    self.validationMsg.append(("ERROR:","Conflicting RADESYS, EQUINOX"))
+            if self.verbose: print "\n\tFound RADESYS and EQUINOX keywords.\n"
+            return lines
 
         # Expunge ref sys keys, set defaults & reinsert. Expunge 
         # occurs when one (1) or three (3) ref sys keys are found.
-        poplist = [epIndex,eqIndex,radeIndex]
-        poplist.sort()
-        for popindex in poplist:
-            if popindex != None:
-                lines.pop(popindex-poppings)
-                poppings += 1
+        for card in poplist:
+            lines.remove(card)
  
         # Defaults spec'd in Calabretta & Greisen, p.1082
         if 'RADESYS' in syskeys:
@@ -431,15 +384,17 @@ class DbFitsInsert(BaseDbInsert):
             if   refSys['EQUINOX'] >= 1984: refSys['RADESYS']='FK5'
             elif refSys['EQUINOX'] <  1984: refSys['RADESYS']='FK4'
 
-        if not refsysIndex:
-            refsysIndex = 22
-
-        # Reinsert ref sys post sanity, defaulting
+        # Reinsert ref sys post sanity, defaulting, in place of the first
+        # ref sys key found, else at the arbitrary index of 22.
         eqRef   = eqRef + str(refSys['EQUINOX'])
         radeRef = radeRef + str(refSys['RADESYS'])
         if self.verbose: print "\tWriting EQUINOX and RADESYS keywords ...\n"
-        lines.insert(refsysIndex,eqRef)
-        lines.insert(refsysIndex+1,radeRef)
+        if refsysCard is None:
+            lines.insert(22,[eqRef,radeRef])
+        elif refsysCard in poplist:
+            lines.insertAfter(refsysCard,[eqRef,radeRef])
+        else:
+            lines.insertBefore(refsysCard,[eqRef,radeRef])
         self.validationMsg.append(("INFO: ","Wrote EQUINOX: "+str(refSys['EQUINOX'])))
         self.validationMsg.append(("INFO: ","Wrote RADESYS: "+str(refSys['RADESYS'])))
         return
@@ -456,18 +411,18 @@ class DbFitsInsert(BaseDbInsert):
         freqUnitKey   = None
         freqUnitValue = '  =                    Hz'
 
-        for cIndex in range(len(lines)):
-            if 'CTYPE' in lines[cIndex] and 'FREQ' in lines[cIndex]:
-                 freqIndex   = lines[cIndex].split('=')[0].strip()[-1]
-                 freqUnitKey = 'CUNIT'+freqIndex
-                 continue
-            elif lines[cIndex].split('=')[0].strip() == freqUnitKey:
-                freqUnitLine = freqUnitKey+freqUnitValue
-                lines.pop(cIndex)
-                lines.insert(cIndex,freqUnitLine)
+        for ctype in lines.cardsWithPrefix('CTYPE'):
+            if 'FREQ' in ctype.string():
+                freqIndex   = ctype.keyword[-1]
+                freqUnitKey = 'CUNIT'+freqIndex
+                break
+        if not freqUnitKey: return
+
+        for cunit in lines.cardsOf(freqUnitKey):
+            if lines.precedes(ctype, cunit):
+                lines.replace(cunit, freqUnitKey+freqUnitValue)
                 self.validationMsg.append(("WARN: ","Spectral unit set to Hz"))
                 break
-            else: continue
         return
 
     def __insertCDMatrix(self, lines):
@@ -487,23 +442,11 @@ class DbFitsInsert(BaseDbInsert):
 
         try: assert(self.__assertCDMatrix(lines))
         except AssertionError:
-            for idx in range(len(lines)):
-                if 'CDELT1' in lines[idx]:
-                    insertIndex = idx
-                    delta1 = self.__getNumVal(lines[idx])
-                    continue
-                elif 'CDELT2' in lines[idx]:
-                    insertIndex = idx
-                    delta2 = self.__getNumVal(lines[idx])
-                    continue
-                elif 'CROTA1' in lines[idx]:
-                    insertIndex = idx
-                    rota1 = self.__getNumVal(lines[idx])
-                    continue
-                elif 'CROTA2' in lines[idx]:
-                    insertIndex = idx
-                    rota2 = self.__getNumVal(lines[idx])
-                    continue
+            wcsCards, wcsVals = _cdeltCards(lines)
+            delta1 = wcsVals.get('CDELT1')
+            delta2 = wcsVals.get('CDELT2')
+            rota1  = wcsVals.get('CROTA1')
+            rota2  = wcsVals.get('CROTA2')
             rota = self.__pickRotation(rota1,rota2)
 
             # Check delta values populated. Rotation angle may be
@@ -517,11 +460,13 @@ class DbFitsInsert(BaseDbInsert):
                 self.validationMsg.append(("ERROR:",wcsErr+"CDELT2"))
                 raise FitsHeaderError, "FITS Foul: CDELT2 not found."
 
-            cdMatrix = self.__computeMatrix(delta1,delta2,rota)
-            lines.insert(insertIndex+1,"CD1_1   =\t"+str(cdMatrix[0]))
-            lines.insert(insertIndex+2,"CD1_2   =\t"+str(cdMatrix[1]))
-            lines.insert(insertIndex+3,"CD2_1   =\t"+str(cdMatrix[2]))
-            lines.insert(insertIndex+4,"CD2_2   =\t"+str(cdMatrix[3]))
+            if self.wcs: cdMatrix = self.wcs.cdMatrix(delta1,delta2,rota)
+            else: cdMatrix = computeMatrix(delta1,delta2,rota)
+            lines.insertAfter(lines.ordered(wcsCards)[-1],
+                              ["CD1_1   =\t"+str(cdMatrix[0]),
+                               "CD1_2   =\t"+str(cdMatrix[1]),
+                               "CD2_1   =\t"+str(cdMatrix[2]),
+                               "CD2_2   =\t"+str(cdMatrix[3])])
             self.validationMsg.append(("INFO: ","Wrote CD Matrix"))
         return
 
@@ -534,11 +479,9 @@ class DbFitsInsert(BaseDbInsert):
         cdmatrix    = False
         cdMatrixKey = 'CD1_1'   # if CD matrix is present, CD1_1 MUST be present.
 
-        for headerline in lines:
-            if cdMatrixKey in headerline:
-                cdmatrix = True
-                self.validationMsg.append(("INFO: ","Found CD Matrix"))
-                break
+        if lines.has(cdMatrixKey):
+            cdmatrix = True
+            self.validationMsg.append(("INFO: ","Found CD Matrix"))
         return cdmatrix
 
     def __pickRotation(self,rota1,rota2):
@@ -548,27 +491,10 @@ class DbFitsInsert(BaseDbInsert):
         parameters: <float>, <float>
         return:     <float>
         """
-        if rota2: rota = rota2
-        elif rota1 and not rota2: rota = rota1
-        elif not rota1 and not rota2: rota = 0.0
+        rota = _rotation(rota1,rota2)
         self.validationMsg.append(("INFO: ","WCS Rotation angle: " + str(rota)))
         return rota
 
-    def __computeMatrix(self, cdelt1, cdelt2, rho):
-        """Compute the Coordinate Description matrix. Caller passes
-        three arguments: CDELT1, CDELT2, CROTA2, the rotation angle if 
-        any.
-        
-        parameters: <float>, <float>, <float>
-        return:     <list>, list of four (4) CD matrix values (floats).
-        """
-
-        cd11 = cdelt1*cos(radians(rho))
-        cd12 = -1*cdelt2*sin(radians(rho))
-        cd21 = cdelt1*sin(radians(rho))
-        cd22 = cdelt2*cos(radians(rho))
-        return [cd11,cd12,cd21,cd22]
-
     def __insertDBKeys(self,headerLines, uri):
         """Insert required MDDB keywords for CAOM database insertion.
         See xDBkeys module.
@@ -576,41 +502,28 @@ class DbFitsInsert(BaseDbInsert):
         parameters: <list>, a list of header line strings
         return:     <void>
         """
-
+        dbLines = []
         for xi in range(len(xDBKeys.xdbkeys)):
             if 'DATAURI' in xDBKeys.xdbkeys[xi][0]:
-                headerLines.insert(xi+3,xDBKeys.xdbkeys[xi][0]+ \
-                                       '=\t\t'+ uri)
+                dbLines.append(xDBKeys.xdbkeys[xi][0]+'=\t\t'+ uri)
             else:
-                headerLines.insert(xi+3,xDBKeys.xdbkeys[xi][0]+ \
-                                       '=\t\t'+str(xDBKeys.xdbkeys[xi][1]))
+                dbLines.append(xDBKeys.xdbkeys[xi][0]+ \
+                               '=\t\t'+str(xDBKeys.xdbkeys[xi][1]))
+        headerLines.insert(3, dbLines)
         self.validationMsg.append(("INFO: ","Data URI "+uri))
         return
 
-    def __stripComment(self,lines):
-        """Strip the comments from any header lines.
-
-        parameters: <list>, a list of header lines as strings
-        return:     <list>, a list of header lines, stripped of comments
-        """
-        stripped =[]
-        for line in lines:
-            if "COMMENT" in line:   continue
-            elif "HISTORY" in line: continue
-            stripped.append(line.split('/')[0].strip())
-        return stripped
-
     def __dates2mjd(self,lines):
         """For DATE like header keywords produce an MJD. CAOM model requires
         dates in MJD. 'MJD-OBS' keyword is inserted, as are CTYPE5,CUNIT5,
         CRPIX5,CRVAL5 CAOM representation of CAOM time config.
 
-        A TypeError is raised if dateObsIndex remains <NoneType>, i.e. DATE-OBS
-        is not found. A default DATE-OBS is then inserted at the arbitrary index
-        of 20. Default date is 2020-01-01.
-
-        N.B. Future implementations will examine other possible observation date
-        keywords that may be used, eg., OBSDATE, START-OBS, ...
+        The time source is picked by dateParse.bestTime(), from the first of
+        MJD-OBS or DATE-OBS, then MJD-BEG or DATE-BEG, then OBSDATE, then
+        DATE. An MJD-OBS source needs no action. If no time keyword is found,
+        a default DATE-OBS is inserted at the arbitrary index of 20. Default
+        date is 2020-01-01. A FitsHeaderError is raised if time keywords are
+        found but none can be read.
 
         MJD zero point = 2400000.5
         
@@ -618,110 +531,69 @@ class DbFitsInsert(BaseDbInsert):
         return:     <void>
         """
         parseErr     = "Could not parse DATE-OBS, Ref. ISO 8601"
-        dateObsIndex = None
         defDateLine  = 'DATE-OBS=            2020-01-01'
-        MJD0         = 2400000.5
-
-        for i in range(len(lines)):
-            try:
-                assert("MJD-OBS" in lines[i])
-                self.validationMsg.append(("INFO: ","MJD-OBS keyword found. No Action."))
-                return
-            except AssertionError: pass
-            try: 
-                assert("DATE-OBS" in lines[i])
-                dateObsIndex = i
-                break
-            except AssertionError: continue
 
-        try:
-            key,dateVal=lines[dateObsIndex].split('=')
-        except TypeError:
-            dateObsIndex = 20
-            lines.insert(dateObsIndex,defDateLine)
-            key,dateVal=defDateLine.split('=')
+        timeCard, mjdDate, rejected = dateParse.bestTime(lines, dateParse.fitsTimeKeys)
+
+        if timeCard is None:
+            if rejected:
+                for key, raw in rejected:
+                    self.validationMsg.append(("ERROR:","Unrecognized "+key+" value"))
+                self.validationMsg.append(("ERROR:",parseErr))
+                raise FitsHeaderError
+            timeCard = lines.insert(20,parseCard(defDateLine))
+            dateVal  = timeCard.string()
+            mjdDate  = dateParse.dateMjd(dateVal)
             if self.verbose: print "\tDATE-OBS not found. Inserted default."
             if self.verbose: print "\t",defDateLine,"\n"
             self.validationMsg.append(("WARN: ","DATE-OBS not found"))
             self.validationMsg.append(("WARN: ","DATE-OBS Defaulted: " + dateVal))
+        else:
+            for key, raw in rejected:
+                self.validationMsg.append(("WARN: ","Unrecognized "+key+" value: "+raw))
 
-        isoDayTimeList = self.__parseISODate(dateVal)
-
-        if len(isoDayTimeList) < 3:
-            self.validationMsg.append(("ERROR:","Unrecognized DATE-OBS value"))
-            self.validationMsg.append(("ERROR:",parseErr))
-            raise FitsHeaderError
+        if timeCard.keyword == 'MJD-OBS':
+            self.validationMsg.append(("INFO: ","MJD-OBS keyword found. No Action."))
+            return
+        if timeCard.keyword != 'DATE-OBS':
+            self.validationMsg.append(("INFO: ","MJD-OBS from "+timeCard.keyword))
 
-        iyear = isoDayTimeList[0]
-        imon  = isoDayTimeList[1]
-        iday  = isoDayTimeList[2]
-        if len(isoDayTimeList) == 6:
-            ihour = isoDayTimeList[3]
-            imin  = isoDayTimeList[4]
-            isec  = isoDayTimeList[5]
-        else:
-            ihour = '0'
-            imin  = '0'
-            isec  = '0.0'
-        mjdDate = mjdConversions.julian_date(iyear,imon,iday,ihour,imin,isec) - MJD0
-        mjdLine = 'MJD-OBS =\t'+ str(mjdDate)
-        lines.insert(dateObsIndex+1,mjdLine)
+        mjdLines = ['MJD-OBS =\t'+ str(mjdDate)]
         # insert the db wcs.time keys
         for i in range(len(xDBKeys.dbWcsTimeKeys)):
             if 'CRVAL5' in xDBKeys.dbWcsTimeKeys[i][0]:
-                lines.insert(dateObsIndex+i+2,xDBKeys.dbWcsTimeKeys[i][0]+ \
-                                '=\t'+ str(mjdDate))
+                mjdLines.append(xDBKeys.dbWcsTimeKeys[i][0]+'=\t'+ str(mjdDate))
                 continue
-            lines.insert(dateObsIndex+i+2,xDBKeys.dbWcsTimeKeys[i][0]+ \
-                                '=\t\t'+str(xDBKeys.dbWcsTimeKeys[i][1]))
+            mjdLines.append(xDBKeys.dbWcsTimeKeys[i][0]+ \
+                            '=\t\t'+str(xDBKeys.dbWcsTimeKeys[i][1]))
+        lines.insertAfter(timeCard, mjdLines)
         return
 
-    def __parseISODate(self,dval):
-        """Method receives a date-time of the expected ISO8601 format
-        returns a set of values for year, month, day, hour, min, sec,
-        where ISO8601 format is
-        
-        yyyy-mm-ddThh:mm:ss.ssss
-        
-        eg.,
-
-        >>> .__parseISODate('2011-09-10T18:28:58.511999')
-        2011,9,10,18,28,58.511999
 
-        parameters: <string>, DATE-OBS ISO 8601 
-        return:     <list>,   a list of strings, as
-                              ['yyyy','mm','dd,'hh','mm','ss.sss']
-        """
-        daytime = dval.strip().strip("'").split('T')
-        ymd = daytime[0].split('-')
-        if len(daytime) == 2:
-            hms   = daytime[1].split(':')
-        else: hms = []
-        return ymd+hms
-
-    #################### List line keys & values methods. ###################
+def _cdeltCards(lines):
+    """The last CDELT1, CDELT2, CROTA1 and CROTA2 Cards of a Header, and
+    their values by keyword.
 
-    def __getNumVal(self, line):
-        """Pare a numeric value from a header line string.
-
-        parameters: <string>
-        return:     <float>
-        """
-        return float(line.split('=')[1].split('/')[0].strip())
-
-    def __getStringVal(self, line):
-        """Pare string value from a header line string.
-
-        parameters: <string>
-        return:     <string>
-        """
-        return line.split('=')[1].split('/')[0].strip()
+    parameters: <Header>
+    return:     <list>, <dict>, Cards, {keyword: value}
+    """
+    wcsVals = {}
+    wcsCards = []
+    for key in ['CDELT1','CDELT2','CROTA1','CROTA2']:
+        if not lines.has(key): continue
+        wcsCards.append(lines.cardsOf(key)[-1])
+        wcsVals[key] = wcsCards[-1].number()
+    return wcsCards, wcsVals
 
-    def __getKeyWord(self, line):
-        """Pare a keyword from a header line string.
 
-        parameters: <string>
-        return:     <string>
-        """
-        return line.split('=')[0].strip()
+def _rotation(rota1, rota2):
+    """The rotation angle of two, where rota2 is preferred. Zero if both
+    NoneType.
 
+    parameters: <float>, <float>
+    return:     <float>
+    """
+    if rota2: rota = rota2
+    elif rota1 and not rota2: rota = rota1
+    elif not rota1 and not rota2: rota = 0.0
+    return rota
@@ -21,6 +21,8 @@ from mddb.mains.baseDbInsert import BaseDbInsert
 
 class DbMSInsert(BaseDbInsert):
 
+    mtype = 'image/ms-uvw'
+
     def configureOverride(self, hdr, uri, public):
         super(DbMSInsert, self).configureOverride()
         return
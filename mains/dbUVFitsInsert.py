@@ -21,6 +21,8 @@ from mddb.mains.baseDbInsert import BaseDbInsert
 
 class DbUVFitsInsert(BaseDbInsert):
 
+    mtype = 'image/fits-uvw'
+
     def configureOverride(self, hdr, uri, public):
         super(DbUVFitsInsert, self).configureOverride()
         return
@@ -21,6 +21,7 @@ projection_types = ['DEF','AZP','TAN','SIN','STG','ARC','ZPN','ZEA','AIR','CYP',
 
 
 from checkSetKeys import checkFitsKeys, setFitsKeys
+from mddb.utils.cards import parseCard
 
 def checkSetKeys(lines):
     sansKeys = []
@@ -51,10 +52,9 @@ def checkSetKeys(lines):
 
 def assertKey(checkKey, lines):
     keyPresent = ''
-    for line in lines:
-        key = getKeyWord(line)
-        if key == checkKey:
-            keyPresent = getStringVal(line)
+    for card in readCards(lines):
+        if card.keyword == checkKey:
+            keyPresent = card.string()
             break
         else: continue
     return keyPresent
@@ -72,9 +72,9 @@ def checkSetObserver(lines):
     """assert keyword OBSERVER; set to 'Unknown' if false."""
     obsrvrKey = 'OBSERVER=               Unknown / mddb inserted\n'
     obsrvr    = False
-    for line in lines:
-        key = getKeyWord(line)
-        if key == getKeyWord(obsrvrKey):
+    checkKey = getKeyWord(obsrvrKey)
+    for card in readCards(lines):
+        if card.keyword == checkKey:
             obsrvr = True
             break
         else: continue
@@ -88,9 +88,9 @@ def checkSetTele(lines):
     teleKey    = 'TELESCOP=               Unknown / mddb inserted\n'
     areciboKey = 'TELESCOP=               Arecibo / mddb inserted\n'
     tele    = False
-    for line in lines:
-        key = getKeyWord(line)
-        if key == getKeyWord(teleKey):
+    checkKey = getKeyWord(teleKey)
+    for card in readCards(lines):
+        if card.keyword == checkKey:
             tele = True
             break
         else: continue
@@ -109,9 +109,9 @@ def checkSetInstr(lines):
     """assert keyword INSTRUME; set to 'Unknown' if false."""
     instruKey= 'INSTRUME=               Unknown / mddb inserted\n'
     instru   = False
-    for line in lines:
-        key = getKeyWord(line)
-        if key == getKeyWord(instruKey):
+    checkKey = getKeyWord(instruKey)
+    for card in readCards(lines):
+        if card.keyword == checkKey:
             instru = True
             break
         else: continue
@@ -126,10 +126,9 @@ def setArecibo(lines):
     objectTest = 'GALFACTS'
     arecibo    = False
     
-    for line in lines:
-        key = getKeyWord(line)
-        if key == objKey:
-            val = getStringVal(line)
+    for card in readCards(lines):
+        if card.keyword == objKey:
+            val = card.string()
             if objectTest in val:
                 arecibo = True
                 break
@@ -138,13 +137,24 @@ def setArecibo(lines):
 
 # ---------------------------------- utils --------------------------------------
 
+def readCards(lines):
+    """Read header lines into cards.Card records, each line once. A
+    utils.header.Header passes its Cards as already read.
+
+    parameters: <list>, header lines, or a Header
+    return:     <list>, list of Cards
+    """
+    try: return lines.cardList()
+    except AttributeError:
+        return [parseCard(line) for line in lines]
+
 def getNumVal(line):
     """Pare a numeric value from a header line string.
     
     parameters: <string>
     return:     <float>
     """
-    return float(line.split('=')[1].split('/')[0].strip())
+    return parseCard(line).number()
 
 def getStringVal(line):
     """Pare string value from a header line string.
@@ -152,7 +162,7 @@ def getStringVal(line):
     parameters: <string>
     return:     <string>
     """
-    return line.split('=')[1].split('/')[0].strip()
+    return parseCard(line).string()
 
 def getKeyWord(line):
     """Pare a keyword from a header line string.
@@ -160,5 +170,5 @@ def getKeyWord(line):
     parameters: <string>
     return:     <string>
     """
-    return line.split('=')[0].strip()
+    return parseCard(line).keyword
 
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.utils.atomicFile.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides whole file writes of the override, validation, nogo and
+header files. A file is built as one string, written to a temporary file in
+its directory and renamed over the final name, so a reader, eg. fits2caom,
+never sees a part written file, even if the writing process dies.
+
+Renamed files are not otherwise synced, as before. A SyncGroup adds fsync
+for batch runs: each file written in the group is fsync'ed before it is
+renamed into place, so a system crash never leaves a zero length or part
+written file at the final name, and every files, their directories are
+fsync'ed, at once, so a crash loses at most the last every renames. Files
+appended to in place, eg. segmentStore segments, are fsync'ed with the
+group. It is set in the mddb config file by,
+
+[write]
+sync = 64
+
+where 0, the default, is no fsync.
+
+eg.,
+
+>>> group = syncGroup(64)
+>>> writeLines('/srv/cyberska/DQS/OVERRIDE/m100.fits.override', lines, group)
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import thread as _thread
+import threading
+
+_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+
+# sync groups, by (process id, files per sync)
+_groups = {}
+
+
+def writeText(path, text, group=None):
+    """Write text as the whole of file path, atomically.
+
+    parameters: <string>, <string>, <SyncGroup>, file, text, optional group
+    return:     <string>, file name
+    """
+    where, name = os.path.split(path)
+    tmp = os.path.join(where, '.%s.%d.%d.tmp' % (name, os.getpid(), _thread.get_ident()))
+    try:
+        fd = os.open(tmp, _FLAGS, 0666)
+        try:
+            done = 0
+            while done < len(text): done += os.write(fd, text[done:])
+            if group: os.fsync(fd)
+        finally: os.close(fd)
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    if group: group.add(path, synced=True)
+    return path
+
+
+def writeLines(path, lines, group=None):
+    """Write lines, each with a newline, as the whole of file path,
+    atomically.
+
+    parameters: <string>, <list>, <SyncGroup>, file, lines, optional group
+    return:     <string>, file name
+    """
+    text = "\n".join(lines)
+    if lines: text += "\n"
+    return writeText(path, text, group)
+
+
+def syncGroup(every):
+    """Return the SyncGroup of this process syncing every files, or None if
+    every is 0.
+
+    parameters: <int>
+    return:     <SyncGroup>
+    """
+    if not every: return None
+    key = (os.getpid(), every)
+    if key not in _groups: _groups[key] = SyncGroup(every)
+    return _groups[key]
+
+
+class SyncGroup(object):
+
+    def __init__(self, every):
+        """Group fsync of every files written, and their directories.
+        Files written by writeText() are fsync'ed before their rename, so
+        only their directories are left to the group. Files pending at
+        process exit are synced then.
+
+        parameters: <int>, files per sync
+        """
+        self.every   = every
+        self.pending = []
+        self.lock    = threading.Lock()
+        self.syncs   = 0
+        import multiprocessing.util     # only with [write] sync set
+        multiprocessing.util.Finalize(self, _sync, args=(self.pending, self.lock),
+                                      exitpriority=10)
+
+    def add(self, path, synced=False):
+        """Add a written file, syncing the group if it is full. A synced
+        file, already fsync'ed, has only its directory synced."""
+        with self.lock:
+            self.pending.append((path, synced))
+            full = len(self.pending) >= self.every
+        if full: self.sync()
+        return
+
+    def sync(self):
+        """fsync the pending files, then their directories."""
+        if _sync(self.pending, self.lock): self.syncs += 1
+        return
+
+
+def _sync(pending, lock):
+    with lock:
+        paths = pending[:]
+        del pending[:]
+    if not paths: return False
+    dirs = []
+    for path in sorted(set([path for path, synced in paths if not synced])):
+        _fsync(path)
+    for path, synced in paths:
+        where = os.path.dirname(os.path.abspath(path))
+        if where not in dirs: dirs.append(where)
+    for where in dirs: _fsync(where)
+    return True
+
+
+def _fsync(path):
+    try: fd = os.open(path, os.O_RDONLY)
+    except OSError: return
+    try: os.fsync(fd)
+    finally: os.close(fd)
+    return
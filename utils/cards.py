@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                            mddb.utils.cards.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides the header card record shared by the insert classes and the
+keyAssertions helpers. A header line is read once into a Card, holding the
+keyword, the raw value text, the typed value (bool, int, float or str) and any
+comment. FITS quoted strings may contain '/' and '=' characters, and quotes
+are escaped as '' per the FITS standard.
+
+eg.,
+
+>>> card = parseCard("BUNIT   = 'Jy/beam '           /Brightness (pixel) unit")
+>>> card.keyword, card.raw, card.value, card.comment
+('BUNIT', "'Jy/beam '", 'Jy/beam', 'Brightness (pixel) unit')
+>>> parseCard("NAXIS   =                    4").value
+4
+
+CASA Image header lines, as written by the metaData package, carry no '='
+value indicator. These are read by parseCasaCard(), where the keyword is
+the first whitespace separated field and the raw value is the remainder.
+
+>>> card = parseCasaCard("REFERENCE2-PIXEL     32.0, 32.0")
+>>> card.keyword, card.raw
+('REFERENCE2-PIXEL', '32.0, 32.0')
+
+streamCards() reads the lines of an open header file into Cards as they are
+read, dropping commentary cards by keyword, eg. COMMENT and HISTORY, before
+they are parsed. Only a count of the dropped cards is kept, in a Dropped.
+
+>>> dropped = Dropped()
+>>> cards = list(streamCards(open(hdrFile), ('COMMENT', 'HISTORY'), dropped))
+>>> dropped.report()
+'HISTORY 12000, COMMENT 2'
+"""
+# ------------------------------------------------------------------------------
+
+import re
+
+_keyRe = re.compile(r"\s*([^\s=]*)\s*(=?)")
+_intRe = re.compile(r"[+-]?\d+$")
+_fltRe = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([EeDd][+-]?\d+)?$")
+
+
+class Card(object):
+
+    __slots__ = ('keyword', 'raw', 'value', 'comment', 'image')
+
+    def __init__(self, keyword, raw, value, comment, image):
+        """A header card. The image is the line text as it will be written,
+        i.e. the card as read, less any comment when read with strip=True.
+        """
+        self.keyword = keyword
+        self.raw     = raw
+        self.value   = value
+        self.comment = comment
+        self.image   = image
+
+    def __repr__(self):
+        return "Card(%r, %r)" % (self.keyword, self.value)
+
+    def string(self):
+        """Return the value of a string card, unquoted, or the raw value text
+        of any other card.
+
+        return: <string>
+        """
+        if isinstance(self.value, basestring): return self.value
+        return self.raw
+
+    def number(self):
+        """Return the value as a float. Raise ValueError if not numeric.
+
+        return: <float>
+        """
+        if isinstance(self.value, (int, long, float)) and \
+                not isinstance(self.value, bool):
+            return float(self.value)
+        raise ValueError("Non-numeric value for "+self.keyword+": "+str(self.raw))
+
+
+def typedValue(raw):
+    """Return the typed value of a raw, unquoted FITS value string. Logical
+    T/F values are bool, integers int, reals float. Anything else is returned
+    as the passed string.
+
+    parameters: <string>
+    return:     <bool>|<int>|<float>|<string>
+    """
+    if raw == 'T': return True
+    if raw == 'F': return False
+    if _intRe.match(raw): return int(raw)
+    if _fltRe.match(raw): return float(raw.replace('D','E').replace('d','e'))
+    return raw
+
+
+def parseCard(line, strip=False):
+    """Read a FITS header line into a Card. A line without a '=' value
+    indicator, eg. a COMMENT or HISTORY card, is a commentary card with a
+    value of None, and the remainder of the line as its comment. When strip
+    is True, the Card image is the stripped line less any comment, as the
+    insert classes write it into an override.
+
+    parameters: <string>, <bool>, header line, strip switch
+    return:     <Card>
+    """
+    line    = line.rstrip('\r\n')
+    match   = _keyRe.match(line)
+    key, eq = match.groups()
+    vstart  = match.end()
+
+    if not eq:
+        image = line
+        if strip: image = line.strip()
+        return Card(key, '', None, line[vstart:].strip() or None, image)
+
+    rest   = line[vstart:]
+    lead   = len(rest) - len(rest.lstrip())
+    rest   = rest.lstrip()
+    cstart = None
+
+    if rest.startswith("'"):
+        i = 1
+        while True:
+            j = rest.find("'", i)
+            if j < 0:
+                raw   = rest.rstrip()
+                value = rest[1:].replace("''", "'").rstrip()
+                break
+            if rest[j+1:j+2] == "'":
+                i = j+2
+                continue
+            raw   = rest[:j+1]
+            value = rest[1:j].replace("''", "'").rstrip()
+            slash = rest.find('/', j+1)
+            if slash >= 0: cstart = slash
+            break
+    else:
+        slash = rest.find('/')
+        if slash >= 0:
+            cstart = slash
+            raw = rest[:slash].strip()
+        else:
+            raw = rest.strip()
+        value = typedValue(raw)
+
+    comment = None
+    image   = line
+    if cstart is not None:
+        comment = rest[cstart+1:].strip()
+        if strip: image = line[:vstart+lead+cstart]
+    if strip: image = image.strip()
+    return Card(key, raw, value, comment, image)
+
+
+def parseCasaCard(line):
+    """Read a CASA Image header line, as written by the metaData package, into
+    a Card. The keyword is the first field, the raw value the remainder of the
+    line. The typed value is taken from the raw value. CASA Image headers
+    carry no comments.
+
+    parameters: <string>, header line
+    return:     <Card>
+    """
+    image  = line.rstrip('\r\n')
+    fields = image.split(None, 1)
+    if not fields: return Card('', '', None, None, image)
+    if len(fields) == 1: return Card(fields[0], '', None, None, image)
+    raw = fields[1].strip()
+    return Card(fields[0], raw, typedValue(raw), None, image)
+
+
+def keywordOf(line):
+    """Return the keyword of a header line, as parseCard() reads it."""
+    return _keyRe.match(line).group(1)
+
+
+class Dropped(object):
+
+    __slots__ = ('counts', 'order')
+
+    def __init__(self):
+        """Count of the cards dropped by streamCards(), by keyword. The
+        cards are not kept, so its size is bounded by the keywords dropped.
+        """
+        self.counts = {}
+        self.order  = []
+
+    def __len__(self):
+        return sum(self.counts.values())
+
+    def add(self, key):
+        if key not in self.counts:
+            self.counts[key] = 0
+            self.order.append(key)
+        self.counts[key] += 1
+
+    def report(self):
+        """Return the counts, by keyword in the order first dropped, eg.
+        'HISTORY 12000, COMMENT 2'.
+
+        return: <string>
+        """
+        return ", ".join(["%s %d" % (key, self.counts[key]) for key in self.order])
+
+
+def streamCards(lines, drop=(), dropped=None, strip=True):
+    """Generate the Cards of header lines, eg. an open header file, one
+    line at a time, dropping the cards whose keyword is in drop. A dropped
+    card is counted in dropped, a Dropped, if given, and not parsed.
+
+    parameters: <iterable>, <tuple>, <Dropped>, <bool>,
+                header lines, keywords dropped, dropped count, strip switch
+    return:     <generator>, of Cards, read by parseCard(line, strip)
+    """
+    for line in lines:
+        key = keywordOf(line)
+        if key in drop:
+            if dropped is not None: dropped.add(key)
+            continue
+        yield parseCard(line, strip)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.utils.casaHeader.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides CasaImageHeader, the CASA Image header written by the
+metaData package read once into a typed model. The cards of a header.Header,
+read by cards.parseCasaCard, are taken in one pass, each keyword dispatched
+to the part of the model it describes,
+
+    TELESCOP_LAT, _LON, _HGT       telescope position
+    IMAGE-SHAPE                    image shape
+    N_OF-AXES                      number of coordinates
+    COORDINATE<n>-TYPE, -NAME      coordinate n type and axis names
+    PROJECTION<n>                  coordinate n projection
+    REFERENCE<n>-VALUE, -PIXEL     coordinate n reference value and pixel
+    INCREMENT<n>, INCREMENT<n>_UNITS
+                                   coordinate n increment and its units
+    FRAME<n>                       coordinate n reference frame
+    REST-FREQUENCY                 rest frequency
+
+Multiply valued fields, eg. 'REFERENCE0-VALUE  115, GHz' or
+'INCREMENT2  +0.0.1.0, -0.0.1.0', are read into a Quantity, the values as
+written and any trailing unit. Each part keeps the Card it was read from, the
+anchor for lines placed by DbCImageInsert. As with Header.cardOf(), the first
+card of a keyword is the one taken.
+
+eg.,
+
+>>> casa = CasaImageHeader(Header(lines, parseCasaCard))
+>>> casa.shape
+(64, 64, 1, 1)
+>>> coord = casa.coordinate('direction')
+>>> coord.index, coord.names, coord.projection
+(2, ('Declination', 'Right Ascension'), 'SIN')
+>>> casa.coordinate('spectral').refValue.values, casa.coordinate('spectral').refValue.unit
+(('115',), 'GHz')
+"""
+# ------------------------------------------------------------------------------
+
+import re
+
+_coordRe = re.compile(r"(COORDINATE|PROJECTION|REFERENCE|INCREMENT|FRAME)(\d+)(.*)$")
+_unitRe  = re.compile(r"[A-Za-z]+$")
+
+# (keyword prefix, suffix) of the coordinate keywords, to Coordinate field
+_FIELDS = {
+    ('COORDINATE', '-TYPE') : 'type',
+    ('COORDINATE', '-NAME') : 'names',
+    ('PROJECTION', '')      : 'projection',
+    ('REFERENCE',  '-VALUE'): 'refValue',
+    ('REFERENCE',  '-PIXEL'): 'refPixel',
+    ('INCREMENT',  '')      : 'increment',
+    ('INCREMENT',  '_UNITS'): 'units',
+    ('FRAME',      '')      : 'frame',
+    }
+
+
+class CasaHeaderError(ValueError):
+    """Raise this error when a CASA Image header value cannot be read."""
+    pass
+
+
+class Quantity(object):
+
+    __slots__ = ('values', 'unit', 'card')
+
+    def __init__(self, values, unit, card):
+        """A multiply valued field, eg. '115, GHz', or '32.0, 32.0'.
+
+        parameters: <tuple>, <string>, <Card>, value strings, unit or None, card
+        """
+        self.values = values
+        self.unit   = unit
+        self.card   = card
+
+    def __repr__(self):
+        return "Quantity(%r, %r)" % (self.values, self.unit)
+
+    def numbers(self):
+        """Return the values as floats. Raise CasaHeaderError if not numeric.
+
+        return: <tuple>, tuple of floats
+        """
+        try: return tuple([float(val) for val in self.values])
+        except ValueError:
+            raise CasaHeaderError, "Non-numeric value for "+self.card.keyword
+
+    def pair(self):
+        """Return the two values of a two valued field, eg. the (dec, ra) of a
+        direction coordinate. Raise CasaHeaderError otherwise.
+
+        return: <tuple>, 2-tuple of strings
+        """
+        if len(self.values) != 2:
+            raise CasaHeaderError, "Expected two values for "+self.card.keyword
+        return self.values
+
+
+class Coordinate(object):
+
+    __slots__ = ('index', 'type', 'names', 'projection', 'refValue', 'refPixel',
+                 'increment', 'units', 'frame', 'cards')
+
+    def __init__(self, index):
+        """A CASA Image coordinate, COORDINATE<index>. Fields not found in the
+        header are None; cards holds the Card of each field found.
+
+        parameters: <int>, coordinate number
+        """
+        self.index      = index
+        self.type       = None
+        self.names      = None
+        self.projection = None
+        self.refValue   = None
+        self.refPixel   = None
+        self.increment  = None
+        self.units      = None
+        self.frame      = None
+        self.cards      = {}
+
+    def __repr__(self):
+        return "Coordinate(%d, %r, %r)" % (self.index, self.type, self.names)
+
+
+class CasaImageHeader(object):
+
+    def __init__(self, lines):
+        """Read the cards of a header.Header into the model, in one pass.
+
+        parameters: <Header>, CASA Image header
+        """
+        self.cards         = lines.cardList()
+        self.position      = None
+        self.positionCard  = None
+        self.shape         = None
+        self.shapeCard     = None
+        self.naxes         = None
+        self.naxesCard     = None
+        self.restFrequency = None
+        self.coordinates   = {}
+        self.order         = {}
+        telescope = {}
+        for i, card in enumerate(self.cards):
+            key = card.keyword
+            if key in self.order: continue
+            self.order[key] = i
+            if key.startswith('TELESCOP_'):
+                telescope[key] = card
+            elif key == 'IMAGE-SHAPE':
+                self.shape     = _shape(card)
+                self.shapeCard = card
+            elif key == 'N_OF-AXES':
+                self.naxes     = int(card.number())
+                self.naxesCard = card
+            elif key == 'REST-FREQUENCY':
+                self.restFrequency = _quantity(card)
+            else:
+                match = _coordRe.match(key)
+                if match: self.__coordinate(match, card)
+        if len([key for key in ('TELESCOP_LAT', 'TELESCOP_LON', 'TELESCOP_HGT')
+                if key in telescope]) == 3:
+            self.position = (telescope['TELESCOP_LAT'].number(),
+                             telescope['TELESCOP_LON'].number(),
+                             telescope['TELESCOP_HGT'].number())
+            self.positionCard = telescope['TELESCOP_HGT']
+
+    def coordinate(self, ctype):
+        """Return the first Coordinate of type ctype, eg. 'direction', or None."""
+        for coord in self.axes():
+            if coord.type == ctype: return coord
+        return None
+
+    def axes(self):
+        """Return the Coordinates numbered below N_OF-AXES, and typed after it,
+        in the header order of their COORDINATE<n>-TYPE cards.
+
+        return: <list>, list of Coordinates
+        """
+        if self.naxesCard is None: return []
+        start  = self.order['N_OF-AXES']
+        coords = [coord for coord in self.coordinates.values()
+                  if coord.type is not None and coord.index < self.naxes and
+                  self.order[coord.cards['type'].keyword] > start]
+        coords.sort(key=lambda coord: self.order[coord.cards['type'].keyword])
+        return coords
+
+    def following(self, card, n):
+        """Return the card n lines after card in the header as read, or None."""
+        i = self.order[card.keyword] + n
+        if i < len(self.cards): return self.cards[i]
+        return None
+
+    ############################### prive ##################################
+
+    def __coordinate(self, match, card):
+        prefix, index, suffix = match.groups()
+        field = _FIELDS.get((prefix, suffix))
+        if field is None: return
+        index = int(index)
+        coord = self.coordinates.get(index)
+        if coord is None: coord = self.coordinates[index] = Coordinate(index)
+        coord.cards[field] = card
+        if field in ('type', 'projection', 'frame'):
+            setattr(coord, field, card.string())
+        elif field in ('names', 'units'):
+            setattr(coord, field, _values(card.raw))
+        else:
+            setattr(coord, field, _quantity(card))
+        return
+
+
+def _values(raw):
+    # comma separated, or failing a comma, whitespace separated
+    if ',' in raw: return tuple([val.strip() for val in raw.split(',') if val.strip()])
+    return tuple(raw.split())
+
+
+def _quantity(card):
+    values = list(_values(card.raw))
+    unit   = None
+    if len(values) > 1 and _unitRe.match(values[-1]):
+        unit = values.pop()
+    return Quantity(tuple(values), unit, card)
+
+
+def _shape(card):
+    dims = card.raw.strip('[]').split(',')
+    try: return tuple([int(dim) for dim in dims])
+    except ValueError:
+        raise CasaHeaderError, "Unrecognized IMAGE-SHAPE: "+card.raw
@@ -29,7 +29,6 @@ a calling class method. Insertion of respective metadata into CADC database
 # /////////////////////////////////////////////////////////////////////////////#
 
 from os.path import join
-from ConfigParser import SafeConfigParser as configparser
 from ConfigParser import NoOptionError
 
 from mddb.config.mddbEnv import MDDBEnv
@@ -93,8 +92,7 @@ class F2CArgs(object):
         """
         boolOpts = 'switches'
 
-        conf = configparser()
-        conf.read(self.mddb_env.configFile)
+        conf = self.mddb_env.config
         opts = conf.options(boolOpts)
         for opt in opts:
             try: 
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                      mddb.utils.f2cExecutor.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+"""Module and class provides an executor for fits2caom command lines, as built
+by f2cArgs.F2CArgs.buildCmdLine(). Up to a limit of fits2caom processes run
+concurrently, each under a wall time limit, set in the [execute] section of
+the mddb config file,
+
+[execute]
+executable = %(dqs)s/fits2caom/fits2caom
+limit      = 4
+timeout    = 3600
+
+A timeout of 0 is no limit. Each process is started in its own session,
+and on timeout its whole process group is killed, so that nothing fits2caom
+itself started is left running. The stdout and stderr of each process are
+written, as they arrive, to a log file in the DQS logs directory, named for
+the collection id, the pid and a run number, eg.
+$DQS/logs/31261.4711-0.fits2caom.out, so that concurrent or repeated runs
+never share a log. Nothing is held in memory. Each process is reported in
+an F2CResult.
+
+eg.,
+
+>>> executor = F2CExecutor('mddb.cfg')
+>>> executor.submit('M100contimage.fits', '31261', cmd)
+>>> for result in executor.drain(): print result
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import time
+import signal
+import itertools
+
+from subprocess import Popen, STDOUT
+
+from mddb.config.mddbEnv import MDDBEnv
+
+# seconds between polls of running processes
+POLL = 0.1
+
+# run numbers, unique within the process, over all executors and threads
+_runs = itertools.count()
+
+
+class F2CResult(object):
+
+    def __init__(self, seq, tag, collId, logFile):
+        """A fits2caom run, seq being its order of submission. returncode
+        is None if the process could not be started, as described by error.
+        """
+        self.seq        = seq
+        self.tag        = tag
+        self.collId     = collId
+        self.logFile    = logFile
+        self.returncode = None
+        self.wallTime   = 0.0
+        self.timedOut   = False
+        self.error      = None
+
+    def __repr__(self):
+        return "F2CResult(%r, exit %r, %.1fs, %r)" % \
+            (self.tag, self.returncode, self.wallTime, self.logFile)
+
+    def ok(self):
+        return self.returncode == 0
+
+    def describe(self):
+        """A one line account of a failed run."""
+        if self.error:     return "fits2caom not run: "+self.error
+        if self.timedOut:  return "fits2caom timed out after %.0fs, see %s" % \
+                (self.wallTime, self.logFile)
+        return "fits2caom exit %s, see %s" % (self.returncode, self.logFile)
+
+
+class F2CExecutor(object):
+
+    def __init__(self, configFile, limit=None, timeout=None):
+        """Constuctor returns an F2CExecutor instance. limit and timeout
+        default to the [execute] values of the config file.
+
+        parameters: <string>, <int>, <float>, config file, process limit, timeout
+        """
+        self.mddb_env = MDDBEnv()
+        self.mddb_env.configure(configFile)
+
+        if limit is None:   limit   = self.mddb_env.executeLimit
+        if timeout is None: timeout = self.mddb_env.executeTimeout
+        self.limit   = max(1, int(limit))
+        self.timeout = float(timeout)
+        self.queued  = []
+        self.running = []
+        self.failed  = []
+        self.pending = []
+        self.seq     = 0
+
+    def run(self, jobs):
+        """Run a list of (tag, collId, cmd) jobs to completion. Jobs
+        submitted before, and not yet returned by poll(), run on too; their
+        results are kept, for the next poll() or drain().
+
+        parameters: <list>, list of (tag, collId, cmd) 3-tuples
+        return:     <list>, list of F2CResults, in the order of jobs
+        """
+        first = self.seq
+        for tag, collId, cmd in jobs:
+            self.submit(tag, collId, cmd)
+        results = []
+        for result in self.drain():
+            if result.seq >= first: results.append(result)
+            else: self.pending.append(result)
+        results.sort(key=lambda result: result.seq)
+        return results
+
+    def submit(self, tag, collId, cmd):
+        """Queue a fits2caom command line, started as soon as fewer than limit
+        processes are running.
+
+        parameters: <string>, <string>, <list>, tag, collection id, command line
+        """
+        self.queued.append((self.seq, tag, collId, cmd))
+        self.seq += 1
+        self.__fill()
+        return
+
+    def poll(self):
+        """Reap finished processes, kill any over the timeout, and start
+        queued ones. Does not block.
+
+        return: <list>, list of F2CResults finished since the last poll, or
+                kept by run()
+        """
+        finished = self.pending
+        self.pending = []
+        now = time.time()
+        for proc, logfob, result, start in list(self.running):
+            if proc.poll() is None:
+                if not self.timeout or now - start < self.timeout: continue
+                result.timedOut = True
+                try: os.killpg(proc.pid, signal.SIGKILL)
+                except OSError: pass
+                proc.wait()
+            logfob.close()
+            result.returncode = proc.returncode
+            result.wallTime   = time.time() - start
+            self.running.remove((proc, logfob, result, start))
+            finished.append(result)
+        self.__fill()
+        finished.extend(self.failed)
+        self.failed = []
+        return finished
+
+    def drain(self):
+        """Block until every queued and running process has finished.
+
+        return: <list>, list of F2CResults not yet returned by poll()
+        """
+        results = self.poll()
+        while self.busy():
+            time.sleep(POLL)
+            results.extend(self.poll())
+        return results
+
+    def busy(self):
+        return bool(self.running or self.queued or self.failed or self.pending)
+
+    def full(self):
+        """True if no further job would start now."""
+        return len(self.running) + len(self.queued) >= self.limit
+
+    ############################### prive ##################################
+
+    def __fill(self):
+        """Start queued jobs up to limit. Jobs which cannot be started are
+        kept as failed, and returned by the next poll().
+        """
+        while self.queued and len(self.running) < self.limit:
+            seq, tag, collId, cmd = self.queued.pop(0)
+            result = F2CResult(seq, tag, collId, self.__logFile(collId))
+            try:
+                if not os.path.isdir(self.mddb_env.logs):
+                    os.makedirs(self.mddb_env.logs)
+                logfob = open(result.logFile, 'w')
+            except (IOError, OSError), err:
+                result.error = str(err)
+                self.failed.append(result)
+                continue
+            try:
+                proc = Popen(cmd, stdout=logfob, stderr=STDOUT, close_fds=True,
+                             preexec_fn=os.setsid)
+            except OSError, err:
+                logfob.close()
+                result.error = str(err)
+                self.failed.append(result)
+                continue
+            self.running.append((proc, logfob, result, time.time()))
+        return
+
+    def __logFile(self, collId):
+        name = '%s.%d-%d.fits2caom.out' % (collId, os.getpid(), _runs.next())
+        return os.path.join(self.mddb_env.logs, name)
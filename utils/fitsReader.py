@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.utils.fitsReader.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module reads the primary header of a FITS file directly, i.e. without a
+prior metaData extraction pass to a textual '.hdr' file.
+
+A FITS file is a sequence of 2880 byte records. The primary header occupies
+the leading records, as 36 cards of 80 ASCII characters each, and is closed
+by the END card. The file is mapped with mmap and only the header records
+are touched, one record at a time, up to END. No data unit is read, so the
+cost of a read depends upon the header size, not the size of the cube.
+A file not padded to whole records, as some writers leave, is read as far
+as it goes; only a header without END is refused.
+
+eg.,
+
+>>> if isFits('/data/m100.fits'):
+...     writeHeader('/data/m100.fits', '/srv/DQS/HEADERS/m100.fits.hdr')
+
+writes the header cards as lines, less END and trailing blanks, as metaData
+writes a '.hdr' file.
+"""
+# ------------------------------------------------------------------------------
+
+import mmap
+
+from mddb.utils import atomicFile
+
+RECORD   = 2880
+CARD     = 80
+SIGNATURE= 'SIMPLE  ='
+
+
+class FitsReadError(IOError):
+    """Raise this error when a file is not a FITS file, or its primary header
+    is not closed by an END card.
+    """
+    pass
+
+
+def isFits(path):
+    """True if path names a FITS file, i.e. a file opening with a SIMPLE
+    card, whether or not it is padded to whole 2880 byte records. A textual
+    header, as metaData writes, is not: its cards are lines, and a newline
+    falls within its first two cards.
+
+    parameters: <string>, file name
+    return:     <bool>
+    """
+    try:
+        fob = open(path, 'rb')
+        try: first = fob.read(2*CARD)
+        finally: fob.close()
+    except (IOError, OSError):
+        return False
+    return first.startswith(SIGNATURE) and '\n' not in first
+
+
+def readHeader(path):
+    """Read the cards of the primary header of the FITS file path, up to the
+    END card. Cards are returned with trailing blanks removed.
+
+    parameters: <string>, FITS file name
+    return:     <list>,   list of header card strings
+    """
+    fob = open(path, 'rb')
+    try:
+        try:
+            fmap = mmap.mmap(fob.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error), err:
+            raise FitsReadError, "Cannot map "+path+": "+str(err)
+        try:
+            return _readCards(fmap, path)
+        finally:
+            fmap.close()
+    finally:
+        fob.close()
+
+
+def writeHeader(path, hdrFile, group=None):
+    """Write the primary header of the FITS file path as the textual header
+    file hdrFile, one card per line, by atomicFile.
+
+    parameters: <string>, <string>, <SyncGroup>, FITS file name, header file
+                name, optional atomicFile.SyncGroup
+    return:     <int>,    number of cards written
+    """
+    cards = readHeader(path)
+    atomicFile.writeLines(hdrFile, cards, group)
+    return len(cards)
+
+
+def _readCards(fmap, path):
+    cards = []
+    if not fmap[:CARD].startswith(SIGNATURE):
+        raise FitsReadError, "Not a FITS file, no SIMPLE card: "+path
+    # the last record may be short, where the file is not padded
+    for start in xrange(0, len(fmap), RECORD):
+        record = fmap[start:start+RECORD]
+        for i in xrange(0, len(record), CARD):
+            card = record[i:i+CARD]
+            if card[:8].rstrip() == 'END': return cards
+            card = card.rstrip()
+            if card: cards.append(card)
+    raise FitsReadError, "No END card in primary header: "+path
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                           mddb.utils.header.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides a Header class, an edit journal over the header cards read
+from a header file, each line read once into a cards.Card, with a keyword index
+of the live cards.
+
+The insert classes build an override by inserting, replacing and removing
+header lines. Rather than shifting a list on every edit, a Header records
+each edit against an anchor, a Card already in the header:
+
+    insertBefore(card, lines)   lines placed immediately before card
+    insertAfter(card, lines)    lines placed immediately after card
+    replace(card, line)         card replaced in place
+    remove(card)                card dropped; lines anchored to it remain
+
+Each edit costs O(1) and the anchors are stable, i.e. a Card does not move
+when lines are inserted or removed elsewhere. materialize() walks the journal
+once and returns the override lines, in the same order the equivalent
+list.insert()/list.pop() calls would give.
+
+Positional access, insert(idx, lines), cardAt(idx) and indexOf(card), remains
+for the few fixed placements (eg. MRELEASE at line 2), at the cost of a walk
+to the position.
+"""
+# ------------------------------------------------------------------------------
+
+from mddb.utils.cards import Card, parseCard
+
+
+class _Entry(object):
+    """A journal entry. tree locates the entry in the journal and gives
+    document order: base card i is (i,), the j-th line placed before an
+    entry is tree+(-1,j), and a line placed after it tree+(1,k), k falling
+    as lines are placed nearer the entry. The sort key of an entry is
+    tree+(0,).
+    """
+    __slots__ = ('card', 'tree', 'before', 'after', 'live')
+
+    def __init__(self, card, tree):
+        self.card   = card
+        self.tree   = tree
+        self.before = []
+        self.after  = []
+        self.live   = card is not None
+
+    def key(self):
+        return self.tree + (0,)
+
+
+class Header(object):
+
+    def __init__(self, lines=None, parse=parseCard):
+        """Constructor receives a list of header line strings, or of Cards, and
+        the function which reads a line into a Card. Each line is read once
+        here, and inserted or replacing lines once as they are passed.
+
+        parameters: <list>, <function>, header lines, card parser
+        """
+        self.parse   = parse
+        self.base    = []
+        self.entries = {}
+        self.index   = {}
+        self.count   = 0
+        for line in lines or []:
+            self.base.append(self.__enter(self.__card(line), (len(self.base),)))
+        self.tail = _Entry(None, (len(self.base),))
+        self.base.append(self.tail)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for entry in self.__walk(): yield entry.card.image
+
+    def __getitem__(self, idx):
+        return self.cardAt(idx).image
+
+    def materialize(self):
+        """Walk the journal once and return the header lines in order.
+
+        return: <list>, list of header line strings
+        """
+        return [entry.card.image for entry in self.__walk()]
+
+    def cardList(self):
+        """Return the live Cards in header order.
+
+        return: <list>, list of Cards
+        """
+        return [entry.card for entry in self.__walk()]
+
+    # ---------------------------- anchored edits -----------------------------
+
+    def insertBefore(self, anchor, lines):
+        """Place a line, or a list of lines, immediately before the anchor Card,
+        after any lines already placed before it.
+
+        parameters: <Card>, <string>|<Card>|<list>, anchor, line(s)
+        return:     <Card>|<list>, new Card, or list of new Cards
+        """
+        entry = self.entries[id(anchor)]
+        cards = []
+        for line in self.__lines(lines):
+            tree = entry.tree + (-1, len(entry.before))
+            new  = self.__enter(self.__card(line), tree)
+            entry.before.append(new)
+            cards.append(new.card)
+        return self.__result(lines, cards)
+
+    def insertAfter(self, anchor, lines):
+        """Place a line, or a list of lines, immediately after the anchor Card,
+        ahead of any lines already placed after it, as list.insert(idx+1).
+        A list is placed in its own order.
+
+        parameters: <Card>, <string>|<Card>|<list>, anchor, line(s)
+        return:     <Card>|<list>, new Card, or list of new Cards
+        """
+        entry = self.entries[id(anchor)]
+        placed = self.__lines(lines)
+        last   = len(entry.after) + len(placed) - 1
+        news   = []
+        for i, line in enumerate(placed):
+            tree = entry.tree + (1, i-last)
+            news.append(self.__enter(self.__card(line), tree))
+        entry.after[0:0] = news
+        return self.__result(lines, [new.card for new in news])
+
+    def replace(self, anchor, line):
+        """Replace the anchor Card in place, reindexing its keyword. The new
+        Card takes over the anchor's place in the journal.
+
+        parameters: <Card>, <string>|<Card>, anchor, line
+        return:     <Card>, the new Card
+        """
+        entry = self.entries.pop(id(anchor))
+        self.__unindex(entry)
+        entry.card = self.__card(line)
+        self.entries[id(entry.card)] = entry
+        self.index.setdefault(entry.card.keyword, []).append(entry)
+        return entry.card
+
+    def remove(self, anchor):
+        """Drop the anchor Card. Lines placed before or after it are kept, and
+        it remains usable as an anchor.
+
+        parameters: <Card>, anchor
+        """
+        entry = self.entries[id(anchor)]
+        if not entry.live: return
+        self.__unindex(entry)
+        entry.live  = False
+        self.count -= 1
+        return
+
+    def append(self, lines):
+        """Place a line, or a list of lines, at the end of the header."""
+        cards = []
+        for line in self.__lines(lines):
+            tree = self.tail.tree + (-1, len(self.tail.before))
+            new  = self.__enter(self.__card(line), tree)
+            self.tail.before.append(new)
+            cards.append(new.card)
+        return self.__result(lines, cards)
+
+    # ------------------------------ positional -------------------------------
+
+    def insert(self, idx, lines):
+        """Insert a line, or a list of lines, before the line now at position
+        idx, as list.insert(). Appends when idx is past the end.
+
+        parameters: <int>, <string>|<Card>|<list>, position, line(s)
+        return:     <Card>|<list>, new Card, or list of new Cards
+        """
+        if idx < 0: idx = max(0, idx+self.count)
+        if idx >= self.count: return self.append(lines)
+        return self.insertBefore(self.cardAt(idx), lines)
+
+    def cardAt(self, idx):
+        """Return the Card now at position idx."""
+        if idx < 0: idx += self.count
+        if 0 <= idx < self.count:
+            for i, entry in enumerate(self.__walk()):
+                if i == idx: return entry.card
+        raise IndexError("header index out of range")
+
+    def indexOf(self, card):
+        """Return the present position of a live Card."""
+        target = self.entries[id(card)]
+        for i, entry in enumerate(self.__walk()):
+            if entry is target: return i
+        raise ValueError("card not in header")
+
+    # ------------------------------- lookups ---------------------------------
+
+    def has(self, key):
+        return key in self.index
+
+    def cardOf(self, key):
+        """Return the first Card of keyword key, or None."""
+        entries = self.index.get(key)
+        if not entries: return None
+        return min(entries, key=_Entry.key).card
+
+    def cardsOf(self, key):
+        """Return all Cards of keyword key, in header order.
+
+        parameters: <string>, keyword
+        return:     <list>,   list of Cards, may be empty
+        """
+        return self.ordered([e.card for e in self.index.get(key, [])])
+
+    def cardsWithPrefix(self, prefix):
+        """Return all Cards whose keyword begins with prefix, eg. 'CTYPE',
+        in header order.
+
+        parameters: <string>, keyword prefix
+        return:     <list>,   list of Cards, may be empty
+        """
+        found = []
+        for key, entries in self.index.iteritems():
+            if key.startswith(prefix): found.extend([e.card for e in entries])
+        return self.ordered(found)
+
+    def ordered(self, cards):
+        """Return the passed Cards sorted into header order."""
+        return sorted(cards, key=lambda card: self.entries[id(card)].key())
+
+    def precedes(self, card1, card2):
+        """True if card1 lies before card2 in the header."""
+        return self.entries[id(card1)].key() < self.entries[id(card2)].key()
+
+    ############################### prive ##################################
+
+    def __card(self, line):
+        if isinstance(line, Card): return line
+        return self.parse(line)
+
+    def __lines(self, lines):
+        if isinstance(lines, (list, tuple)): return lines
+        return [lines]
+
+    def __result(self, lines, cards):
+        if isinstance(lines, (list, tuple)): return cards
+        return cards[0]
+
+    def __enter(self, card, tree):
+        entry = _Entry(card, tree)
+        self.entries[id(card)] = entry
+        self.index.setdefault(card.keyword, []).append(entry)
+        self.count += 1
+        return entry
+
+    def __unindex(self, entry):
+        entries = self.index[entry.card.keyword]
+        entries.remove(entry)
+        if not entries: del self.index[entry.card.keyword]
+        return
+
+    def __walk(self):
+        """Yield the live entries in header order, one pass over the journal."""
+        for base in self.base:
+            stack = [(base, False)]
+            while stack:
+                entry, placed = stack.pop()
+                if not placed:
+                    stack.append((entry, True))
+                    stack.extend([(e, False) for e in reversed(entry.before)])
+                    continue
+                if entry.live: yield entry
+                stack.extend([(e, False) for e in reversed(entry.after)])
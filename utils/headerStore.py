@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                      mddb.utils.headerStore.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides the archive of header files kept in $DQS/HEADERS by
+buildOverride(). Each header is kept as HEADERS/<name>, a file of its own,
+never a hard link, so an in place edit of one header cannot change another.
+A name index, HEADERS/.store/index, records the SHA-1 hash last archived
+under each name, with the size and modification time of HEADERS/<name> as
+written. Re-archiving an unchanged header, whose named file still has that
+size and time, costs one read to hash it, and no copy.
+
+Where the file system makes reflinks (copy on write clones), each distinct
+header is also held once, as
+
+    HEADERS/.store/<sha1[:2]>/<sha1>
+
+and HEADERS/<name> is a reflink of it, so a header archived under many names
+shares its blocks. Where a reflink is refused, eg. on ext4, no object is
+kept, and HEADERS/<name> is a plain copy of the source: one copy of each
+name, as many as without the store.
+
+eg.,
+
+>>> store = HeaderStore('/srv/cyberska/DQS/HEADERS')
+>>> store.archive('/data/m100.fits.hdr', 'm100.fits.hdr')
+'/srv/cyberska/DQS/HEADERS/m100.fits.hdr'
+>>> store.lookup('m100.fits.hdr')
+'4b1f0c...'
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import errno
+import fcntl
+import hashlib
+import thread as _thread
+
+STORE = '.store'
+INDEX = 'index'
+
+# linux/fs.h FICLONE, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+class HeaderStore(object):
+
+    def __init__(self, headers):
+        """Constructor receives the headers directory, MDDBEnv.HEADERS.
+
+        parameters: <string>
+        """
+        self.headers  = headers
+        self.store    = os.path.join(headers, STORE)
+        self.index    = {}
+        self.reflinks = None     # unknown until the first object is made
+        self.copies   = 0
+        self.clones   = 0
+        self.skips    = 0
+        self.__readIndex()
+
+    def archive(self, source, name):
+        """Archive the header file source as HEADERS/name, unless an
+        identical header is already there.
+
+        parameters: <string>, <string>, header file, name in HEADERS
+        return:     <string>, HEADERS/name
+        """
+        path   = os.path.join(self.headers, name)
+        digest = fileDigest(source)
+        entry  = self.index.get(name)
+        if entry and entry[0] == digest and _current(path, entry[1]):
+            self.skips += 1
+            return path
+
+        if self.reflinks is not False and self.__object(source, digest):
+            self.reflinks = _place(self.objectPath(digest), path, clone=True)
+        if self.reflinks:
+            self.clones += 1
+        else:
+            _place(source, path)
+            self.copies += 1
+        self.__addIndex(name, digest, _stamp(path))
+        return path
+
+    def lookup(self, name):
+        """Return the hash of the header archived as name, or None."""
+        entry = self.index.get(name)
+        return entry and entry[0]
+
+    def objectPath(self, digest):
+        """Return the store path of the header of hash digest."""
+        return os.path.join(self.store, digest[:2], digest)
+
+    ############################### prive ##################################
+
+    def __object(self, source, digest):
+        # True if the object of digest is there, made by a reflink of source
+        # if need be; a refused reflink is remembered, and no object kept
+        obj   = self.objectPath(digest)
+        where = os.path.dirname(obj)
+        if os.path.isfile(obj): return True
+        if not os.path.isdir(where): _makedirs(where)
+        self.reflinks = _place(source, obj, clone=True)
+        if not self.reflinks:
+            try: os.rmdir(where)
+            except OSError: pass
+        return self.reflinks
+
+    def __readIndex(self):
+        lines = 0
+        try:
+            ifob = open(os.path.join(self.store, INDEX))
+        except IOError:
+            return
+        try:
+            for line in ifob:
+                entry = _parseEntry(line.rstrip('\n'))
+                if entry:
+                    self.index[entry[0]] = entry[1:]
+                    lines += 1
+        finally:
+            ifob.close()
+        # entries of a name are appended; rewrite once mostly superseded
+        if lines > 2*len(self.index) + 1024: self.__writeIndex()
+        return
+
+    def __writeIndex(self):
+        text = "".join([_formatEntry(name, digest, stamp) for name, (digest, stamp) in
+                        sorted(self.index.items())])
+        ifile = os.path.join(self.store, INDEX)
+        tmp   = _tmpName(ifile)
+        ifob  = open(tmp, 'w')
+        try: ifob.write(text)
+        finally: ifob.close()
+        os.rename(tmp, ifile)
+        return
+
+    def __addIndex(self, name, digest, stamp):
+        # one short O_APPEND write, so concurrent workers do not interleave
+        if self.index.get(name) == (digest, stamp): return
+        self.index[name] = (digest, stamp)
+        if not os.path.isdir(self.store): _makedirs(self.store)
+        fd = os.open(os.path.join(self.store, INDEX),
+                     os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0666)
+        try: os.write(fd, _formatEntry(name, digest, stamp))
+        finally: os.close(fd)
+        return
+
+
+def fileDigest(path):
+    """Return the SHA-1 hex digest of the contents of file path."""
+    digest = hashlib.sha1()
+    hfob = open(path, 'rb')
+    try:
+        for block in iter(lambda: hfob.read(65536), ''):
+            digest.update(block)
+    finally:
+        hfob.close()
+    return digest.hexdigest()
+
+
+def _formatEntry(name, digest, stamp):
+    # an index line, digest size:mtime name
+    return "%s %d:%r %s\n" % (digest, stamp[0], stamp[1], name)
+
+
+def _parseEntry(line):
+    # (name, digest, stamp) of an index line, or None. A line of an older
+    # index, digest name, has no stamp, and its file is never current.
+    digest, sep, rest = line.partition(' ')
+    if not (sep and rest): return None
+    stamp, sep, name = rest.partition(' ')
+    try:
+        size, mtime = stamp.split(':')
+        return name, digest, (int(size), float(mtime))
+    except ValueError:
+        return rest, digest, None
+
+
+def _stamp(path):
+    pstat = os.stat(path)
+    return pstat.st_size, pstat.st_mtime
+
+
+def _current(path, stamp):
+    """True if path has the size and modification time of stamp, as it was
+    archived."""
+    if stamp is None: return False
+    try:
+        size, mtime = _stamp(path)
+    except OSError:
+        return False
+    return size == stamp[0] and abs(mtime - stamp[1]) < 1e-6
+
+
+def _place(source, path, clone=False):
+    """Put a copy of source at path, by a temporary file renamed into place.
+    With clone, only a reflink is made, and False is returned, with nothing
+    placed, if the file system refuses it.
+    """
+    tmp = _tmpName(path)
+    if os.path.exists(tmp): os.remove(tmp)
+    try:
+        sfob = open(source, 'rb')
+        try:
+            dfob = open(tmp, 'wb')
+            try:
+                if clone:
+                    if not _reflink(sfob, dfob): return False
+                else:
+                    import shutil
+                    shutil.copyfileobj(sfob, dfob)
+            finally:
+                dfob.close()
+        finally:
+            sfob.close()
+        os.rename(tmp, path)
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+    return True
+
+
+def _reflink(sfob, dfob):
+    try:
+        fcntl.ioctl(dfob.fileno(), FICLONE, sfob.fileno())
+        return True
+    except IOError:
+        return False
+
+
+def _tmpName(path):
+    where, name = os.path.split(path)
+    return os.path.join(where, '.%s.%d.%d.tmp' % (name, os.getpid(), _thread.get_ident()))
+
+
+def _makedirs(where):
+    try: os.makedirs(where)
+    except OSError, err:
+        if err.errno != errno.EEXIST: raise
+    return
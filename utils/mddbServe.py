@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                      mddb.utils.mddbServe.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides 'dbinsert --serve', a long running mddb service on a local
+Unix domain socket, and its client. The service keeps the configuration,
+imported modules, rule tables and insert instances warm, one instance per
+MIME-type, cache and profile switch, as a rUtils.runBatch() worker, so a
+dataset costs its header work alone, not interpreter start up.
+
+While the service runs, a single dataset 'dbinsert' forwards its insert to
+it, and prints and exits as it would have. A --verbose dbinsert runs in
+process, as before, its messages being printed by the process that makes
+them. The socket is read from the [serve] section of the mddb config file,
+
+[serve]
+socket = %(dqs)s/mddb.sock
+
+The protocol is one JSON object per line each way. A request names an op and
+its arguments; a reply has "ok", and either the op's results or "error",
+
+    {"op": "insert", "mtype": "image/fits-image", "hdr": "m100.fits.hdr",
+     "uri": "http://dms.cyberska.org:8080/dlmanager/getfile?fileid=31261",
+     "public": false, "nodb": false, "cache": true, "profile": false}
+    {"ok": true, "state": "success", "detail": "", "override": "..."}
+
+    ping             {}                              version, pid
+    buildOverride    mtype, hdr, uri, public         override
+    confirmOverride  mtype, override                 messageTypes
+    executeInsert    mtype, collid, override, uri    returncode, wallTime,
+                                                     logFile, detail
+    insert           mtype, hdr, uri, public, nodb   state, detail, override
+    shutdown         {}
+
+cache and profile may be passed to any op of a MIME-type, as the dbinsert
+switches. executeInsert runs fits2caom on the override last built by
+buildOverride of its instance. insert builds, confirms and, unless nodb,
+runs fits2caom, with state one of rUtils.batchStates. Requests for one
+instance are served in turn; fits2caom runs outside that turn, at most
+[execute] limit at once over all requests.
+
+A client that cannot reach the service, eg. a socket it may not open, or a
+service not answering a ping within CONNECT_TIMEOUT seconds, runs in
+process.
+
+eg.,
+
+    dbinsert --serve --config=/srv/cyberska/DQS/mddb.cfg &
+    python -m mddb.utils.mddbServe --config=/srv/cyberska/DQS/mddb.cfg --ping
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import socket
+import getopt
+import signal
+import threading
+
+from os.path import basename
+
+from mddb import mddbVersion
+from mddb.config.mddbEnv import MDDBEnv
+
+OPS = ('ping', 'buildOverride', 'confirmOverride', 'executeInsert', 'insert',
+       'shutdown')
+
+# seconds to connect and answer a ping; and allowed an insert over the
+# [execute] timeout, for its build and a wait for a fits2caom slot
+CONNECT_TIMEOUT = 5.0
+BUILD_TIMEOUT   = 600.0
+
+
+class ServeError(RuntimeError):
+    """Raise this error when a request cannot be served."""
+    pass
+
+
+def socketPath(configFile):
+    """Return the [serve] socket of a config file."""
+    dbEnv = MDDBEnv()
+    dbEnv.configure(configFile)
+    return dbEnv.serveSocket
+
+
+# ---------------------------------- client ------------------------------------
+
+def request(path, req, timeout=CONNECT_TIMEOUT):
+    """Send one request to the service at socket path and return its reply.
+    Return None if the service cannot be reached, or does not reply within
+    timeout seconds, None being no limit.
+
+    parameters: <string>, <dict>, <float>, socket, request, timeout secs
+    return:     <dict>, reply
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(req)+"\n")
+        sfob = sock.makefile('rb')
+        try: line = sfob.readline()
+        finally: sfob.close()
+    except socket.error:
+        return None
+    finally:
+        sock.close()
+    if not line.endswith("\n"): return None
+    return json.loads(line)
+
+
+def forward(dbEnv, mtype, hdr, uri, public, nodb, cache, profile):
+    """Forward a dbinsert of one dataset to the service on the [serve]
+    socket of dbEnv, a configured MDDBEnv, if it answers a ping. A header
+    path is passed in full, as the service has its own working directory.
+
+    return: <dict>, the insert reply, or None if the insert is to be run
+            in process
+    """
+    path = dbEnv.serveSocket
+    if request(path, {'op': 'ping'}) is None: return None
+    if os.path.exists(hdr): hdr = os.path.abspath(hdr)
+    wait = None
+    if dbEnv.executeTimeout: wait = dbEnv.executeTimeout + BUILD_TIMEOUT
+    reply = request(path, {'op': 'insert', 'mtype': mtype, 'hdr': hdr, 'uri': uri,
+                           'public': public, 'nodb': nodb, 'cache': cache,
+                           'profile': profile}, wait)
+    if reply is None:
+        # sent, so not run again in process
+        reply = {'ok': False, 'error': "No reply from mddb service at "+path+
+                 " for "+hdr}
+    return reply
+
+
+# ---------------------------------- service -----------------------------------
+
+class MddbService(object):
+
+    def __init__(self, configFile, verbose=False):
+        """The warm state of the service: insert instances, by MIME-type,
+        cache and profile, each with its lock.
+
+        parameters: <string>, <bool>, mddb.cfg path, verbose switch
+        """
+        from mddb.utils import rUtils
+        self.rUtils     = rUtils
+        self.configFile = configFile
+        self.verbose    = verbose
+        self.dbEnv      = MDDBEnv()
+        self.dbEnv.configure(configFile)
+        self.slots      = threading.BoundedSemaphore(max(1, self.dbEnv.executeLimit))
+        self.tasks      = {}
+        self.locks      = {}
+        self.lock       = threading.Lock()
+        self.served     = 0
+        self.stopping   = False
+
+    def handle(self, req):
+        """Serve one request.
+
+        parameters: <dict>, request
+        return:     <dict>, reply
+        """
+        try:
+            op = req.get('op')
+            if op not in OPS: raise ServeError, "Unknown op: "+str(op)
+            reply = getattr(self, '_op_'+op)(req)
+            reply['ok'] = True
+        except Exception, err:
+            reply = {'ok': False, 'error': err.__class__.__name__+": "+str(err)}
+        with self.lock: self.served += 1
+        return reply
+
+    ############################### ops ####################################
+
+    def _op_ping(self, req):
+        return {'version': mddbVersion.version, 'pid': os.getpid(),
+                'served': self.served}
+
+    def _op_shutdown(self, req):
+        # the server is shut down once this reply is written
+        self.stopping = True
+        return {}
+
+    def _op_buildOverride(self, req):
+        key = self.__key(req)
+        with self.__lock(key):
+            dbtask   = self.__task(key)
+            override = dbtask.buildOverride(req['hdr'], req['uri'], req.get('public', False))
+            if key[2]: dbtask.writeProfile(self.rUtils.getCollId(req['uri']))
+        return {'override': override}
+
+    def _op_confirmOverride(self, req):
+        key = self.__key(req)
+        with self.__lock(key):
+            dbtask = self.__task(key)
+            if not (dbtask.override and dbtask.override[0] == req['override']):
+                # not the last built by this instance; confirmed from the file
+                dbtask.validationMsg = []
+                dbtask.override      = None
+            return {'messageTypes': dbtask.confirmOverride(req['override'], key[0])}
+
+    def _op_executeInsert(self, req):
+        key = self.__key(req)
+        with self.__lock(key):
+            dbtask = self.__task(key)
+            if not (dbtask.override and dbtask.override[0] == req['override']):
+                raise ServeError, "Not the override last built: "+req['override']
+            cmd = dbtask.insertCommand(req['collid'], req['override'], req['uri'])
+        result = self.__execute(basename(req['override']), req['collid'], cmd)
+        return {'returncode': result.returncode, 'wallTime': result.wallTime,
+                'logFile': result.logFile, 'detail': not result.ok() and result.describe() or ''}
+
+    def _op_insert(self, req):
+        key = self.__key(req)
+        job = (key[0], req['uri'], req['hdr'], req.get('public', False),
+               req.get('nodb', False), key[1], key[2])
+        with self.__lock(key):
+            hdr, state, detail = self.rUtils._buildDataset(self.tasks, self.configFile,
+                                                           self.verbose, job)
+            override = self.tasks.get(key) and self.tasks[key].override
+        reply = {'state': state, 'detail': detail,
+                 'override': override and override[0] or None}
+        if state == 'execute':
+            runs = [self.__execute(hdr, detail[0], detail[1])]
+            hdr, reply['state'], reply['detail'] = self.rUtils._batchResults(runs)[0]
+            reply['executed'] = True
+        return reply
+
+    ############################### prive ##################################
+
+    def __key(self, req):
+        mtype = req.get('mtype')
+        if mtype not in self.rUtils.validMtypes:
+            raise ServeError, "Unrecognized mime-type "+str(mtype)
+        return (mtype, bool(req.get('cache', True)), bool(req.get('profile', False)))
+
+    def __lock(self, key):
+        with self.lock:
+            if key not in self.locks: self.locks[key] = threading.Lock()
+            return self.locks[key]
+
+    def __execute(self, tag, collid, cmd):
+        # one fits2caom run, in one of [execute] limit slots shared by all
+        # requests
+        from mddb.utils import f2cExecutor
+        with self.slots:
+            return f2cExecutor.F2CExecutor(self.configFile, limit=1).run(
+                [(tag, collid, cmd)])[0]
+
+    def __task(self, key):
+        # under the lock of key; as rUtils._buildDataset()
+        if key not in self.tasks:
+            self.tasks[key] = self.rUtils.validMtypes.insertClass(key[0])(
+                self.configFile, self.verbose, key[1], key[2])
+        return self.tasks[key]
+
+
+def serve(configFile, verbose=False, path=None):
+    """Serve requests on the [serve] socket, or path, until a shutdown
+    request, an interrupt or SIGTERM.
+
+    parameters: <string>, <bool>, <string>, mddb.cfg path, verbose, socket
+    return:     <int>, 0
+    """
+    import SocketServer
+
+    service = MddbService(configFile, verbose)
+    path    = path or service.dbEnv.serveSocket
+    if os.path.exists(path):
+        if request(path, {'op': 'ping'}) is not None:
+            raise ServeError, "An mddb service is already running on "+path
+        os.remove(path)
+
+    class Handler(SocketServer.StreamRequestHandler):
+        def handle(self):
+            for line in iter(self.rfile.readline, ''):
+                try: req = json.loads(line)
+                except ValueError, err: reply = {'ok': False, 'error': "ValueError: "+str(err)}
+                else: reply = service.handle(req)
+                self.wfile.write(json.dumps(reply)+"\n")
+                self.wfile.flush()
+                if service.stopping:
+                    threading.Thread(target=self.server.shutdown).start()
+                    return
+
+    class Server(SocketServer.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    umask  = os.umask(0177)
+    try: server = Server(path, Handler)
+    finally: os.umask(umask)
+
+    def stop(signum, frame): threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+
+    print "mddb v"+mddbVersion.version, "serving on", path, "pid", os.getpid()
+    sys.stdout.flush()
+    try:
+        try: server.serve_forever()
+        except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        if os.path.exists(path): os.remove(path)
+    print "mddb service stopped,", service.served, "requests served"
+    return 0
+
+
+def usage(mod):
+    useBurp = '\n\t'+mod+' of '+mddbVersion.pkg_name+' v'+mddbVersion.version +\
+        '\n\n\tUsage: '+ mod + ' --config=<config-file> [--socket=<path>] '\
+        '[--serve | --ping | --stop]\n\n\t'\
+        '--config= \tDQS config file, mddb.cfg.\n\t'\
+        '--socket= \tService socket. Default, the [serve] socket.\n\t'\
+        '--serve   \tRun the service, as dbinsert --serve.\n\t'\
+        '--ping    \tReport on a running service.\n\t'\
+        '--stop    \tStop a running service.\n\t'\
+        '--help    \tThis message.\n\n'
+    return useBurp
+
+
+def main(args):
+    mod = basename(args[0])
+    long_options = ['help', 'config=', 'socket=', 'serve', 'ping', 'stop']
+    try:
+        opts, arg = getopt.getopt(args[1:], '', long_options)
+    except getopt.GetoptError, err:
+        print "Option parsing recieved an error:"
+        print err
+        return usage(mod)
+    opts = dict(opts)
+    if arg or '--help' in opts or '--config' not in opts: return usage(mod)
+
+    path = opts.get('--socket') or socketPath(opts['--config'])
+    if '--serve' in opts:
+        return serve(opts['--config'], False, path)
+    for flag, op in (('--ping', 'ping'), ('--stop', 'shutdown')):
+        if flag in opts:
+            reply = request(path, {'op': op})
+            if reply is None: return "No mddb service on "+path
+            print json.dumps(reply, sort_keys=True)
+            return 0
+    return usage(mod)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
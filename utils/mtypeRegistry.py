@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                    mddb.utils.mtypeRegistry.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides the registry of CyberSKA MIME-types. Each MIME-type maps to
+a Handler, naming
+
+    the insert class,        eg. 'mddb.mains.dbFitsInsert:DbFitsInsert'
+    the required keywords,   eg. 'mddb.db.confirmKeys:requireFITSKeys', or
+                             None, where the MIME-type is not implemented
+    the CAOM config,         an MDDBEnv attribute, or a dict of attributes
+                             by image dimensions
+    the CAOM defaults,       an MDDBEnv attribute
+
+as 'module:name' strings, imported on first use. A dbinsert of one dataset
+imports only the insert module of its MIME-type, and 'dbinsert --help' none.
+
+Handlers of other packages are registered through setuptools entry points,
+in the group 'mddb.mtypes', each named for its MIME-type and loading a
+Handler, eg. in a setup.py,
+
+    entry_points = {'mddb.mtypes': [
+        'image/hdf5-image = cskahdf5.handler:hdf5Handler']}
+
+Entry points are looked up only for a MIME-type not built in, so
+pkg_resources is not imported otherwise.
+
+eg.,
+
+>>> handler = registry.handler('image/fits-image')
+>>> handler.insertClass()
+<class 'mddb.mains.dbFitsInsert.DbFitsInsert'>
+>>> 'image/ms-uvw' in registry
+True
+"""
+# ------------------------------------------------------------------------------
+
+ENTRY_POINTS = 'mddb.mtypes'
+
+
+class MtypeError(ValueError):
+    """Raise this error for an unrecognized MIME-type."""
+    pass
+
+
+def _resolve(target):
+    """Import a 'module:name' target and return the named attribute. Any
+    other target is returned as it is."""
+    if not isinstance(target, basestring): return target
+    module, sep, name = target.partition(':')
+    obj = __import__(module, globals(), locals(), [name or '__name__'])
+    if name: obj = getattr(obj, name)
+    return obj
+
+
+class Handler(object):
+
+    def __init__(self, mtype, insert, requireKeys=None, config=None, default=None):
+        """Constructor receives the MIME-type and its targets, each a
+        'module:name' string or the object itself.
+
+        parameters: <string>, <string>, <string>, <string>|<dict>, <string>
+                    mtype:       MIME-type, eg. 'image/fits-image'
+                    insert:      insert class, a BaseDbInsert subclass
+                    requireKeys: required override keywords, None if the
+                                 MIME-type is not implemented
+                    config:      MDDBEnv attribute of the CAOM config file, or
+                                 a dict of them by image dimensions
+                    default:     MDDBEnv attribute of the CAOM defaults file
+        """
+        self.mtype   = mtype
+        self.insert  = insert
+        self.require = requireKeys
+        self.config  = config
+        self.default = default
+
+    def __repr__(self):
+        return "Handler(%r, %r)" % (self.mtype, self.insert)
+
+    def insertClass(self):
+        """Return the insert class, importing its module on first use."""
+        if isinstance(self.insert, basestring): self.insert = _resolve(self.insert)
+        return self.insert
+
+    def requiredKeys(self):
+        """Return the required override keywords. Raise NotImplementedError
+        where the MIME-type is not implemented.
+
+        return: <list>
+        """
+        if self.require is None: raise NotImplementedError
+        if isinstance(self.require, basestring): self.require = _resolve(self.require)
+        return self.require
+
+    def caomConfig(self, dbEnv, ndims=None):
+        """Return the CAOM config and defaults files of a dataset. The config
+        is None where the handler has none for ndims.
+
+        parameters: <MDDBEnv>, <int>, configured environment, image dimensions
+        return:     <tuple>, (config file, defaults file)
+        """
+        config = self.config
+        if isinstance(config, dict): config = config.get(ndims)
+        if config is not None: config = getattr(dbEnv, config)
+        default = self.default
+        if default is not None: default = getattr(dbEnv, default)
+        return config, default
+
+
+class Registry(object):
+
+    def __init__(self, group=ENTRY_POINTS):
+        """An empty registry, finding unregistered MIME-types in the entry
+        point group.
+
+        parameters: <string>, entry point group
+        """
+        self.group    = group
+        self.handlers = {}
+        self.builtin  = []
+        self.missed   = set()
+
+    def register(self, handler, builtin=False):
+        """Register a Handler, replacing any of its MIME-type."""
+        self.handlers[handler.mtype] = handler
+        if builtin and handler.mtype not in self.builtin:
+            self.builtin.append(handler.mtype)
+        return handler
+
+    def handler(self, mtype):
+        """Return the Handler of mtype. Raise MtypeError if there is none.
+
+        parameters: <string>, MIME-type
+        return:     <Handler>
+        """
+        if mtype not in self.handlers and mtype not in self.missed:
+            self.__loadEntryPoints(mtype)
+        try: return self.handlers[mtype]
+        except KeyError:
+            raise MtypeError, "Unrecognized mime-type "+str(mtype)
+
+    def insertClass(self, mtype):
+        return self.handler(mtype).insertClass()
+
+    def __contains__(self, mtype):
+        try: self.handler(mtype)
+        except MtypeError: return False
+        return True
+
+    def __iter__(self):
+        """The built in MIME-types, in order, then any registered since."""
+        extra = sorted([mtype for mtype in self.handlers if mtype not in self.builtin])
+        return iter(self.builtin + extra)
+
+    ############################### prive ##################################
+
+    def __loadEntryPoints(self, mtype):
+        self.missed.add(mtype)
+        try:
+            import pkg_resources
+        except ImportError:
+            return
+        for entry in pkg_resources.iter_entry_points(self.group, mtype):
+            handler = entry.load()
+            if not isinstance(handler, Handler):
+                handler = Handler(mtype, handler)
+            self.register(handler)
+            break
+        return
+
+
+registry = Registry()
+
+registry.register(Handler('image/fits-image',
+                          'mddb.mains.dbFitsInsert:DbFitsInsert',
+                          'mddb.db.confirmKeys:requireFITSKeys',
+                          {2: 'fits2dDBConfig', 3: 'fits3dDBConfig', 4: 'fitsDBConfig'},
+                          'fitsDBDefault'), builtin=True)
+registry.register(Handler('image/ms-image',
+                          'mddb.mains.dbCImageInsert:DbCImageInsert',
+                          'mddb.db.confirmKeys:requireCASAKeys',
+                          'cimageDBConfig', 'cimageDBDefault'), builtin=True)
+registry.register(Handler('image/fits-uvw',
+                          'mddb.mains.dbUVFitsInsert:DbUVFitsInsert',
+                          None, 'uvfitsDBConfig', 'uvfitsDBDefault'), builtin=True)
+registry.register(Handler('image/ms-uvw',
+                          'mddb.mains.dbMSInsert:DbMSInsert',
+                          None, 'uvmsDBConfig', 'uvmsDBDefault'), builtin=True)
+
+
+def handler(mtype):
+    """Return the Handler of mtype from the registry."""
+    return registry.handler(mtype)
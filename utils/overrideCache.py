@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                    mddb.utils.overrideCache.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides a content addressed cache of built overrides, so that a
+re-run of an unchanged dataset need not repeat configureOverride().
+
+An entry is keyed on a SHA-1 hash of everything an override depends upon:
+
+    the header file bytes, the uri, the public switch (and, when public,
+    today's date, which is written as the metadata release date), the
+    insert class, i.e. the MIME-type, mddbVersion.version, and the rule
+    tables of xDBKeys, checkSetKeys and keymaps.
+
+An entry holds the override lines, the validation messages and the few
+instance attributes, eg. ndims, that executeInsert() needs. Entries are
+pickled to the cache directory, [dqs_dirs] cache, default $DQS/cache, and
+evicted when older than [cache] maxage days, or, oldest used first, when the
+directory exceeds [cache] maxsize MB.
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import time
+import types
+import cPickle
+import hashlib
+
+from datetime import date
+
+from mddb import mddbVersion
+
+from mddb.db      import xDBKeys, checkSetKeys
+from mddb.utils   import atomicFile
+from mddb.convert import keymaps
+
+# stores between evictions
+EVICT_EVERY = 64
+SUFFIX      = '.override.pkl'
+
+
+def _rulesDigest():
+    """Digest of the public tables of the rule modules."""
+    tables = (types.ListType, types.TupleType, types.DictType,
+              types.StringTypes, types.IntType, types.FloatType)
+    digest = hashlib.sha1()
+    for module in (xDBKeys, checkSetKeys, keymaps):
+        for name in sorted(vars(module)):
+            value = getattr(module, name)
+            if name.startswith('_') or not isinstance(value, tables): continue
+            if isinstance(value, dict): value = sorted(value.items())
+            digest.update(module.__name__+'.'+name+'='+repr(value)+'\n')
+    return digest.hexdigest()
+
+RULES = _rulesDigest()
+
+
+class OverrideCache(object):
+
+    def __init__(self, dbEnv):
+        """Constructor receives a configured MDDBEnv. Stale entries are
+        evicted on construction.
+
+        parameters: <MDDBEnv>
+        """
+        self.directory = dbEnv.cache
+        self.maxSize   = dbEnv.cacheMaxSize*1024*1024
+        self.maxAge    = dbEnv.cacheMaxAge*86400
+        self.stores    = 0
+        self.evict()
+
+    def key(self, hdrFile, uri, public, mtype):
+        """Return the cache key of an override.
+
+        parameters: <string>, <string>, <bool>, <string>
+                    header file, uri, public switch, MIME-type
+        return:     <string>, hex digest
+        """
+        digest = hashlib.sha1()
+        hfob = open(hdrFile, 'rb')
+        try:
+            for block in iter(lambda: hfob.read(65536), ''):
+                digest.update(block)
+        finally:
+            hfob.close()
+        released = public and date.today().isoformat() or ''
+        for part in (uri, str(bool(public)), released, mtype,
+                     mddbVersion.version, RULES):
+            digest.update('\0'+part)
+        return digest.hexdigest()
+
+    def fetch(self, key):
+        """Return the (lines, messages, state) entry under key, or None.
+
+        parameters: <string>, cache key
+        return:     <tuple>, override lines, validation messages, attribute dict
+        """
+        path = self.__path(key)
+        try:
+            efob = open(path, 'rb')
+            try: entry = cPickle.load(efob)
+            finally: efob.close()
+        except (IOError, EOFError, cPickle.UnpicklingError):
+            return None
+        try: os.utime(path, None)
+        except OSError: pass
+        return entry
+
+    def store(self, key, lines, messages, state):
+        """Store an entry under key. The entry is written to a temporary file
+        and renamed, so a concurrent reader never sees a part written entry.
+
+        parameters: <string>, <list>, <list>, <dict>
+        """
+        if not os.path.isdir(self.directory): os.makedirs(self.directory)
+        atomicFile.writeText(self.__path(key),
+                             cPickle.dumps((list(lines), list(messages), dict(state)),
+                                           cPickle.HIGHEST_PROTOCOL))
+        self.stores += 1
+        if not self.stores % EVICT_EVERY: self.evict()
+        return
+
+    def evict(self):
+        """Remove entries older than maxAge, then the least recently used
+        while the cache is larger than maxSize.
+
+        return: <int>, number of entries removed
+        """
+        if not os.path.isdir(self.directory): return 0
+        now     = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX): continue
+            path = os.path.join(self.directory, name)
+            try: stat = os.stat(path)
+            except OSError: continue
+            if self.maxAge and now - stat.st_mtime > self.maxAge:
+                removed += self.__remove(path)
+            else: entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum([size for mtime, size, path in entries])
+        if self.maxSize and total > self.maxSize:
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.maxSize: break
+                removed += self.__remove(path)
+                total   -= size
+        return removed
+
+    ############################### prive ##################################
+
+    def __path(self, key):
+        return os.path.join(self.directory, key+SUFFIX)
+
+    def __remove(self, path):
+        try: os.remove(path)
+        except OSError: return 0
+        return 1
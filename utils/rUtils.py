@@ -18,19 +18,30 @@ __author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
 # ------------------------------------------------------------------------------
 
 import sys
+import time
 import getopt
 import urlparse
 from   datetime import date
 
 from os import getenv
-from os.path import basename, join, isfile, expanduser, split, splitext
+from os.path import basename, join, isfile, exists, expanduser, split, splitext
 
 from mddb import mddbVersion
 
-from mddb.mains import dbFitsInsert
-from mddb.mains import dbCImageInsert
-from mddb.mains import dbUVFitsInsert # -- future implementation, raise NotImplementError
-from mddb.mains import dbMSInsert     # -- future implementation, raise NotImplementError
+from mddb.utils import mtypeRegistry
+
+# The batch modules, multiprocessing, threading, f2cExecutor and atomicFile,
+# are imported where used, keeping them out of a single dataset insert and
+# 'dbinsert --help'.
+
+# ------------------------------------------------------------------------------
+
+# MIME-types and their insert classes, imported on first use. The
+# image/fits-uvw and image/ms-uvw classes raise NotImplementedError.
+validMtypes = mtypeRegistry.registry
+
+# Batch outcomes, as reported in the runBatch() summary.
+batchStates = ['success', 'invalid', 'nogo', 'nodb', 'failed']
 
 # ------------------------------------------------------------------------------
 
@@ -42,9 +53,18 @@ def usage(mod):
         '[--public] ' \
         '[--verbose]' \
         '[--nodb]' \
+        '[--no-cache]' \
+        '[--profile]' \
         '[--config=<DQS-config-file>] ' \
         '--mtype=<mime-type> ' \
         '--hdr=<hdrfile> --uri=<uri> \n\n\t' \
+        '       '+ mod + ' [--public] [--verbose] [--nodb] [--no-cache] [--profile] '\
+        '[--config=<DQS-config-file>] ' \
+        '[--procs=<n>] --batch=<batchfile>\n\n\t' \
+        '       '+ mod + ' [--verbose] [--nodb] [--no-cache] [--profile] '\
+        '[--config=<DQS-config-file>] ' \
+        '[--procs=<n>] --watch\n\n\t' \
+        '       '+ mod + ' [--config=<DQS-config-file>] --serve\n\n\t' \
         'Three (3) keyword arguments are required. \n\n\t'\
         '--mtype= \t<mime-type> of dataset to be inserted\n\t\t'\
                  '\tOne (1) of CyberSKA metadata mime-types:\n\n\t\t'\
@@ -59,7 +79,26 @@ def usage(mod):
                  '\thttp://dms.cyberska.org:8080/dlmanager/getfile?fileid=<nnnnnn>\n\n\t'\
         '--public\tThe dataset metadata are publicly available.\n\t'\
         '--verbose\tTurn on stdout messages.\n\t' \
-        '--nodb\t\tNo DB insert. executeInsert() is not called.\n\n\t'\
+        '--nodb\t\tNo DB insert. executeInsert() is not called.\n\t'\
+        '--no-cache\tRebuild the override, bypassing the override cache.\n\t'\
+        '--profile\tWrite the time taken by each override stage, as JSON, to\n\t\t'\
+                 '\t$DQS/logs/<collection-id>.profile.json.\n\n\t'\
+        'Many datasets may be inserted in one call from a batch file:\n\n\t'\
+        '--batch= \t<batch-file> with one dataset per line, as\n\t\t'\
+                 '\t<mime-type> <uri> <hdrfile>\n\t\t'\
+                 '\tReplaces --mtype, --hdr, --uri. Lines starting \n\t\t'\
+                 '\twith "#" are ignored.\n\t'\
+        '--procs= \tNumber of worker processes for --batch or --watch.\n\t\t'\
+                 '\tDefaults to the number of cpus.\n\n\t'\
+        'Or datasets may be inserted as their headers are written:\n\n\t'\
+        '--watch  \tWatch the [watch] dirs, default $DQS/DATASETS and\n\t\t'\
+                 '\t$DQS/HEADERS, for headers with a <hdrfile>.manifest of\n\t\t'\
+                 '\ttheir mtype and uri, until interrupted. Replaces\n\t\t'\
+                 '\t--mtype, --hdr, --uri.\n\n\t'\
+        'Or a service may keep mddb loaded between inserts:\n\n\t'\
+        '--serve  \tServe inserts on the [serve] socket, default\n\t\t'\
+                 '\t$DQS/mddb.sock, until stopped. While it runs, dbinsert\n\t\t'\
+                 '\tof one dataset, without --verbose, is forwarded to it.\n\n\t'\
         'A user may pass a DQS configuration file, i.e., an mddb.cfg:\n\n\t'\
         '--config= \t<config-file> path to a DQS config file.\n\n\t'\
         '\t\tIf "--config" is not provided at the command line, a search \n\t'\
@@ -71,15 +110,12 @@ def usage(mod):
 
 def handleCLargs(args):
     mod = basename(sys.argv[0])
-    long_options = ['help','public','verbose', 'nodb','mtype=','hdr=','uri=','config=']
+    long_options = ['help','public','verbose', 'nodb','mtype=','hdr=','uri=','config=',
+                    'batch=','procs=','no-cache','profile','watch','serve']
     required     = ['--mtype', '--hdr', '--uri']
     nrequired    = len(required)
     Nreqd        = 0
-    valid_mtypes = ['image/fits-image',
-                    'image/ms-image',
-                    'image/fits-uvw',
-                    'image/ms-uvw'
-                    ]
+    batch        = False
     try:
         opts, arg = getopt.getopt(sys.argv[1:],'',long_options)
     except getopt.GetoptError,err:
@@ -101,6 +137,13 @@ def handleCLargs(args):
     # --verbose Turns on stdout messages.
     # --config  may be passed. This is a path to an mddb.cfg file.
     # --nodb    No DB interaction; executeInsert() is not called.
+    # --no-cache  Always build the override; bypass the override cache.
+    # --profile Write a JSON profile of the override stages to $DQS/logs.
+    # --batch   a batch file of <mime-type> <uri> <hdrfile> lines, which
+    #           replaces the three (3) required arguments.
+    # --watch   insert headers as they are written, also replacing them.
+    # --procs   number of worker processes for a --batch or --watch run.
+    # --serve   serve inserts on the [serve] socket, until stopped.
 
     cl_args = []
     if opts:
@@ -113,6 +156,18 @@ def handleCLargs(args):
                 cl_args.append(o)
             if o in ("--nodb"):
                 cl_args.append(o)
+            if o in ("--no-cache",):
+                cl_args.append(o)
+            if o in ("--profile",):
+                cl_args.append(o)
+            if o in ("--batch",):
+                batch = True
+            if o in ("--watch",):
+                batch = True
+                cl_args.append(o)
+            if o in ("--serve",):
+                batch = True
+                cl_args.append(o)
 	    if a and o in required:
                 Nreqd +=1
 		cl_args.append(o+"="+a)
@@ -121,7 +176,11 @@ def handleCLargs(args):
     else: sys.exit(usage(mod))
 
     # Ensure the required three (3) args have been passed.
-    if Nreqd != nrequired:
+    if batch:
+        if Nreqd:
+            print "\n\t--batch, --watch and --serve replace --mtype, --hdr, --uri (see usage)."
+            sys.exit(usage(mod))
+    elif Nreqd != nrequired:
         print "\n\tMissing required arguments (see usage)."
         sys.exit(usage(mod))
 
@@ -130,7 +189,7 @@ def handleCLargs(args):
     for kwarg in cl_args:
         if '--mtype' in kwarg:
             key,val = kwarg.split('=')
-            if val not in valid_mtypes:
+            if val not in validMtypes:
                 print err,val
                 sys.exit(usage(mod))
         else: continue
@@ -142,6 +201,10 @@ def parseArgs(clargs):
     pargs['public']  = False    # permission default is private.
     pargs['verbose'] = False    # default no stdout messaging
     pargs['nodb']    = False    # default runs executeInsert()
+    pargs['nocache'] = False    # default reuses cached overrides
+    pargs['profile'] = False    # default no stage profile
+    pargs['watch']   = False    # default no watch
+    pargs['serve']   = False    # default no service
 
     for kwarg in clargs:
         if '--public' in kwarg:
@@ -153,6 +216,18 @@ def parseArgs(clargs):
         if '--nodb' in kwarg:
             pargs['nodb'] = True
             continue
+        if '--no-cache' in kwarg:
+            pargs['nocache'] = True
+            continue
+        if '--profile' in kwarg:
+            pargs['profile'] = True
+            continue
+        if '--watch' in kwarg:
+            pargs['watch'] = True
+            continue
+        if '--serve' in kwarg:
+            pargs['serve'] = True
+            continue
         if '--uri' in kwarg:
             urlset = urlparse.urlparse(kwarg)
             key,val = (urlset.path).split('=')
@@ -229,8 +304,23 @@ def getCollId(uri):
 # executeInsert()
 
 def run(clArgs):
-    useFits    = useUVFits = useCimage = useUVMSet = False
     pArgs      = parseArgs(clArgs)
+    if pArgs['serve']:
+        from mddb.utils import mddbServe   # imports rUtils
+        return mddbServe.serve(pArgs['config'], pArgs['verbose'])
+    if pArgs['watch']:
+        from mddb.utils import watchDqs    # imports rUtils
+        procs = None
+        if 'procs' in pArgs: procs = int(pArgs['procs'])
+        return watchDqs.watch(pArgs['config'], pArgs['verbose'], pArgs['nodb'], procs,
+                              pArgs['nocache'], pArgs['profile'])
+    if 'batch' in pArgs:
+        procs = None
+        if 'procs' in pArgs: procs = int(pArgs['procs'])
+        datasets = readBatchFile(pArgs['batch'])
+        return runBatch(datasets, pArgs['config'], pArgs['public'],
+                        pArgs['verbose'], pArgs['nodb'], procs, pArgs['nocache'],
+                        pArgs['profile'])
     uri        = pArgs['uri']
     hdrFile    = pArgs['hdr']
     fileType   = pArgs['mtype']
@@ -238,18 +328,24 @@ def run(clArgs):
     public     = pArgs['public']
     verbose    = pArgs['verbose']
     nodbInsert = pArgs['nodb']
+    useCache   = not pArgs['nocache']
+    profile    = pArgs['profile']
     collid     = getCollId(uri)
     abortString="Database insert aborted. See validation file."
 
-    # Determine class use by fileType
-    if fileType == 'image/fits-image':
-        useFits   = True
-    elif fileType == 'image/ms-image':
-        useCimage = True
-    elif fileType == 'image/fits-uvw':
-        useUVFits = True
-    elif fileType == 'image/ms-uvw':
-        useUVMSet = True
+    # Forward to a running 'dbinsert --serve'; --verbose runs in process.
+    if not verbose:
+        from mddb.config.mddbEnv import MDDBEnv
+        dbEnv = MDDBEnv()
+        dbEnv.configure(configFile)
+        if exists(dbEnv.serveSocket):
+            from mddb.utils import mddbServe
+            reply = mddbServe.forward(dbEnv, fileType, hdrFile, uri, public,
+                                      nodbInsert, useCache, profile)
+            if reply is not None: return _servedExit(reply)
+
+    # Determine class use by fileType; only its module is imported
+    insertClass = validMtypes.insertClass(fileType)
 
     if verbose:
         print "\n\n\tThis is mddb, v"+mddbVersion.version
@@ -264,77 +360,354 @@ def run(clArgs):
         print "Public Release:\t",public
         print "__________________\n"
 
+    dbtask  = insertClass(configFile, verbose, useCache, profile)
+    try: override= dbtask.buildOverride(hdrFile, uri, public)
+    except NotImplementedError, err:
+        writeNoGo(hdrFile,fileType,dbtask.dbEnv.VALIDATE,dbtask.validStore,
+                  dbtask.syncGroup)
+        sys.exit("-2")
+    if profile: dbtask.writeProfile(collid)
+    msgTypes= dbtask.confirmOverride(override, fileType)
+    if nodbInsert:
+        sys.exit("No DB request. Done")
+    elif not "ERROR:" in msgTypes:
+        dbtask.executeInsert(collid, override, uri)
+    else:
+        if verbose: print abortString
+        sys.exit("-1")
+    return
 
-    if useFits:
-        dbtask  = dbFitsInsert.DbFitsInsert(configFile, verbose)
-        override= dbtask.buildOverride(hdrFile, uri, public)
-        msgTypes= dbtask.confirmOverride(override, fileType)
-        if nodbInsert:
-            sys.exit("No DB request. Done")
-        elif not "ERROR:" in msgTypes: 
-            dbtask.executeInsert(collid, override, uri)
-        else:
-            if verbose: print abortString
-            sys.exit("-1")
-    elif useCimage:
-        dbtask  = dbCImageInsert.DbCImageInsert(configFile, verbose)
-        override= dbtask.buildOverride(hdrFile, uri, public)
-        msgTypes= dbtask.confirmOverride(override, fileType)
-        if nodbInsert:
-            sys.exit("No DB request. Done")
-        elif not "ERROR:" in msgTypes:
-            dbtask.executeInsert(collid, override, uri)
-        else:
-            if verbose: print abortString
-            sys.exit("-1")
-    elif useUVFits:
-        dbtask  = dbUVFitsInsert.DbUVFitsInsert(configFile, verbose)
-        try: override= dbtask.buildOverride(hdrFile,uri,public)
-        except NotImplementedError, err:
-            writeNoGo(hdrFile,fileType,dbtask.dbEnv.VALIDATE)
-            sys.exit("-2")
-        msgTypes= dbtask.confirmOverride(override,fileType)
-        if nodbInsert:
-            sys.exit("No DB request. Done")
-        elif not "ERROR:" in msgTypes:
-            dbtask.executeInsert(collid,override,uri)
-        else:
-            if verbose: print abortString
-            sys.exit("-1")
-    elif useUVMSet:
-        dbtask  = dbMSInsert.DbMSInsert(configFile, verbose)
-        try: override= dbtask.buildOverride(hdrFile,uri,public)
-        except NotImplementedError, err:
-            writeNoGo(hdrFile,fileType,dbtask.dbEnv.VALIDATE)
-            sys.exit("-2")
-        msgTypes= dbtask.confirmOverride(override,fileType)
+
+def readBatchFile(batchFile):
+    """Read a batch file of datasets for runBatch(). Each line holds the
+    three (3) whitespace separated fields of a dataset, in the order of the
+    scripts/public_uris lists,
+
+    image/fits-image  http://dms.cyberska.org:8080/dlmanager/getfile?fileid=31261  M100contimage.fits.hdr
+
+    Blank lines and lines beginning with '#' are ignored.
+
+    parameters: <string>, batch file name
+    return:     <list>,   list of (mtype, uri, hdr) 3-tuples
+    """
+    err = "Malformed batch line "
+    datasets = []
+    lineno   = 0
+    for line in open(batchFile).readlines():
+        lineno += 1
+        line = line.strip()
+        if not line or line.startswith('#'): continue
+        fields = line.split()
+        if len(fields) != 3:
+            raise ValueError(err+str(lineno)+": "+line)
+        if fields[0] not in validMtypes:
+            raise ValueError(err+str(lineno)+": Unrecognized mime-type "+fields[0])
+        datasets.append(tuple(fields))
+    return datasets
+
+
+def runBatch(datasets, configFile, public=False, verbose=False, nodb=False, procs=None,
+             nocache=False, profile=False):
+    """Insert many datasets over a pool of worker processes. Each worker
+    configures itself once and keeps one insert instance per MIME-type, so
+    interpreter start up, imports and config parsing are paid once per
+    worker, not once per dataset. Where batchWcs.vectorized() for the
+    number of datasets, the workers first read the WCS inputs of every
+    header, and their conversions are computed here at once, by
+    batchWcs.solve(); each dataset is then built with its batchWcs.WcsTable.
+    Workers build and confirm overrides; the fits2caom command lines they
+    return are run here, as they arrive, by an f2cExecutor.F2CExecutor
+    under the [execute] limit and timeout. A single summary of outcomes is
+    printed when all datasets are done.
+
+    parameters: <list>, <string>, <bool>, <bool>, <bool>, <int>
+                datasets:   list of (mtype, uri, hdr) 3-tuples
+                configFile: mddb.cfg path
+                public, verbose, nodb: as the dbinsert switches
+                procs:      number of worker processes, default cpu count
+                nocache:    bypass the override cache
+                profile:    write a stage profile of each dataset
+    return:     <int>,  0, or 1 if any dataset failed to build or insert
+    """
+    import multiprocessing
+    from mddb.utils import f2cExecutor
+    from mddb.convert import batchWcs
+    if not procs: procs = multiprocessing.cpu_count()
+    jobs = [(mtype, uri, hdr, public, nodb, not nocache, profile)
+            for mtype, uri, hdr in datasets]
+
+    executor = f2cExecutor.F2CExecutor(configFile)
+    results  = []
+    prepareStores(configFile)
+    pool = multiprocessing.Pool(procs, _initBatchWorker, (configFile, verbose))
+    try:
+        if batchWcs.vectorized(len(jobs)):
+            tables = batchWcs.solve(pool.map(_batchWcsInputs, jobs))
+            if verbose:
+                print "Converted the WCS of",len(tables),"headers at once"
+            jobs = [job + (table,) for job, table in zip(jobs, tables)]
+        built = pool.imap_unordered(_batchInsert, jobs)
+        for i in range(len(jobs)):
+            while True:
+                try: hdr, state, detail = built.next(f2cExecutor.POLL)
+                except multiprocessing.TimeoutError:
+                    results.extend(_batchResults(executor.poll()))
+                    continue
+                break
+            if state == 'execute':
+                executor.submit(hdr, detail[0], detail[1])
+            else: results.append((hdr, state, detail))
+            results.extend(_batchResults(executor.poll()))
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    results.extend(_batchResults(executor.drain()))
+
+    printBatchSummary(results)
+    for hdr, state, detail in results:
+        if state == 'failed': return 1
+    return 0
+
+
+def runPipeline(datasets, configFile, public=False, verbose=False, nodb=False, depth=None,
+                nocache=False, profile=False):
+    """Insert many datasets in one process, building and confirming the next
+    overrides while earlier fits2caom processes run. A builder thread passes
+    fits2caom command lines over a queue of at most depth built datasets to
+    an f2cExecutor.F2CExecutor, which runs up to its [execute] limit at once.
+    When the executor is full the queue fills and the builder waits, so
+    neither stage runs unboundedly ahead of the other. A single summary of
+    outcomes is printed when all datasets are done.
+
+    parameters: <list>, <string>, <bool>, <bool>, <bool>, <int>
+                datasets:   list of (mtype, uri, hdr) 3-tuples
+                configFile: mddb.cfg path
+                public, verbose, nodb: as the dbinsert switches
+                depth:      queue bound, default the [execute] limit
+                nocache:    bypass the override cache
+                profile:    write a stage profile of each dataset
+    return:     <int>,  0, or 1 if any dataset failed to build or insert
+    """
+    import Queue
+    import threading
+    from mddb.utils import f2cExecutor
+    executor = f2cExecutor.F2CExecutor(configFile)
+    built    = Queue.Queue(depth or executor.limit)
+    results  = []
+    done     = False
+
+    def build():
+        tasks = {}
+        try:
+            for mtype, uri, hdr in datasets:
+                built.put(_buildDataset(tasks, configFile, verbose,
+                                        (mtype, uri, hdr, public, nodb, not nocache,
+                                         profile)))
+        finally:
+            built.put(None)
+
+    builder = threading.Thread(target=build, name='mddb-builder')
+    builder.daemon = True
+    builder.start()
+
+    while not done or executor.busy():
+        while not done and not executor.full():
+            try: item = built.get(timeout=f2cExecutor.POLL)
+            except Queue.Empty: break
+            if item is None:
+                done = True
+                break
+            hdr, state, detail = item
+            if state == 'execute':
+                executor.submit(hdr, detail[0], detail[1])
+            else: results.append(item)
+        results.extend(_batchResults(executor.poll()))
+        if executor.busy() and (done or executor.full()):
+            time.sleep(f2cExecutor.POLL)
+    builder.join()
+
+    printBatchSummary(results)
+    for hdr, state, detail in results:
+        if state == 'failed': return 1
+    return 0
+
+
+def printBatchSummary(results):
+    """Print the outcome counts of a batch run, followed by the header
+    files which did not insert.
+
+    parameters: <list>, list of (hdr, state, detail) 3-tuples
+    return:     <void>
+    """
+    counts = dict([(state, 0) for state in batchStates])
+    for hdr, state, detail in results:
+        counts[state] += 1
+
+    print "\n\tmddb v"+mddbVersion.version+" batch summary:",len(results),"datasets"
+    print "\t"+("-")*19
+    print "\tInserted:\t\t",counts['success']
+    print "\tValidation failures:\t",counts['invalid']
+    print "\tNogo:\t\t\t",counts['nogo']
+    print "\tNo DB request:\t\t",counts['nodb']
+    print "\tFailed:\t\t\t",counts['failed']
+    for hdr, state, detail in sorted(results):
+        if state in ('invalid', 'nogo', 'failed'):
+            print "\t"+state.upper()+":\t"+hdr, detail
+    print
+    return
+
+
+# Per worker process state for runBatch(). Insert instances are built on
+# first use of a MIME-type and reused for every later dataset of that type.
+
+_workerConfig  = None
+_workerVerbose = False
+_workerTasks   = {}
+
+def prepareStores(configFile):
+    """Create the [validate] sqlite database, when set, before worker
+    processes open it.
+
+    parameters: <string>, mddb.cfg path
+    return:     <void>
+    """
+    from mddb.config.mddbEnv import MDDBEnv
+    dbEnv = MDDBEnv()
+    dbEnv.configure(configFile)
+    if dbEnv.validateStore == 'sqlite':
+        from mddb.utils import validStore
+        validStore.createStore(dbEnv.validateDatabase)
+    return
+
+
+def _initBatchWorker(configFile, verbose):
+    global _workerConfig, _workerVerbose, _workerTasks
+    _workerConfig  = configFile
+    _workerVerbose = verbose
+    _workerTasks   = {}
+    return
+
+
+def _batchInsert(job):
+    """Worker side of runBatch(): build and confirm one dataset.
+
+    parameters: <tuple>, (mtype, uri, hdr, public, nodb, cache, profile),
+                optionally followed by the batchWcs.WcsTable of hdr
+    return:     <tuple>, (hdr, state, detail), as _buildDataset()
+    """
+    return _buildDataset(_workerTasks, _workerConfig, _workerVerbose, job[:7], *job[7:])
+
+
+def _batchWcsInputs(job):
+    """Worker side of runBatch(): read the WCS inputs of one dataset.
+
+    parameters: <tuple>, (mtype, uri, hdr, public, nodb, cache, profile)
+    return:     <dict>, WCS inputs, as batchWcs.solve(), empty on any error,
+                to be met again when the dataset is built
+    """
+    fileType, uri, hdrFile, public, nodbInsert, cache, profile = job
+    try:
+        return _insertTask(_workerTasks, _workerConfig, _workerVerbose,
+                           fileType, cache, profile).wcsInputs(hdrFile)
+    except Exception:
+        return {}
+
+
+def _insertTask(tasks, configFile, verbose, fileType, cache, profile):
+    # the insert instance of fileType, made on first use and kept in tasks
+    task = (fileType, cache, profile)
+    if task not in tasks:
+        tasks[task] = validMtypes.insertClass(fileType)(configFile, verbose, cache, profile)
+    return tasks[task]
+
+
+def _buildDataset(tasks, configFile, verbose, job, wcs=None):
+    """Build and confirm one dataset, with insert instances kept in the
+    tasks dict by MIME-type.
+
+    parameters: <dict>, <string>, <bool>, <tuple>, <WcsTable>
+                (mtype, uri, hdr, public, nodb, cache, profile),
+                optional batchWcs.WcsTable of hdr
+    return:     <tuple>, (hdr, state, detail), state one of batchStates, or
+                'execute' with detail (collid, fits2caom command line)
+    """
+    fileType, uri, hdrFile, public, nodbInsert, cache, profile = job
+    try:
+        dbtask = _insertTask(tasks, configFile, verbose, fileType, cache, profile)
+        dbtask.wcs = wcs
+        try: override = dbtask.buildOverride(hdrFile, uri, public)
+        except NotImplementedError:
+            writeNoGo(hdrFile, fileType, dbtask.dbEnv.VALIDATE, dbtask.validStore,
+                      dbtask.syncGroup)
+            return (hdrFile, 'nogo', "Unsupported MIME-TYPE: "+fileType)
+        if profile: dbtask.writeProfile(getCollId(uri))
+        msgTypes = dbtask.confirmOverride(override, fileType)
+        if "ERROR:" in msgTypes:
+            return (hdrFile, 'invalid', "See validation file.")
         if nodbInsert:
-            sys.exit("No DB request. Done")
-        elif not "ERROR:" in msgTypes:
-            dbtask.executeInsert(collid,override,uri)
-        else:
-            if verbose: print abortString
-            sys.exit("-1")
+            return (hdrFile, 'nodb', '')
+        collid = getCollId(uri)
+        return (hdrFile, 'execute', (collid, dbtask.insertCommand(collid, override, uri)))
+    except Exception, err:
+        return (hdrFile, 'failed', err.__class__.__name__+": "+str(err))
+
+
+def _servedExit(reply):
+    """Print and exit as run() on the reply of a forwarded insert.
+
+    parameters: <dict>, mddbServe insert reply
+    return:     <void>
+    """
+    if not reply['ok']: sys.exit(reply['error'])
+    state = reply['state']
+    if state == 'nogo': sys.exit("-2")
+    if state == 'invalid': sys.exit("-1")
+    if state == 'nodb': sys.exit("No DB request. Done")
+    if state == 'failed':
+        if not reply.get('executed'): sys.exit(reply['detail'])
+        print "Remote process call failed:", reply['detail']
     return
 
 
-def writeNoGo(hdr, mtype, where):
-    """Write a .nogo file when NotImplementedError is raised.
+def _batchResults(runs):
+    """Batch outcomes of finished fits2caom runs.
+
+    parameters: <list>, list of f2cExecutor.F2CResults
+    return:     <list>, list of (hdr, state, detail) 3-tuples
+    """
+    results = []
+    for run in runs:
+        if run.ok(): results.append((run.tag, 'success', ''))
+        else: results.append((run.tag, 'failed', run.describe()))
+    return results
+
+
+def writeNoGo(hdr, mtype, where, store=None, group=None):
+    """Write a .nogo file when NotImplementedError is raised, or record it
+    in store, a validStore.ValidStore, if given. The file is written by
+    atomicFile, in group, an atomicFile.SyncGroup, if given.
 
-    parameters: <string>, <string, <string>
+    parameters: <string>, <string, <string>, <ValidStore>, <SyncGroup>
     return:     <void>
     """
+    if store:
+        store.recordNoGo(hdr, mtype)
+        return
 
     path,hfile=split(hdr)
     head = splitext(split(hdr)[1])[0]
     nogoFile = join(where,head)+".nogo"
 
-    nogo = open(nogoFile,"w")
-    nogo.write("# MDDB Nogo file written for header file: "+hdr+"\n")
-    nogo.write("# Written "+date.today().isoformat()+"\n")
-    nogo.write("# Package Name: "+mddbVersion.pkg_name+"\n")
-    nogo.write("# Package Version: "+mddbVersion.version+"\n\n")
-    nogo.write("File, "+hdr+", is a nogo for CAOM v1 database insertion.\n\n")
-    nogo.write("Received a NotImplementedError\n")
-    nogo.write("Unsupported MIME-TYPE: "+mtype)
+    nogo = ["# MDDB Nogo file written for header file: "+hdr+"\n",
+            "# Written "+date.today().isoformat()+"\n",
+            "# Package Name: "+mddbVersion.pkg_name+"\n",
+            "# Package Version: "+mddbVersion.version+"\n\n",
+            "File, "+hdr+", is a nogo for CAOM v1 database insertion.\n\n",
+            "Received a NotImplementedError\n",
+            "Unsupported MIME-TYPE: "+mtype]
+    from mddb.utils import atomicFile
+    atomicFile.writeText(nogoFile, "".join(nogo), group)
     return
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.utils.ruleEngine.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides the engine of the declarative header remediation rules,
+eg. checkSetKeys.fitsRules. A rule is a tuple,
+
+    (keyword, when, action, line, message)
+
+    keyword  the keyword the rule sets
+    when     a tuple of conditions, all of which must hold, each
+             (keyword, 'present'|'absent') or
+             (keyword, 'equals'|'contains'|'in', argument)
+    action   'insert', the line is inserted at the rule set's insert position,
+             'replace', the first card of keyword is replaced by the line,
+             'warn', the message only
+    line     the header line written, a template
+    message  None, or a (level, template) validation message, eg.
+             ('WARN: ', 'Interpolated value: %(line)s')
+
+Templates are filled from the raw values of the keywords the conditions name,
+and %(line)s, the line written. 'equals' and 'in' test the string value of a
+card, 'contains' its raw value text.
+
+Of the rules setting a keyword, the first whose conditions hold is applied,
+as an if/elif chain. RuleSet compiles the rules once, to a dispatch table of
+the conditions keyed by keyword; apply() looks up each keyword once, from the
+keyword index of a header.Header or one pass over the cards of a list of
+lines, evaluates its conditions, and then applies the chosen rules, in the
+order their keywords are first declared.
+
+eg.,
+
+>>> rules = RuleSet(checkSetKeys.fitsRules, checkSetKeys.insertAt)
+>>> messages = rules.apply(flines)
+"""
+# ------------------------------------------------------------------------------
+
+from mddb.utils.cards import parseCard
+
+ACTIONS = ('insert', 'replace', 'warn')
+
+
+class RuleError(ValueError):
+    """Raise this error when a rule is malformed."""
+    pass
+
+
+def _present(card, arg):  return card is not None
+def _absent(card, arg):   return card is None
+def _equals(card, arg):   return card is not None and card.string() == arg
+def _contains(card, arg): return card is not None and arg in card.raw
+def _among(card, arg):    return card is not None and card.string() in arg
+
+_TESTS = {
+    'present' : _present,
+    'absent'  : _absent,
+    'equals'  : _equals,
+    'contains': _contains,
+    'in'      : _among,
+    }
+
+
+class RuleSet(object):
+
+    def __init__(self, rules, insertAt=3):
+        """Compile rules.
+
+        parameters: <list>, <int>, rule tuples, position of inserted lines
+        """
+        self.insertAt = insertAt
+        self.order    = []
+        self.chains   = {}
+        self.dispatch = {}
+        self.nconds   = 0
+        for rule in rules: self.__compile(rule)
+
+    def apply(self, lines):
+        """Apply the rules to a header.Header, or a list of header lines.
+
+        parameters: <Header>|<list>, header lines
+        return:     <list>, validation messages, (level, text) tuples
+        """
+        cards  = self.__cards(lines)
+        holds  = [False]*self.nconds
+        for key, conds in self.dispatch.iteritems():
+            card = cards.get(key)
+            for slot, test, arg in conds: holds[slot] = test(card, arg)
+
+        inserts  = []
+        messages = []
+        for key in self.order:
+            for slots, action, line, message in self.chains[key]:
+                for slot in slots:
+                    if not holds[slot]: break
+                else:
+                    values = dict([(k, card.raw) for k, card in cards.items()])
+                    if line is not None: line = line % values
+                    if action == 'insert':
+                        inserts.append(line)
+                    elif action == 'replace' and key in cards:
+                        self.__replace(lines, cards[key], line)
+                    if message:
+                        values['line'] = line
+                        messages.append((message[0], message[1] % values))
+                    break
+        if inserts: self.__insert(lines, inserts)
+        return messages
+
+    ############################### prive ##################################
+
+    def __compile(self, rule):
+        try: keyword, when, action, line, message = rule
+        except ValueError: raise RuleError, "Malformed rule: "+repr(rule)
+        if action not in ACTIONS:
+            raise RuleError, "Unknown rule action: "+repr(action)
+        if action != 'warn' and line is None:
+            raise RuleError, "Rule "+keyword+" "+action+" has no line"
+        slots = []
+        for cond in when:
+            key, op, arg = (tuple(cond) + (None,))[:3]
+            if op not in _TESTS:
+                raise RuleError, "Unknown rule condition: "+repr(cond)
+            self.dispatch.setdefault(key, []).append((self.nconds, _TESTS[op], arg))
+            slots.append(self.nconds)
+            self.nconds += 1
+        if keyword not in self.chains:
+            self.order.append(keyword)
+            self.chains[keyword] = []
+            self.dispatch.setdefault(keyword, [])
+        self.chains[keyword].append((tuple(slots), action, line, message))
+        return
+
+    def __cards(self, lines):
+        # the first card of each dispatched keyword
+        try:
+            cardOf = lines.cardOf
+        except AttributeError:
+            cards = {}
+            for line in lines:
+                card = parseCard(line)
+                if card.keyword in self.dispatch and card.keyword not in cards:
+                    cards[card.keyword] = card
+            return cards
+        cards = {}
+        for key in self.dispatch:
+            card = cardOf(key)
+            if card is not None: cards[key] = card
+        return cards
+
+    def __insert(self, lines, inserts):
+        # as successive lines.insert(insertAt, line), with one placement
+        inserts.reverse()
+        if isinstance(lines, list): lines[self.insertAt:self.insertAt] = inserts
+        else: lines.insert(self.insertAt, inserts)
+        return
+
+    def __replace(self, lines, card, line):
+        if isinstance(lines, list):
+            for i, old in enumerate(lines):
+                if parseCard(old).keyword == card.keyword:
+                    lines[i] = line
+                    break
+        else:
+            lines.replace(card, line)
+        return
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                     mddb.utils.segmentStore.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides a packed, append only store of the header copies,
+overrides and validation reports otherwise written one small file each to
+HEADERS, OVERRIDE and VALIDATE. It is used when the mddb config file sets,
+
+[store]
+backend   = segments
+directory = %(dqs)s/segments
+segment   = 64
+
+Artifacts are appended, each zlib compressed, to numbered segment files,
+seg-000000.mseg, ..., of up to segment MB. Each append also appends a line,
+
+    kind <tab> name <tab> segment <tab> offset <tab> length
+
+to the offset index, index, so any artifact is read back by kind and name
+with one seek. A later artifact of a kind and name supersedes an earlier one.
+Appends, and rebuilds of the index, are serialized across processes by an
+flock() on the file lock. A rebuilt index replaces the old by rename, and a
+reader finding a new index file reads it again from the start.
+
+Each record in a segment is preceded by the line,
+
+    MSEG <tab> kind <tab> name <tab> length
+
+so the index may be rebuilt from the segments alone, with rebuildIndex().
+
+fits2caom reads overrides as files, so executeInsert() exports the override
+of a dataset before running it. The store is exported, listed and read from
+the command line,
+
+    python -m mddb.utils.segmentStore --dir=$DQS/segments --list
+    python -m mddb.utils.segmentStore --dir=$DQS/segments --get=override/m100.fits.override
+    python -m mddb.utils.segmentStore --dir=$DQS/segments --kind=override --export=$DQS/OVERRIDE
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import sys
+import zlib
+import fcntl
+import getopt
+import threading
+
+from os.path import basename, join
+
+from mddb import mddbVersion
+
+KINDS   = ('header', 'override', 'valid')
+INDEX   = 'index'
+LOCK    = 'lock'
+PATTERN = 'seg-%06d.mseg'
+MAGIC   = 'MSEG'
+
+# open stores, by (process id, directory)
+_stores = {}
+
+
+class SegmentError(IOError):
+    """Raise this error when a record is not where the index says it is."""
+    pass
+
+
+def openStore(directory, segmentSize=64):
+    """Return the SegmentStore of directory for this process, opened once.
+
+    parameters: <string>, <float>, store directory, segment size, MB
+    return:     <SegmentStore>
+    """
+    key = (os.getpid(), os.path.abspath(directory))
+    if key not in _stores: _stores[key] = SegmentStore(directory, segmentSize)
+    return _stores[key]
+
+
+class SegmentStore(object):
+
+    def __init__(self, directory, segmentSize=64):
+        """Open, creating if need be, the segment store in directory.
+
+        parameters: <string>, <float>, store directory, segment size, MB
+        """
+        if not os.path.isdir(directory): os.makedirs(directory)
+        self.directory   = directory
+        self.segmentSize = int(segmentSize*1024*1024)
+        self.index       = {}
+        self.indexRead   = 0
+        self.indexFile   = None
+        self.segment     = None
+        self.lock        = threading.Lock()
+
+    def put(self, kind, name, text, group=None):
+        """Append an artifact.
+
+        parameters: <string>, <string>, <string>, <SyncGroup>
+                    kind, one of KINDS, name, eg. m100.fits.override, contents,
+                    optional atomicFile.SyncGroup of the segment and index
+        return:     <tuple>, (segment, offset, length) of the compressed record
+        """
+        if kind not in KINDS: raise ValueError, "Unknown artifact kind: "+kind
+        if '\t' in name or '\n' in name: raise ValueError, "Bad artifact name: "+name
+        data   = zlib.compress(text)
+        record = "%s\t%s\t%s\t%d\n" % (MAGIC, kind, name, len(data)) + data
+        with self.lock:
+            lfd = self.__flock()
+            try:
+                segment = self.__current(len(record))
+                path    = join(self.directory, segment)
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0666)
+                try:
+                    offset = os.fstat(fd).st_size + len(record) - len(data)
+                    os.write(fd, record)
+                finally:
+                    os.close(fd)
+                entry = (segment, offset, len(data))
+                self.__appendIndex(kind, name, entry)
+            finally:
+                os.close(lfd)
+        if group:
+            group.add(path)
+            group.add(join(self.directory, INDEX))
+        return entry
+
+    def get(self, kind, name):
+        """Return the contents of the artifact kind/name, or None.
+
+        parameters: <string>, <string>, kind, name
+        return:     <string>
+        """
+        entry = self.locate(kind, name)
+        if entry is None: return None
+        segment, offset, length = entry
+        sfob = open(join(self.directory, segment), 'rb')
+        try:
+            sfob.seek(offset)
+            data = sfob.read(length)
+        finally:
+            sfob.close()
+        if len(data) != length:
+            raise SegmentError, "Short record "+kind+"/"+name+" in "+segment
+        return zlib.decompress(data)
+
+    def has(self, kind, name):
+        return self.locate(kind, name) is not None
+
+    def locate(self, kind, name):
+        """Return the (segment, offset, length) of kind/name, or None."""
+        if (kind, name) not in self.index: self.__readIndex()
+        return self.index.get((kind, name))
+
+    def names(self, kind=None):
+        """Return the sorted (kind, name) of the artifacts, of kind if given."""
+        self.__readIndex()
+        return sorted([key for key in self.index if kind is None or key[0] == kind])
+
+    def export(self, kind, name, where):
+        """Write the artifact kind/name as the file where/name, by atomicFile.
+
+        parameters: <string>, <string>, <string>, kind, name, directory
+        return:     <string>, file written
+        """
+        from mddb.utils import atomicFile
+        text = self.get(kind, name)
+        if text is None: raise IOError, "No artifact "+kind+"/"+name
+        if not os.path.isdir(where): os.makedirs(where)
+        return atomicFile.writeText(join(where, name), text)
+
+    def rebuildIndex(self):
+        """Rewrite the index from the record lines of the segments.
+
+        return: <int>, number of records indexed
+        """
+        entries = []
+        with self.lock:
+            # under the lock of put(), so no append is lost to the rename
+            lfd = self.__flock()
+            try:
+                for segment in self.__segments():
+                    entries.extend(self.__records(segment))
+                text = "".join(["%s\t%s\t%s\t%d\t%d\n" % entry for entry in entries])
+                ipath = join(self.directory, INDEX)
+                ifob  = open(ipath+'.tmp', 'w')
+                try: ifob.write(text)
+                finally: ifob.close()
+                os.rename(ipath+'.tmp', ipath)
+            finally:
+                os.close(lfd)
+        self.__readIndex()
+        return len(entries)
+
+    ############################### prive ##################################
+
+    def __flock(self):
+        # an open fd of the lock file, held LOCK_EX until closed
+        lfd = os.open(join(self.directory, LOCK), os.O_WRONLY | os.O_CREAT, 0666)
+        try:
+            fcntl.flock(lfd, fcntl.LOCK_EX)
+        except:
+            os.close(lfd)
+            raise
+        return lfd
+
+    def __records(self, segment):
+        # (kind, name, segment, offset, length) of the records of a segment
+        entries = []
+        sfob = open(join(self.directory, segment), 'rb')
+        try:
+            while True:
+                line = sfob.readline()
+                if not line: break
+                magic, kind, name, length = line.rstrip('\n').split('\t')
+                if magic != MAGIC:
+                    raise SegmentError, "Bad record line in "+segment
+                entries.append((kind, name, segment, sfob.tell(), int(length)))
+                sfob.seek(int(length), 1)
+        finally:
+            sfob.close()
+        return entries
+
+    def __segments(self):
+        return sorted([seg for seg in os.listdir(self.directory)
+                       if seg.startswith('seg-') and seg.endswith('.mseg')])
+
+    def __current(self, size):
+        # under the lock; another process may have started a later segment
+        if self.segment is None:
+            segments = self.__segments()
+            self.segment = segments and int(segments[-1][4:10]) or 0
+        while os.path.exists(join(self.directory, PATTERN % (self.segment+1))):
+            self.segment += 1
+        path = join(self.directory, PATTERN % self.segment)
+        if os.path.exists(path) and os.path.getsize(path) + size > self.segmentSize \
+                and os.path.getsize(path) > 0:
+            self.segment += 1
+        return PATTERN % self.segment
+
+    def __appendIndex(self, kind, name, entry):
+        fd = os.open(join(self.directory, INDEX),
+                     os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0666)
+        try: os.write(fd, "%s\t%s\t%s\t%d\t%d\n" % ((kind, name) + entry))
+        finally: os.close(fd)
+        self.index[(kind, name)] = entry
+        return
+
+    def __readIndex(self):
+        # read only what has been appended since the last read, or all of
+        # a new index file, as rebuildIndex() leaves
+        try: ifob = open(join(self.directory, INDEX), 'rb')
+        except IOError: return
+        try:
+            stat = os.fstat(ifob.fileno())
+            if (stat.st_dev, stat.st_ino) != self.indexFile:
+                self.index, self.indexRead = {}, 0
+                self.indexFile = (stat.st_dev, stat.st_ino)
+            ifob.seek(self.indexRead)
+            for line in ifob:
+                if not line.endswith('\n'): break
+                kind, name, segment, offset, length = line[:-1].split('\t')
+                self.index[(kind, name)] = (segment, int(offset), int(length))
+                self.indexRead += len(line)
+        finally:
+            ifob.close()
+        return
+
+
+def usage(mod):
+    useBurp = '\n\t'+mod+' of '+mddbVersion.pkg_name+' v'+mddbVersion.version +\
+        '\n\n\tUsage: '+ mod + ' --dir=<store> --list [--kind=<kind>]\n\t'\
+        '       '+ mod + ' --dir=<store> --get=<kind>/<name>\n\t'\
+        '       '+ mod + ' --dir=<store> [--kind=<kind>] --export=<dir>\n\t'\
+        '       '+ mod + ' --dir=<store> --rebuild\n\n\t'\
+        '--dir=    \tSegment store directory, as [store] directory.\n\t'\
+        '--kind=   \tOnly artifacts of kind header, override or valid.\n\t'\
+        '--list    \tList the artifacts.\n\t'\
+        '--get=    \tPrint an artifact.\n\t'\
+        '--export= \tWrite the artifacts as files into a directory.\n\t'\
+        '--rebuild \tRebuild the index from the segments.\n\t'\
+        '--help    \tThis message.\n\n'
+    return useBurp
+
+
+def main(args):
+    mod = basename(args[0])
+    long_options = ['help', 'dir=', 'kind=', 'list', 'get=', 'export=', 'rebuild']
+    try:
+        opts, arg = getopt.getopt(args[1:], '', long_options)
+    except getopt.GetoptError, err:
+        print "Option parsing recieved an error:"
+        print err
+        return usage(mod)
+    opts = dict(opts)
+    if arg or '--help' in opts or '--dir' not in opts: return usage(mod)
+    if not os.path.isdir(opts['--dir']):
+        return "No such segment store: "+opts['--dir']
+
+    store = SegmentStore(opts['--dir'])
+    kind  = opts.get('--kind')
+    if '--rebuild' in opts:
+        print "Indexed", store.rebuildIndex(), "records"
+    elif '--get' in opts:
+        kind, sep, name = opts['--get'].partition('/')
+        text = store.get(kind, name)
+        if text is None: return "No artifact: "+opts['--get']
+        sys.stdout.write(text)
+    elif '--export' in opts:
+        names = store.names(kind)
+        for kind, name in names: store.export(kind, name, opts['--export'])
+        print "Wrote", len(names), "files to", opts['--export']
+    elif '--list' in opts:
+        for kind, name in store.names(kind):
+            segment, offset, length = store.locate(kind, name)
+            print "%-8s %-40s %s %10d %8d" % (kind, name, segment, offset, length)
+    else:
+        return usage(mod)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                     mddb.utils.stageProfile.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides a per dataset profile of the stages of configureOverride().
+Each stage, eg. __validate, __setCoordSys, __insertCDMatrix, __dates2mjd, is
+run through BaseDbInsert.stage(), which, when the insert instance is
+profiling, runs it here and records its wall time, cpu time and the number of
+header lines before and after it.
+
+cpu time is that of the process, time.clock(), so it includes other threads,
+eg. under rUtils.runPipeline().
+
+eg.,
+
+>>> profile = StageProfile('m100.fits.hdr', 'DbFitsInsert')
+>>> profile.run(self.__setCoordSys, flines)
+>>> profile.write('/srv/cyberska/DQS/logs/31261.profile.json')
+"""
+# ------------------------------------------------------------------------------
+
+import json
+import time
+
+from mddb import mddbVersion
+
+from mddb.utils.header import Header
+
+
+class StageProfile(object):
+
+    def __init__(self, dataset, insertClass):
+        """A profile of one dataset, as built by the named insert class.
+
+        parameters: <string>, <string>, header file, insert class name
+        """
+        self.dataset     = dataset
+        self.insertClass = insertClass
+        self.cached      = False
+        self.stages      = []
+
+    def run(self, func, *args):
+        """Run a stage, func(*args), and record it. The first argument, if a
+        header, is counted before and after the stage; otherwise the lines
+        returned by the stage are counted, eg. for __validate. A stage which
+        raises is recorded with the exception class name, and re-raised.
+
+        parameters: <callable>, stage, its arguments
+        return:     the return of func
+        """
+        lines  = None
+        if args: lines = args[0]
+        before = _count(lines)
+        result = None
+        error  = None
+        wall   = time.time()
+        cpu    = time.clock()
+        try:
+            result = func(*args)
+            return result
+        except Exception, err:
+            error = err.__class__.__name__
+            raise
+        finally:
+            wall = time.time() - wall
+            cpu  = time.clock() - cpu
+            if before is None: after = _count(result)
+            else: after = _count(lines)
+            self.record(func.__name__, wall, cpu, before or 0, after or 0, error)
+
+    def record(self, name, wall, cpu, before, after, error=None):
+        """Record a stage.
+
+        parameters: <string>, <float>, <float>, <int>, <int>, <string>
+                    stage name, wall secs, cpu secs, lines before, after, error
+        """
+        self.stages.append({'stage':  name,
+                            'wall':   wall,
+                            'cpu':    cpu,
+                            'before': before,
+                            'after':  after,
+                            'delta':  after - before,
+                            'error':  error})
+        return
+
+    def asDict(self):
+        """The profile as a JSON ready dict, with stage totals."""
+        return {'dataset':  self.dataset,
+                'class':    self.insertClass,
+                'version':  mddbVersion.version,
+                'cached':   self.cached,
+                'units':    'seconds',
+                'wall':     sum([stage['wall'] for stage in self.stages]),
+                'cpu':      sum([stage['cpu'] for stage in self.stages]),
+                'stages':   self.stages}
+
+    def write(self, profileFile):
+        """Write the profile as JSON.
+
+        parameters: <string>, file name
+        return:     <string>, file name
+        """
+        pfob = open(profileFile, 'w')
+        json.dump(self.asDict(), pfob, indent=1, sort_keys=True)
+        pfob.write("\n")
+        pfob.close()
+        return profileFile
+
+
+def _count(lines):
+    if isinstance(lines, (list, Header)): return len(lines)
+    return None
@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                       mddb.utils.validStore.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides an SQLite store of validation reports, in place of one
+.valid or .nogo file per dataset in $DQS/VALIDATE. It is used when the
+[validate] section of the mddb config file sets,
+
+[validate]
+store    = sqlite
+database = %(dqs)s/VALIDATE/validation.sqlite
+commit   = 100
+
+Reports are held in memory and written, commit at a time, in one transaction,
+so worker processes of a batch run hold the database only briefly. Pending
+reports are written when the process exits. A store may be shared by the
+threads of a process, eg. under rUtils.runPipeline().
+
+Each message is kept with its level, eg. ERROR, and a message code, the
+message with values, eg. numbers, quoted strings and URIs, replaced by '#', so
+
+    WCS Rotation angle: 0.0  -->  WCS Rotation angle: #
+
+The store is queried from the command line,
+
+    python -m mddb.utils.validStore --db=validation.sqlite
+    python -m mddb.utils.validStore --db=validation.sqlite --level=ERROR --grep=NCP
+    python -m mddb.utils.validStore --db=validation.sqlite --report=m100.fits
+    python -m mddb.utils.validStore --db=validation.sqlite --export=/tmp/VALIDATE
+
+where --report prints the classic .valid (or .nogo) text of a dataset, and
+--export writes them as files.
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import time
+import getopt
+import sqlite3
+import threading
+import multiprocessing.util
+
+from datetime import date
+from os.path  import basename, join, splitext
+
+from mddb import mddbVersion
+
+schema = """
+CREATE TABLE IF NOT EXISTS reports (
+    dataset  TEXT PRIMARY KEY,
+    kind     TEXT,
+    source   TEXT,
+    mtype    TEXT,
+    written  TEXT,
+    package  TEXT,
+    version  TEXT);
+CREATE TABLE IF NOT EXISTS messages (
+    dataset  TEXT,
+    seq      INTEGER,
+    level    TEXT,
+    tag      TEXT,
+    code     TEXT,
+    message  TEXT);
+CREATE INDEX IF NOT EXISTS messages_dataset ON messages (dataset);
+CREATE INDEX IF NOT EXISTS messages_level   ON messages (level);
+CREATE INDEX IF NOT EXISTS messages_code    ON messages (code);
+"""
+
+_codeRe = re.compile(r"\w+://\S+|'[^']*'|\"[^\"]*\"|(?<![\w.])[-+]?\d[\w.:+-]*")
+
+# open stores, by (process id, database file)
+_stores = {}
+
+
+def messageCode(message):
+    """Return the message code of a validation message, the message with
+    values replaced by '#'.
+
+    parameters: <string>
+    return:     <string>
+    """
+    return _codeRe.sub('#', message).strip()
+
+
+def datasetName(path):
+    """Return the dataset name of an override or header file, the file name
+    less its last extension, eg. m100.fits.override --> m100.fits.
+    """
+    return splitext(basename(path))[0]
+
+
+def createStore(dbFile):
+    """Create the validation database dbFile, if need be, and close it. A
+    batch run calls this before starting its workers, so they do not race
+    to create the tables.
+
+    parameters: <string>, database file
+    return:     <void>
+    """
+    dbDir = os.path.dirname(os.path.abspath(dbFile))
+    if not os.path.isdir(dbDir): os.makedirs(dbDir)
+    conn = sqlite3.connect(dbFile, timeout=60)
+    try: _createSchema(conn)
+    finally: conn.close()
+    return
+
+
+def openStore(dbFile, commit=100):
+    """Return the ValidStore of dbFile for this process, opened once.
+
+    parameters: <string>, <int>, database file, reports per commit
+    return:     <ValidStore>
+    """
+    key = (os.getpid(), os.path.abspath(dbFile))
+    if key not in _stores: _stores[key] = ValidStore(dbFile, commit)
+    return _stores[key]
+
+
+class ValidStore(object):
+
+    def __init__(self, dbFile, commit=100):
+        """Open, creating if need be, the validation database dbFile.
+        Reports are committed commit at a time.
+
+        parameters: <string>, <int>, database file, reports per commit
+        """
+        dbDir = os.path.dirname(os.path.abspath(dbFile))
+        if not os.path.isdir(dbDir): os.makedirs(dbDir)
+        self.dbFile  = dbFile
+        self.commit  = max(1, int(commit))
+        self.pending = []
+        self.lock    = threading.RLock()
+        self.conn    = sqlite3.connect(dbFile, timeout=60, check_same_thread=False)
+        _createSchema(self.conn)
+        multiprocessing.util.Finalize(self, _flushClose,
+                                      args=(self.conn, self.pending, self.lock),
+                                      exitpriority=10)
+
+    def record(self, source, messages, mtype=None):
+        """Record the validation messages of an override file, replacing any
+        earlier report of the dataset.
+
+        parameters: <string>, <list>, <string>
+                    override file, list of (level, message), MIME-type
+        return:     <string>, dataset name
+        """
+        return self.__add('valid', source, messages, mtype)
+
+    def recordNoGo(self, hdr, mtype):
+        """Record a header file of an unsupported MIME-type.
+
+        parameters: <string>, <string>, header file, MIME-type
+        return:     <string>, dataset name
+        """
+        return self.__add('nogo', hdr,
+                          [("NOGO:", "Unsupported MIME-TYPE: "+mtype)], mtype)
+
+    def flush(self):
+        """Write the pending reports in one transaction."""
+        _flush(self.conn, self.pending, self.lock)
+        return
+
+    def close(self):
+        """Write the pending reports and close the database."""
+        _stores.pop((os.getpid(), os.path.abspath(self.dbFile)), None)
+        _flushClose(self.conn, self.pending, self.lock)
+        return
+
+    # --------------------------------- queries --------------------------------
+
+    def summary(self, level=None, grep=None):
+        """Count datasets and messages by level and message code.
+
+        parameters: <string>, <string>, level, message substring, either None
+        return:     <list>, list of (level, code, datasets, messages)
+        """
+        self.flush()
+        where, args = _where(level, grep)
+        return self.conn.execute(
+            "SELECT level, code, COUNT(DISTINCT dataset), COUNT(*) FROM messages"
+            +where+" GROUP BY level, code ORDER BY 3 DESC, 1, 2", args).fetchall()
+
+    def datasets(self, level=None, grep=None):
+        """Return the names of datasets with messages of level and matching
+        grep, or all datasets."""
+        self.flush()
+        if level is None and grep is None:
+            rows = self.conn.execute("SELECT dataset FROM reports ORDER BY 1")
+        else:
+            where, args = _where(level, grep)
+            rows = self.conn.execute("SELECT DISTINCT dataset FROM messages"
+                                     +where+" ORDER BY 1", args)
+        return [row[0] for row in rows]
+
+    def reportText(self, dataset):
+        """Return the classic .valid or .nogo file text of a dataset, or None.
+
+        parameters: <string>, dataset name
+        return:     <string>
+        """
+        self.flush()
+        report = self.conn.execute("SELECT kind, source, mtype, written, package, version"
+                                   " FROM reports WHERE dataset = ?", (dataset,)).fetchone()
+        if report is None: return None
+        kind, source, mtype, written, package, version = report
+        messages = self.conn.execute("SELECT tag, message FROM messages WHERE dataset = ?"
+                                     " ORDER BY seq", (dataset,)).fetchall()
+        if kind == 'nogo':
+            text = ["# MDDB Nogo file written for header file: "+source+"\n",
+                    "# Written "+written+"\n",
+                    "# Package Name: "+package+"\n",
+                    "# Package Version: "+version+"\n\n",
+                    "File, "+source+", is a nogo for CAOM v1 database insertion.\n\n",
+                    "Received a NotImplementedError\n",
+                    "Unsupported MIME-TYPE: "+mtype]
+        else:
+            text = ["# MDDB Validation report for "+source+"\n",
+                    "# Written "+written+"\n",
+                    "# Package Name: "+package+"\n",
+                    "# Package Version: "+version+"\n\n"]
+            text.extend([tag+" "+message+"\n" for tag, message in messages])
+        return "".join(text)
+
+    def export(self, where, datasets=None):
+        """Write the classic .valid and .nogo files of datasets, default all,
+        into the directory where.
+
+        return: <int>, number of files written
+        """
+        if datasets is None: datasets = self.datasets()
+        if not os.path.isdir(where): os.makedirs(where)
+        n = 0
+        for dataset in datasets:
+            kind = self.conn.execute("SELECT kind FROM reports WHERE dataset = ?",
+                                     (dataset,)).fetchone()
+            if kind is None: continue
+            rfob = open(join(where, dataset+"."+kind[0]), 'w')
+            rfob.write(self.reportText(dataset))
+            rfob.close()
+            n += 1
+        return n
+
+    ############################### prive ##################################
+
+    def __add(self, kind, source, messages, mtype):
+        dataset = datasetName(source)
+        report  = (dataset, kind, source, mtype, date.today().isoformat(),
+                   mddbVersion.pkg_name, mddbVersion.version)
+        rows = []
+        for seq, (tag, message) in enumerate(messages):
+            rows.append((dataset, seq, tag.strip().rstrip(':'), tag,
+                         messageCode(message), message))
+        with self.lock:
+            self.pending.append((report, rows))
+            if len(self.pending) >= self.commit: self.flush()
+        return dataset
+
+
+def _createSchema(conn, tries=20):
+    # under an exclusive lock; a process that loses a race to create a fresh
+    # database, eg. 'database schema has changed', tries again
+    for attempt in range(tries):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("BEGIN EXCLUSIVE;\n"+schema+"COMMIT;\n")
+            return
+        except sqlite3.OperationalError:
+            try: conn.execute("ROLLBACK")
+            except sqlite3.OperationalError: pass
+            if attempt == tries-1: raise
+            time.sleep(0.05*(attempt+1))
+    return
+
+
+def _flush(conn, pending, lock):
+    with lock:
+        if not pending: return
+        with conn:
+            for report, rows in pending:
+                conn.execute("INSERT OR REPLACE INTO reports VALUES (?,?,?,?,?,?,?)",
+                             report)
+                conn.execute("DELETE FROM messages WHERE dataset = ?", (report[0],))
+                conn.executemany("INSERT INTO messages VALUES (?,?,?,?,?,?)", rows)
+        del pending[:]
+    return
+
+
+def _flushClose(conn, pending, lock):
+    with lock:
+        try: _flush(conn, pending, lock)
+        finally: conn.close()
+    return
+
+
+def _where(level, grep):
+    clauses, args = [], []
+    if level:
+        clauses.append("level = ?")
+        args.append(level.upper().rstrip(':'))
+    if grep:
+        clauses.append("message LIKE ?")
+        args.append('%'+grep+'%')
+    if not clauses: return "", args
+    return " WHERE "+" AND ".join(clauses), args
+
+
+def usage(mod):
+    useBurp = '\n\t'+mod+' of '+mddbVersion.pkg_name+' v'+mddbVersion.version +\
+        '\n\n\tUsage: '+ mod + ' --db=<database> [--level=<level>] '\
+        '[--grep=<text>] [--datasets]\n\t'\
+        '       '+ mod + ' --db=<database> --report=<dataset>\n\t'\
+        '       '+ mod + ' --db=<database> [--level=<level>] [--grep=<text>] '\
+        '--export=<dir>\n\n\t'\
+        '--db=     \tValidation database, as [validate] database.\n\t'\
+        '--level=  \tOnly messages of level INFO, WARN, ERROR or NOGO.\n\t'\
+        '--grep=   \tOnly messages containing text, eg. NCP.\n\t'\
+        '--datasets\tList the datasets, not the message counts.\n\t'\
+        '--report= \tPrint the .valid or .nogo text of a dataset.\n\t'\
+        '--export= \tWrite .valid and .nogo files into a directory.\n\t'\
+        '--help    \tThis message.\n\n'
+    return useBurp
+
+
+def main(args):
+    mod = basename(args[0])
+    long_options = ['help', 'db=', 'level=', 'grep=', 'datasets', 'report=', 'export=']
+    try:
+        opts, arg = getopt.getopt(args[1:], '', long_options)
+    except getopt.GetoptError, err:
+        print "Option parsing recieved an error:"
+        print err
+        return usage(mod)
+    opts = dict(opts)
+    if arg or '--help' in opts or '--db' not in opts: return usage(mod)
+    if not os.path.isfile(opts['--db']):
+        return "No such validation database: "+opts['--db']
+
+    store = ValidStore(opts['--db'])
+    level = opts.get('--level')
+    grep  = opts.get('--grep')
+    if '--report' in opts:
+        text = store.reportText(opts['--report'])
+        if text is None: return "No report for dataset: "+opts['--report']
+        sys.stdout.write(text)
+    elif '--export' in opts:
+        datasets = None
+        if level or grep: datasets = store.datasets(level, grep)
+        print "Wrote", store.export(opts['--export'], datasets), "files to", opts['--export']
+    elif '--datasets' in opts:
+        for dataset in store.datasets(level, grep): print dataset
+    else:
+        rows = store.summary(level, grep)
+        print "%-6s %8s %8s  %s" % ("level", "datasets", "messages", "code")
+        for lvl, code, ndatasets, nmessages in rows:
+            print "%-6s %8d %8d  %s" % (lvl, ndatasets, nmessages, code)
+    store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+#
+#                                                           CyberSKA DQS Project
+#
+#                                                         mddb.utils.watchDqs.py
+#                                                      Kenneth Anderson, 2026-10
+#                                                            ken.anderson@ubc.ca
+# ------------------------------------------------------------------------------
+
+# $Id$
+# ------------------------------------------------------------------------------
+__version__      = '$Revision$'[11:-3]
+__version_date__ = '$Date$'[7:-3]
+__author__       = "k.r. anderson, <ken.anderson@ubc.ca>"
+# ------------------------------------------------------------------------------
+
+"""Module provides the watch mode of dbinsert, 'dbinsert --watch', which
+inserts header files as they are written into $DQS/DATASETS or $DQS/HEADERS.
+
+A header is inserted once it, and its manifest, a sidecar file named for the
+header with '.manifest' appended, are both closed for writing. The manifest
+gives the MIME-type and uri of the dataset, and optionally its public access,
+
+    m100.fits.hdr.manifest:
+    -----------------------
+    mtype  = image/fits-image
+    uri    = http://dms.cyberska.org:8080/dlmanager/getfile?fileid=31261
+    public = no
+
+Writes are seen by inotify, through pyinotify, where it can be imported;
+otherwise the directories are polled, a file being taken as closed once its
+size and time are unchanged over one poll interval. A burst of writes is
+debounced: a header is taken up only after quiet seconds without another
+write of it or its manifest. A header is inserted again only if its contents
+or its manifest change. The digests of the headers inserted are kept in a
+Ledger, $DQS/cache/watch.inserted, so a restarted watch takes up only the
+headers written, or not inserted, since. A header whose insert did not
+succeed is taken up again on its next write, or the next restart.
+
+Headers are built and confirmed by a warm pool of worker processes, as
+rUtils.runBatch(), and their fits2caom command lines run by an
+f2cExecutor.F2CExecutor. The watch runs until interrupted, when running
+inserts are finished and a batch summary is printed. Settings are read from
+the [watch] section of the mddb config file,
+
+[watch]
+dirs     = %(dqs)s/DATASETS %(dqs)s/HEADERS
+quiet    = 2
+interval = 1
+"""
+# ------------------------------------------------------------------------------
+
+import os
+import time
+import signal
+import hashlib
+import multiprocessing
+
+from mddb.config.mddbEnv import MDDBEnv
+
+from mddb.utils import f2cExecutor
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+MANIFEST = '.manifest'
+LEDGER   = 'watch.inserted'
+
+
+class ManifestError(ValueError):
+    """Raise this error when a manifest is malformed."""
+    pass
+
+
+def manifestFile(hdr):
+    return hdr+MANIFEST
+
+
+def readManifest(hdr, validMtypes):
+    """Return the (mtype, uri, public) of a header from its manifest.
+
+    parameters: <string>, <list>, header file, recognized MIME-types
+    return:     <tuple>
+    """
+    fields = {}
+    mfob = open(manifestFile(hdr))
+    try:
+        for line in mfob:
+            line = line.strip()
+            if not line or line.startswith('#'): continue
+            key, sep, val = line.partition('=')
+            if not sep: raise ManifestError("Malformed manifest line: "+line)
+            fields[key.strip().lower()] = val.strip()
+    finally:
+        mfob.close()
+    for key in ('mtype', 'uri'):
+        if not fields.get(key):
+            raise ManifestError("Manifest has no "+key+": "+manifestFile(hdr))
+    if fields['mtype'] not in validMtypes:
+        raise ManifestError("Unrecognized mime-type "+fields['mtype'])
+    public = fields.get('public', 'no').lower() in ('yes', 'true', 'on', '1')
+    return fields['mtype'], fields['uri'], public
+
+
+class PollWatcher(object):
+
+    def __init__(self, dirs, interval=1.0):
+        """Watch dirs by listing them every interval seconds. A file is
+        reported once its size and modification time are unchanged between
+        two listings. Files already there, taken up by watch() as it starts,
+        are reported only once written again.
+
+        parameters: <list>, <float>, directories, seconds between polls
+        """
+        self.dirs     = dirs
+        self.interval = interval
+        self.seen     = self.__listing()
+        self.reported = dict(self.seen)
+
+    def events(self, timeout):
+        """Wait up to timeout seconds and return the files newly closed.
+
+        return: <list>, file paths
+        """
+        time.sleep(min(timeout, self.interval))
+        closed = []
+        seen   = self.__listing()
+        for path, stamp in seen.iteritems():
+            if self.seen.get(path) == stamp and self.reported.get(path) != stamp:
+                self.reported[path] = stamp
+                closed.append(path)
+        self.seen = seen
+        for path in self.reported.keys():
+            if path not in seen: del self.reported[path]
+        return closed
+
+    def close(self):
+        return
+
+    def __listing(self):
+        # (size, time, inode) of the files of dirs, by path
+        seen = {}
+        for where in self.dirs:
+            try: names = os.listdir(where)
+            except OSError: continue
+            for name in names:
+                if name.startswith('.'): continue
+                path = os.path.join(where, name)
+                try: st = os.stat(path)
+                except OSError: continue
+                if not os.path.isfile(path): continue
+                seen[path] = (st.st_size, st.st_mtime, st.st_ino)
+        return seen
+
+
+class InotifyWatcher(object):
+
+    def __init__(self, dirs):
+        """Watch dirs with inotify for files closed after writing or moved
+        in.
+
+        parameters: <list>, directories
+        """
+        self.closed  = []
+        self.manager = pyinotify.WatchManager()
+        self.manager.add_watch([where for where in dirs if os.path.isdir(where)],
+                               pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO)
+        self.notifier = pyinotify.Notifier(self.manager, self.__event, timeout=0)
+
+    def events(self, timeout):
+        """Wait up to timeout seconds and return the files newly closed.
+
+        return: <list>, file paths
+        """
+        if self.notifier.check_events(int(timeout*1000)):
+            self.notifier.read_events()
+            self.notifier.process_events()
+        closed, self.closed = self.closed, []
+        return closed
+
+    def close(self):
+        self.notifier.stop()
+        return
+
+    def __event(self, event):
+        if not event.name.startswith('.'): self.closed.append(event.pathname)
+        return
+
+
+def watcher(dirs, interval=1.0):
+    """Return an InotifyWatcher of dirs if pyinotify can be imported,
+    otherwise a PollWatcher."""
+    if pyinotify is not None: return InotifyWatcher(dirs)
+    return PollWatcher(dirs, interval)
+
+
+class Debouncer(object):
+
+    def __init__(self, quiet):
+        """Hold headers until quiet seconds pass without another event of
+        them.
+
+        parameters: <float>, seconds
+        """
+        self.quiet   = quiet
+        self.pending = {}
+
+    def add(self, hdr, now):
+        self.pending[hdr] = now
+        return
+
+    def ready(self, now):
+        """Return, and forget, the headers quiet since now - quiet."""
+        ready = sorted([hdr for hdr, last in self.pending.items()
+                        if now - last >= self.quiet])
+        for hdr in ready: del self.pending[hdr]
+        return ready
+
+    def wait(self, now):
+        """Seconds until the next header could be ready, or None."""
+        if not self.pending: return None
+        return max(0.0, min(self.pending.values()) + self.quiet - now)
+
+
+class Ledger(object):
+
+    def __init__(self, path):
+        """The digests of headers inserted, kept in the file path across
+        restarts, as one '<digest> <header>' line appended per insert.
+
+        parameters: <string>, ledger file
+        """
+        self.path    = path
+        self.digests = {}
+        self.__read()
+
+    def inserted(self, hdr, digest):
+        """True if the header, of digest, has been inserted."""
+        return self.digests.get(hdr) == digest
+
+    def record(self, hdr, digest):
+        """Record the insert of the header of digest."""
+        if self.digests.get(hdr) == digest: return
+        self.digests[hdr] = digest
+        where = os.path.dirname(self.path)
+        if not os.path.isdir(where): os.makedirs(where)
+        # one short O_APPEND write, as headerStore's index
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0666)
+        try: os.write(fd, digest+" "+hdr+"\n")
+        finally: os.close(fd)
+        return
+
+    ############################### prive ##################################
+
+    def __read(self):
+        lines = 0
+        try: lfob = open(self.path)
+        except IOError: return
+        try:
+            for line in lfob:
+                digest, sep, hdr = line.rstrip('\n').partition(' ')
+                if sep and hdr:
+                    self.digests[hdr] = digest
+                    lines += 1
+        finally:
+            lfob.close()
+        # a header's lines are appended; rewrite once mostly superseded
+        if lines > 2*len(self.digests) + 1024:
+            from mddb.utils import atomicFile
+            atomicFile.writeLines(self.path, [digest+" "+hdr for hdr, digest in
+                                              sorted(self.digests.items())])
+        return
+
+
+def _digest(hdr):
+    digest = hashlib.sha1()
+    for path in (hdr, manifestFile(hdr)):
+        pfob = open(path, 'rb')
+        try:
+            for block in iter(lambda: pfob.read(65536), ''):
+                digest.update(block)
+        finally:
+            pfob.close()
+        digest.update('\0')
+    return digest.hexdigest()
+
+
+def watch(configFile, verbose=False, nodb=False, procs=None, nocache=False,
+          profile=False, runFor=None):
+    """Insert headers as they are written into the [watch] dirs, until
+    interrupted, or for runFor seconds.
+
+    parameters: <string>, <bool>, <bool>, <int>, <bool>, <bool>, <float>
+                configFile: mddb.cfg path
+                verbose, nodb, nocache, profile: as the dbinsert switches
+                procs:      number of worker processes, default cpu count
+                runFor:     seconds to watch, default until interrupted
+    return:     <int>,  0, or 1 if any dataset failed to build or insert
+    """
+    # rUtils imports this module on --watch
+    from mddb.utils import rUtils
+
+    dbEnv = MDDBEnv()
+    dbEnv.configure(configFile)
+    if not procs: procs = multiprocessing.cpu_count()
+
+    dirs     = dbEnv.watchDirs
+    watching = watcher(dirs, dbEnv.watchInterval)
+    debounce = Debouncer(dbEnv.watchQuiet)
+    executor = f2cExecutor.F2CExecutor(configFile)
+    ledger   = Ledger(os.path.join(dbEnv.cache, LEDGER))
+    taken    = {}
+    building = []
+    results  = []
+    stopping = []
+
+    def finish(result):
+        # a header's digest is recorded once it is inserted
+        hdr, state, detail = result
+        digest = taken.pop(hdr, None)
+        if state == 'success' and digest: ledger.record(hdr, digest)
+        results.append(_report(result))
+
+    rUtils.prepareStores(configFile)
+    pool = multiprocessing.Pool(procs, _initWatchWorker, (configFile, verbose))
+    def stop(signum, frame): stopping.append(signum)
+    signal.signal(signal.SIGTERM, stop)
+
+    print "mddb v"+rUtils.mddbVersion.version, "watching", " ".join(dirs),
+    print "("+watching.__class__.__name__+")"
+    # headers written, or not inserted, while not watching
+    for where in dirs:
+        for hdr in _manifested(where): debounce.add(hdr, 0)
+    start = time.time()
+    try:
+        while not stopping and (runFor is None or time.time() - start < runFor):
+            now  = time.time()
+            wait = debounce.wait(now)
+            if wait is None: wait = dbEnv.watchInterval
+            for path in watching.events(min(wait, dbEnv.watchInterval)):
+                if path.endswith(MANIFEST): path = path[:-len(MANIFEST)]
+                debounce.add(path, time.time())
+
+            for hdr in debounce.ready(time.time()):
+                if not (os.path.isfile(hdr) and os.path.isfile(manifestFile(hdr))):
+                    continue
+                if hdr in taken:
+                    # one insert of a header at a time; taken up once done
+                    debounce.add(hdr, time.time())
+                    continue
+                try:
+                    digest = _digest(hdr)
+                    if ledger.inserted(hdr, digest): continue
+                    mtype, uri, public = readManifest(hdr, rUtils.validMtypes)
+                except (IOError, ManifestError), err:
+                    results.append(_report((hdr, 'failed', str(err))))
+                    continue
+                taken[hdr] = digest
+                if verbose: print "Taking up", hdr, mtype, uri
+                job = (mtype, uri, hdr, public, nodb, not nocache, profile)
+                building.append(pool.apply_async(rUtils._batchInsert, (job,)))
+
+            for build in [build for build in building if build.ready()]:
+                building.remove(build)
+                hdr, state, detail = build.get()
+                if state == 'execute': executor.submit(hdr, detail[0], detail[1])
+                else: finish((hdr, state, detail))
+            for result in rUtils._batchResults(executor.poll()): finish(result)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watching.close()
+        pool.close()
+        pool.join()
+    for build in building:
+        hdr, state, detail = build.get()
+        if state == 'execute': executor.submit(hdr, detail[0], detail[1])
+        else: finish((hdr, state, detail))
+    for result in rUtils._batchResults(executor.drain()): finish(result)
+
+    rUtils.printBatchSummary(results)
+    for hdr, state, detail in results:
+        if state == 'failed': return 1
+    return 0
+
+
+def _initWatchWorker(configFile, verbose):
+    # an interrupt or SIGTERM, often sent to the whole process group, stops
+    # the watch, which then finishes the workers' builds
+    from mddb.utils import rUtils
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    rUtils._initBatchWorker(configFile, verbose)
+    return
+
+
+def _manifested(where):
+    try: names = os.listdir(where)
+    except OSError: return []
+    return [os.path.join(where, name[:-len(MANIFEST)]) for name in sorted(names)
+            if name.endswith(MANIFEST) and not name.startswith('.')]
+
+
+def _report(result):
+    hdr, state, detail = result
+    print "\t"+time.strftime('%H:%M:%S')+"\t"+state.upper()+":\t"+hdr, detail
+    return result